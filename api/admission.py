@@ -0,0 +1,165 @@
+# api/admission.py
+
+import hmac
+import ipaddress
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+from backend.admission import AdmissionController, Overloaded
+
+
+class ClientKey:
+    """
+    Rate-limit key for a request.
+
+    The client is the socket peer. X-Forwarded-For is only read when
+    the peer is a trusted proxy (trusted_proxies: comma-separated
+    addresses / CIDRs, or "*" to trust the immediate peer, e.g. on
+    Render where nothing else can reach the app); entries are then
+    taken from the right, skipping further trusted proxies.
+
+    A frontend that relays many users from one address (the
+    Streamlit app) sends X-Frontend-Token; with a valid token each
+    X-Session-ID gets its own bucket instead of sharing the
+    frontend's.
+    """
+
+    def __init__(self, trusted_proxies: str = "", frontend_token: Optional[str] = None):
+        specs = [p.strip() for p in trusted_proxies.split(",") if p.strip()]
+        self.trust_peer = "*" in specs
+        self.networks = [
+            ipaddress.ip_network(p, strict=False) for p in specs if p != "*"
+        ]
+        self.frontend_token = frontend_token or None
+        # compared as bytes: compare_digest rejects non-ASCII str
+        self._frontend_token = frontend_token.encode() if frontend_token else None
+
+    @classmethod
+    def from_env(cls) -> "ClientKey":
+        return cls(
+            os.getenv("MIMIR_TRUSTED_PROXIES", ""),
+            os.getenv("MIMIR_FRONTEND_TOKEN"),
+        )
+
+    def __call__(self, scope) -> str:
+        headers = _headers(scope)
+
+        token = headers.get(b"x-frontend-token")
+        session = headers.get(b"x-session-id")
+        if (
+            self.frontend_token
+            and token
+            and session
+            and hmac.compare_digest(token.encode("latin-1"), self._frontend_token)
+        ):
+            return f"session:{session}"
+
+        return self.address(scope, headers)
+
+    def address(self, scope, headers: Optional[Dict[bytes, str]] = None) -> str:
+        client = scope.get("client")
+        peer = client[0] if client else "unknown"
+
+        forwarded = (headers if headers is not None else _headers(scope)).get(b"x-forwarded-for")
+        if not forwarded or not (self.trust_peer or self._trusted(peer)):
+            return peer
+
+        hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+        while hops:
+            hop = hops.pop()
+            if not hops or not self._trusted(hop):
+                return hop
+        return peer
+
+    def _trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.networks)
+
+
+def _headers(scope) -> Dict[bytes, str]:
+    # repeated headers are one comma-separated list, in order
+    headers: Dict[bytes, str] = {}
+    for name, value in scope.get("headers", []):
+        value = value.decode("latin-1")
+        headers[name] = f"{headers[name]}, {value}" if name in headers else value
+    return headers
+
+
+def overloaded_response(error: Overloaded):
+    """
+    (status, headers, body) for a shed request.
+    """
+    body = json.dumps({"detail": str(error)}).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(error.retry_after).encode()),
+    ]
+    return 503, headers, body
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware in front of the query endpoints.
+
+    Requests are admitted (rate limit, then concurrency limit) on the
+    event loop, before they take a threadpool thread, and rejected
+    with 503 + Retry-After otherwise. The slot is held until the last
+    body chunk is sent, but the latency fed to the concurrency limit
+    is the time to the first body chunk: a streamed answer's pacing
+    is not the server being slow.
+    """
+
+    def __init__(
+        self,
+        app,
+        controller: AdmissionController,
+        paths: Iterable[str],
+        client_key: Optional[ClientKey] = None,
+    ):
+        self.app = app
+        self.controller = controller
+        self.paths = set(paths)
+        self.client_key = client_key or ClientKey()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.admit(self.client_key(scope))
+        except Overloaded as e:
+            status, headers, body = overloaded_response(e)
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        started = time.perf_counter()
+        first_byte: Optional[float] = None
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                elapsed = time.perf_counter() - started
+                self.controller.release(elapsed if first_byte is None else first_byte)
+
+        async def send_and_track(message):
+            nonlocal first_byte
+            if message["type"] == "http.response.body" and first_byte is None:
+                first_byte = time.perf_counter() - started
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                release()
+
+        try:
+            await self.app(scope, receive, send_and_track)
+        finally:
+            release()
@@ -1,13 +1,104 @@
 # api/deps.py
 
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from backend.admission import AdmissionController
 from backend.assistant import MimirAssistant
+from backend.jobs import JobQueue
+from backend.file_qa.storage import UploadStore
+from backend.session_store import SessionStore
+from backend.profiling import RequestProfiler
+from backend.memory_accounting import MemoryAccountant, build_assistant_accountant
 
 # Singleton assistant instance (session-based)
 mimir_assistant = MimirAssistant()
 
+# Opt-in request profiler (header or sample-rate triggered)
+request_profiler = RequestProfiler()
+
+# Approximate per-structure memory accounting
+memory_accountant = build_assistant_accountant(mimir_assistant)
+
+# Bounded background queue for file indexing
+ingest_jobs = JobQueue(
+    max_workers=int(os.getenv("MIMIR_INGEST_WORKERS", "1")),
+    max_pending=int(os.getenv("MIMIR_INGEST_MAX_PENDING", "8")),
+)
+
+# Content-addressed, ref-counted upload storage (shared file registry)
+upload_store = UploadStore()
+
+# Conversation turns shared by all server workers
+session_store = SessionStore(max_turns=mimir_assistant.MAX_MEMORY)
+memory_accountant.register_sessions("session_store", session_store.sizes)
+
+# Per-client rate limits and the adaptive concurrency limit (per worker)
+admission = AdmissionController.from_env()
+
 
 def get_assistant() -> MimirAssistant:
     """
     Dependency provider for MimirAssistant.
     """
     return mimir_assistant
+
+
+def get_profiler() -> RequestProfiler:
+    """
+    Dependency provider for RequestProfiler.
+    """
+    return request_profiler
+
+
+def get_memory_accountant() -> MemoryAccountant:
+    """
+    Dependency provider for MemoryAccountant.
+    """
+    return memory_accountant
+
+
+def get_ingest_jobs() -> JobQueue:
+    """
+    Dependency provider for the file ingestion JobQueue.
+    """
+    return ingest_jobs
+
+
+def get_upload_store() -> UploadStore:
+    """
+    Dependency provider for UploadStore.
+    """
+    return upload_store
+
+
+def get_session_store() -> SessionStore:
+    """
+    Dependency provider for SessionStore.
+    """
+    return session_store
+
+
+def get_admission() -> AdmissionController:
+    """
+    Dependency provider for AdmissionController.
+    """
+    return admission
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Guard for /admin and /debug endpoints: they exist only when
+    MIMIR_ADMIN_TOKEN is set, and need it in X-Admin-Token.
+    """
+    token = os.getenv("MIMIR_ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # bytes: compare_digest rejects non-ASCII str; headers arrive as latin-1
+    if not x_admin_token or not hmac.compare_digest(
+        x_admin_token.encode("latin-1"), token.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
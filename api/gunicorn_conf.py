@@ -0,0 +1,35 @@
+# api/gunicorn_conf.py
+#
+# Multi-worker serving:
+#   gunicorn api.main:app -c api/gunicorn_conf.py
+#
+# The app (and the published index snapshot) is loaded once in the
+# master before forking, so workers share index pages copy-on-write;
+# with MIMIR_INDEX_MMAP=1 the vector codes are file-backed as well.
+# Sessions, the uploaded-file registry and the embedding cache live
+# in SQLite (WAL) files, so any worker can serve any session.
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("MIMIR_WORKER_TIMEOUT", "120"))
+
+
+def on_starting(server):
+    # load indices synchronously in the master, before fork. Shard
+    # processes (MIMIR_SHARD_PROCESSES=1) are never started here:
+    # they would outlive the fork unowned. Sharded domains only read
+    # their manifests; each worker starts its own pools.
+    from api.deps import mimir_assistant
+
+    result = mimir_assistant.indices.reload(start_shards=False)
+    server.log.info(f"Preloaded index snapshot: {result['versions']}")
+
+
+def post_worker_init(worker):
+    from api.deps import mimir_assistant
+
+    mimir_assistant.indices.warm()
@@ -1,12 +1,33 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, File, Header, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from typing import List, Optional
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse, PlainTextResponse
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
+import os
 import time
 
-from api.deps import get_assistant
+from api.admission import AdmissionMiddleware, ClientKey
+from api.deps import (
+    admission,
+    get_admission,
+    get_assistant,
+    get_ingest_jobs,
+    get_memory_accountant,
+    get_profiler,
+    get_session_store,
+    get_upload_store,
+    require_admin,
+)
+from backend.admission import AdmissionController, Overloaded
 from backend.assistant import MimirAssistant
+from backend.profiling import RequestProfiler
+from backend.memory_accounting import MemoryAccountant
+from backend.modes import ModeManager
+from backend.validators import OutputValidator
+from backend.jobs import Job, JobQueue, QueueFull
+from backend.file_qa.storage import UploadStore, UploadTooLarge
+from backend.session_store import SessionStore
+from rag.filters import validate_filters
 
 
 # =========================
@@ -18,6 +39,15 @@ app = FastAPI(
     version="1.1.0",
 )
 
+# Shed load before it reaches the threadpool (added first: CORS
+# stays outermost, so browsers can read 503s and Retry-After)
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=admission,
+    paths=("/query", "/query/stream"),
+    client_key=ClientKey.from_env(),
+)
+
 # ✅ CORS FIX (Vercel + Localhost)
 app.add_middleware(
     CORSMiddleware,
@@ -27,6 +57,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+mode_manager = ModeManager()
+output_validator = OutputValidator()
+
+# Uploaded files are shared through one FileQASystem for now
+FILE_SESSION = "default"
+
+# Pending registry sync for this worker's FileQASystem
+_file_sync_job: Optional[Job] = None
+
+
+@app.exception_handler(Overloaded)
+def overloaded(request, e: Overloaded):
+    # shed inside the query, e.g. by the web-fallback limit
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(e)},
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
 
 # =========================
@@ -43,6 +91,8 @@ class QueryRequest(BaseModel):
     messages: Optional[List[Message]] = None
     persona: str = "default"
     mode: str = "factual"
+    # e.g. {"source": "notes.txt"} or {"ingested_at": {"gte": 1700000000}}
+    filters: Optional[Dict[str, Any]] = None
 
 
 class QueryResponse(BaseModel):
@@ -53,20 +103,22 @@ class QueryResponse(BaseModel):
 
 
 # =========================
-# QUERY (NON-STREAM)
+# DISPATCH
 # =========================
 
-@app.post("/query", response_model=QueryResponse)
-def query_mimir(
+def _dispatch_query(
     payload: QueryRequest,
-    assistant: MimirAssistant = Depends(get_assistant),
+    assistant: MimirAssistant,
+    sessions: Optional[SessionStore] = None,
+    session_id: Optional[str] = None,
 ):
     """
-    Memory-aware query endpoint.
+    Memory-aware dispatch.
 
     Priority:
     1) messages (conversation memory)
-    2) single query fallback
+    2) single query, with memory from the shared session store when
+       an X-Session-ID is sent, otherwise answered on its own
     """
 
     # 🔁 MEMORY PATH
@@ -75,21 +127,128 @@ def query_mimir(
             messages=[m.dict() for m in payload.messages],
             persona=payload.persona,
             mode=payload.mode,
+            filters=payload.filters,
+            session_id=session_id,
         )
 
     # 🔁 LEGACY PATH
     if payload.query and payload.query.strip():
-        return assistant.query(
-            payload.query,
-            payload.persona,
-            payload.mode,
+        if sessions is None or session_id is None:
+            # no session: stateless, never a shared default memory
+            return assistant.query(
+                payload.query,
+                payload.persona,
+                payload.mode,
+                filters=payload.filters,
+            )
+
+        # any worker can continue any session
+        turn = {"role": "user", "content": payload.query.strip()}
+        result = assistant.query_with_memory(
+            messages=sessions.history(session_id) + [turn],
+            persona=payload.persona,
+            mode=payload.mode,
+            filters=payload.filters,
+            session_id=session_id,
+        )
+        sessions.append(
+            session_id, [turn, {"role": "mimir", "content": result["answer"]}]
         )
+        return result
 
     # ❌ EMPTY INPUT
-    return QueryResponse(
-        answer="No input provided.",
-        confidence=0.2,
-        metadata={"error": "empty_request"},
+    return {
+        "answer": "No input provided.",
+        "confidence": 0.2,
+        "metadata": {"error": "empty_request"},
+    }
+
+
+def _check_filters(payload: QueryRequest) -> None:
+    try:
+        validate_filters(payload.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _sync_files(assistant: MimirAssistant, store: UploadStore, jobs: JobQueue) -> None:
+    """
+    Queue a re-sync when another worker changed the shared file
+    registry. The query itself answers from the current index.
+    """
+    file_qa = assistant.file_qa
+    generation = store.generation(FILE_SESSION)
+    if generation == file_qa.synced_generation:
+        return
+
+    global _file_sync_job
+
+    # at most one pending sync per worker
+    if _file_sync_job is not None and not _file_sync_job.finished:
+        return
+
+    def sync(job):
+        files = store.session_files(FILE_SESSION)
+        return file_qa.sync(files, store.generation(FILE_SESSION))
+
+    try:
+        _file_sync_job = jobs.submit("sync_files", sync)
+    except QueueFull:
+        pass
+
+
+def _run_query(
+    payload: QueryRequest,
+    assistant: MimirAssistant,
+    profiler: RequestProfiler,
+    profile_header: Optional[str],
+    request_id: Optional[str],
+    sessions: Optional[SessionStore] = None,
+    session_id: Optional[str] = None,
+):
+    # Disabled profiling is a single check → direct call
+    if not profiler.should_profile(profile_header):
+        return _dispatch_query(payload, assistant, sessions, session_id)
+
+    profile_id = profiler.request_id(request_id)
+    result = profiler.run(
+        profile_id, _dispatch_query, payload, assistant, sessions, session_id
+    )
+
+    return {
+        **result,
+        "metadata": {**result.get("metadata", {}), "profile_id": profile_id},
+    }
+
+
+# =========================
+# QUERY (NON-STREAM)
+# =========================
+
+@app.post("/query", response_model=QueryResponse)
+def query_mimir(
+    payload: QueryRequest,
+    assistant: MimirAssistant = Depends(get_assistant),
+    profiler: RequestProfiler = Depends(get_profiler),
+    x_mimir_profile: Optional[str] = Header(None),
+    x_request_id: Optional[str] = Header(None),
+    x_session_id: Optional[str] = Header(None),
+    sessions: SessionStore = Depends(get_session_store),
+    store: UploadStore = Depends(get_upload_store),
+    jobs: JobQueue = Depends(get_ingest_jobs),
+):
+    """
+    Memory-aware query endpoint.
+
+    Send `X-Mimir-Profile: 1` to profile this request and
+    `X-Session-ID` to keep a conversation; without it every query
+    is answered on its own.
+    """
+    _check_filters(payload)
+    _sync_files(assistant, store, jobs)
+    return _run_query(
+        payload, assistant, profiler, x_mimir_profile, x_request_id,
+        sessions, x_session_id,
     )
 
 
@@ -101,30 +260,285 @@ def query_mimir(
 def query_stream(
     payload: QueryRequest,
     assistant: MimirAssistant = Depends(get_assistant),
+    profiler: RequestProfiler = Depends(get_profiler),
+    x_mimir_profile: Optional[str] = Header(None),
+    x_request_id: Optional[str] = Header(None),
+    x_session_id: Optional[str] = Header(None),
+    validate: bool = False,
+    sessions: SessionStore = Depends(get_session_store),
+    store: UploadStore = Depends(get_upload_store),
+    jobs: JobQueue = Depends(get_ingest_jobs),
 ):
+    """
+    Token-streamed answer. With validate=true, persona/mode rules
+    are checked incrementally and the stream is cut short with a
+    refusal as soon as a rule is violated.
+    """
+    _check_filters(payload)
+    _sync_files(assistant, store, jobs)
+
     def stream():
-        # MEMORY PATH
-        if payload.messages and len(payload.messages) > 0:
-            result = assistant.query_with_memory(
-                messages=[m.dict() for m in payload.messages],
-                persona=payload.persona,
-                mode=payload.mode,
+        try:
+            result = _run_query(
+                payload, assistant, profiler, x_mimir_profile, x_request_id,
+                sessions, x_session_id,
             )
+        except Overloaded as e:
+            # headers are already sent: say so in the body
+            yield f"Mimir is overloaded ({e}); try again in {e.retry_after}s."
+            return
 
-        # LEGACY PATH
-        elif payload.query and payload.query.strip():
-            result = assistant.query(
-                payload.query,
-                payload.persona,
-                payload.mode,
+        checker = None
+        if validate:
+            checker = output_validator.stream(
+                persona=assistant.persona_manager.load(payload.persona),
+                mode=mode_manager.load(payload.mode),
+                sources=result.get("sources", []),
             )
 
-        else:
-            result = {"answer": "No input provided."}
-
         # Oracle-style token streaming
         for token in result["answer"].split(" "):
+            if checker and checker.feed(token + " "):
+                yield "\n\n" + checker.refusal()["answer"]
+                return
             yield token + " "
             time.sleep(0.03)
 
+        if checker and checker.finish():
+            yield "\n\n" + checker.refusal()["answer"]
+
     return StreamingResponse(stream(), media_type="text/plain")
+
+
+# =========================
+# FILES
+# =========================
+
+@app.post("/files/upload", status_code=202)
+def upload_files(
+    files: List[UploadFile] = File(...),
+    assistant: MimirAssistant = Depends(get_assistant),
+    jobs: JobQueue = Depends(get_ingest_jobs),
+    store: UploadStore = Depends(get_upload_store),
+):
+    """
+    Store uploaded files and queue them for indexing.
+
+    Files are stored by content hash; content that is already
+    indexed is not indexed again. Returns a job id right away; poll
+    /files/jobs/{job_id}. Queries see the files once the job reports
+    status "done". If every file is already indexed, no job is queued:
+    job_id is null and status is "done".
+    """
+    stored = []
+    try:
+        for upload in files:
+            name = os.path.basename(upload.filename or "upload.txt")
+            stored.append(store.put(upload.file, name, FILE_SESSION))
+    except UploadTooLarge as e:
+        _release_new(store, stored)
+        raise HTTPException(status_code=413, detail=str(e))
+
+    file_qa = assistant.file_qa
+    # content this worker has indexed needs no job
+    pending = [s for s in stored if not file_qa.is_ingested(s.digest)]
+    if not pending:
+        return {
+            "job_id": None,
+            "status": "done",
+            "files_loaded": len(stored),
+            "files": [s.to_dict() for s in stored],
+        }
+
+    paths = [s.path for s in pending]
+    names = [s.name for s in pending]
+    digests = [s.digest for s in pending]
+
+    def ingest(job):
+        return file_qa.ingest_files(
+            paths, names=names, progress=job.report, digests=digests
+        )
+
+    try:
+        job = jobs.submit("ingest_files", ingest, files=names)
+    except QueueFull as e:
+        _release_new(store, stored)
+        raise HTTPException(
+            status_code=503,
+            detail=f"Indexing queue is full: {e}",
+            headers={"Retry-After": "5"},
+        )
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "files_loaded": len(stored),
+        "files": [s.to_dict() for s in stored],
+    }
+
+
+def _release_new(store: UploadStore, stored) -> None:
+    # undo only references this request created
+    store.release(FILE_SESSION, [s.digest for s in stored if s.new_ref])
+
+
+@app.get("/files/jobs")
+def list_jobs(limit: int = 20, jobs: JobQueue = Depends(get_ingest_jobs)):
+    return {"jobs": jobs.list(limit), "queue": jobs.stats()}
+
+
+@app.get("/files/jobs/{job_id}")
+def job_status(job_id: str, jobs: JobQueue = Depends(get_ingest_jobs)):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.post("/files/clear")
+def clear_files(
+    assistant: MimirAssistant = Depends(get_assistant),
+    store: UploadStore = Depends(get_upload_store),
+):
+    """
+    Drop all uploaded files from the index and delete stored files
+    no other session references. Ingest jobs still running are
+    discarded when they finish.
+    """
+    assistant.file_qa.clear()
+    removed = store.release_session(FILE_SESSION)
+    return {"status": "cleared", "files_removed": len(removed)}
+
+
+@app.get("/files/storage")
+def storage_stats(store: UploadStore = Depends(get_upload_store)):
+    return store.stats()
+
+
+@app.on_event("startup")
+def sweep_uploads():
+    # unreferenced objects and temp files left by interrupted uploads
+    get_upload_store().gc()
+
+
+# =========================
+# ADMIN: INDEX SNAPSHOTS
+# =========================
+# /admin and /debug need X-Admin-Token (off unless MIMIR_ADMIN_TOKEN is set)
+
+@app.on_event("startup")
+def start_index_snapshots():
+    indices = get_assistant().indices
+    # serve immediately; domains appear once the first load is published
+    indices.reload_async()
+    indices.start_watcher(float(os.getenv("MIMIR_INDEX_WATCH_SECONDS", "0")))
+
+
+@app.get("/admin/indices", dependencies=[Depends(require_admin)])
+def index_status(assistant: MimirAssistant = Depends(get_assistant)):
+    return assistant.indices.status()
+
+
+@app.post("/admin/indices/reload", dependencies=[Depends(require_admin)])
+def reload_indices(
+    wait: bool = False,
+    assistant: MimirAssistant = Depends(get_assistant),
+):
+    """
+    Load newly published index versions and swap them in.
+    Queries keep running on the current snapshot meanwhile.
+    """
+    if wait:
+        try:
+            return assistant.indices.reload()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Reload failed: {e}")
+
+    assistant.indices.reload_async()
+    return {"status": "reloading", **assistant.indices.status()}
+
+
+@app.get("/admin/web-knowledge", dependencies=[Depends(require_admin)])
+def web_knowledge_status(assistant: MimirAssistant = Depends(get_assistant)):
+    """
+    Stored web answers and how many are still fresh.
+    """
+    return assistant.web_knowledge.stats()
+
+
+@app.get("/admin/answer-cache", dependencies=[Depends(require_admin)])
+def answer_cache_status(assistant: MimirAssistant = Depends(get_assistant)):
+    """
+    Semantic answer cache size and hit rate for this worker, and
+    how many requests joined an identical one already in flight.
+    """
+    return {**assistant.answer_cache.stats(), "single_flight": assistant.flights.stats()}
+
+
+@app.get("/admin/admission", dependencies=[Depends(require_admin)])
+def admission_status(
+    assistant: MimirAssistant = Depends(get_assistant),
+    controller: AdmissionController = Depends(get_admission),
+):
+    """
+    Rate limits, the current concurrency limit and the web-fallback
+    limit for this worker, with rejection counts.
+    """
+    return {**controller.stats(), "web": assistant.web_limit.stats()}
+
+
+# =========================
+# DEBUG: PROFILES
+# =========================
+
+@app.get("/debug/profiles", dependencies=[Depends(require_admin)])
+def list_profiles(profiler: RequestProfiler = Depends(get_profiler)):
+    return {"profiles": profiler.list_profiles()}
+
+
+@app.get("/debug/profiles/{request_id}", dependencies=[Depends(require_admin)])
+def get_profile(
+    request_id: str,
+    format: str = "text",
+    profiler: RequestProfiler = Depends(get_profiler),
+):
+    """
+    Fetch a stored profile as a text summary or raw .prof dump.
+    """
+    path = profiler.profile_path(request_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "raw":
+        return FileResponse(
+            path,
+            media_type="application/octet-stream",
+            filename=f"{request_id}.prof",
+        )
+
+    return PlainTextResponse(profiler.summary(request_id))
+
+
+# =========================
+# DEBUG: MEMORY
+# =========================
+
+@app.on_event("startup")
+def start_memory_sampler():
+    interval = float(os.getenv("MIMIR_MEMORY_SAMPLE_SECONDS", "0"))
+    get_memory_accountant().start_sampler(interval)
+
+
+@app.get("/debug/memory", dependencies=[Depends(require_admin)])
+def debug_memory(
+    top_n: int = 10,
+    history: bool = False,
+    accountant: MemoryAccountant = Depends(get_memory_accountant),
+):
+    """
+    Approximate byte breakdown of indices, vocabularies and sessions.
+    """
+    report = accountant.report(top_n=top_n)
+    if history:
+        report["history"] = accountant.history()
+    return report
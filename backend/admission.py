@@ -0,0 +1,320 @@
+# backend/admission.py
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Optional
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is shed; retry_after is in seconds.
+    """
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+# ======================
+# RATE LIMITS
+# ======================
+class TokenBucket:
+    """
+    rate tokens per second, up to burst; one token per request.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: Optional[float] = None) -> float:
+        """
+        0 if a token was taken, else seconds until one is available.
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    One token bucket per client; the least recently seen clients are
+    forgotten beyond max_clients (a forgotten client starts full).
+    rate <= 0 disables the limit.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10_000):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_clients = max_clients
+
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def check(self, client: str) -> None:
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[client] = bucket
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+
+            wait = bucket.take()
+            if wait:
+                self.rejected += 1
+
+        if wait:
+            raise Overloaded("rate limit exceeded", wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "rejected": self.rejected,
+        }
+
+
+# ======================
+# CONCURRENCY
+# ======================
+class AdaptiveConcurrencyLimit:
+    """
+    Concurrency limit that follows measured latency (AIMD).
+
+    While latency stays under target_latency and the limit is in
+    use, it grows by about one per limit completions; a completion
+    over target shrinks it by backoff (at most once per
+    target_latency, so one slow burst is one decrease).
+
+    Requests over the limit wait in a short FIFO queue: at most
+    max_queue of them, for at most queue_timeout seconds. Anything
+    else is rejected at once, so clients get a fast 503 instead of
+    queueing behind work that cannot finish in time.
+
+    Runs on the server's event loop; not thread-safe.
+    """
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        target_latency: float = 2.0,
+        max_queue: int = 16,
+        queue_timeout: float = 1.0,
+        backoff: float = 0.9,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded("too many requests in flight", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over as the timeout fired
+                self.admitted += 1
+                return
+            self.rejected += 1
+            raise Overloaded("queue wait timed out", self.retry_after())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # client went away after being handed a slot
+                self.in_flight -= 1
+                self._wake()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+        self.admitted += 1
+
+    def release(self, latency: float) -> None:
+        self._observe(latency)
+        self.in_flight -= 1
+        self._wake()
+
+    def retry_after(self) -> float:
+        # time for the queue ahead to drain at the current limit
+        latency = self.latency if self.latency is not None else self.target_latency
+        return latency * (len(self._waiters) + 1) / max(1, int(self.limit))
+
+    def _observe(self, latency: float) -> None:
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+        now = time.monotonic()
+        if latency > self.target_latency:
+            if now - self._last_decrease >= self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight >= int(self.limit):
+            # only grow a limit that is actually reached
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued_now": len(self._waiters),
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "target_latency_ms": round(self.target_latency * 1000, 1),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionController:
+    """
+    Per-client rate limit, then the adaptive concurrency limit.
+    """
+
+    def __init__(self, rate_limiter: RateLimiter, concurrency: AdaptiveConcurrencyLimit):
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            RateLimiter(
+                rate=float(os.getenv("MIMIR_RATE_PER_CLIENT", "2")),
+                burst=float(os.getenv("MIMIR_RATE_BURST", "10")),
+            ),
+            AdaptiveConcurrencyLimit(
+                initial=int(os.getenv("MIMIR_CONCURRENCY_INITIAL", "8")),
+                min_limit=int(os.getenv("MIMIR_CONCURRENCY_MIN", "1")),
+                max_limit=int(os.getenv("MIMIR_CONCURRENCY_MAX", "64")),
+                target_latency=float(os.getenv("MIMIR_TARGET_LATENCY_MS", "2000")) / 1000,
+                max_queue=int(os.getenv("MIMIR_ADMISSION_QUEUE", "16")),
+                queue_timeout=float(os.getenv("MIMIR_ADMISSION_QUEUE_TIMEOUT_MS", "1000")) / 1000,
+            ),
+        )
+
+    async def admit(self, client: str) -> None:
+        self.rate_limiter.check(client)
+        await self.concurrency.acquire()
+
+    def release(self, latency: float) -> None:
+        self.concurrency.release(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_limit": self.rate_limiter.stats(),
+            "concurrency": self.concurrency.stats(),
+        }
+
+
+# ======================
+# EXPENSIVE CALLS
+# ======================
+class CallLimiter:
+    """
+    Non-blocking cap on concurrent calls plus a shared token bucket,
+    for expensive downstream calls (the web fallback). Called from
+    worker threads.
+    """
+
+    def __init__(self, max_in_flight: int, rate: float, burst: float):
+        self.max_in_flight = max_in_flight
+        self._bucket = TokenBucket(rate, max(1.0, burst)) if rate > 0 else None
+        self._lock = threading.Lock()
+
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.calls = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, prefix: str, max_in_flight: int, rate: float, burst: float) -> "CallLimiter":
+        return cls(
+            max_in_flight=int(os.getenv(f"{prefix}_MAX_IN_FLIGHT", str(max_in_flight))),
+            rate=float(os.getenv(f"{prefix}_RATE", str(rate))),
+            burst=float(os.getenv(f"{prefix}_BURST", str(burst))),
+        )
+
+    @contextmanager
+    def admit(self):
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                raise Overloaded(
+                    "web search busy", self.latency if self.latency is not None else 1.0
+                )
+            wait = self._bucket.take() if self._bucket is not None else 0.0
+            if wait:
+                self.rejected += 1
+                raise Overloaded("web search rate limit exceeded", wait)
+            self.in_flight += 1
+            self.calls += 1
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.in_flight -= 1
+                self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "rate_per_second": self._bucket.rate if self._bucket is not None else 0,
+            "calls": self.calls,
+            "rejected": self.rejected,
+        }
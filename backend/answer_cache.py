@@ -0,0 +1,239 @@
+# backend/answer_cache.py
+
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from rag.stop_words import ENGLISH_STOP_WORDS
+
+# stop words that flip a question's meaning; the embedders drop them
+NEGATIONS = frozenset(
+    {"no", "nor", "not", "never", "none", "nothing", "neither", "without", "cannot"}
+)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def query_terms(text: str) -> Tuple[str, ...]:
+    """
+    The query's content words and negations, in order: what two
+    questions must share to share a cached answer.
+    """
+    text = re.sub(r"n't\b", " not", text.lower())
+    return tuple(
+        t for t in _TOKEN_RE.findall(text)
+        if t in NEGATIONS or t not in ENGLISH_STOP_WORDS
+    )
+
+
+class SemanticAnswerCache:
+    """
+    Final answers keyed by query embedding.
+
+    A lookup scores the query vector against every cached vector in
+    one matrix-vector product and returns the best answer from the
+    same scope (persona, mode, filters, corpus version) if its cosine
+    similarity reaches the caller's threshold. Paraphrases that embed
+    alike share one answer; a new corpus version starts a new scope,
+    so stale answers are never served and simply age out.
+
+    Embeddings lose word order and negation ("is X safe" and "is X
+    not safe" embed alike), so callers also pass the query's terms
+    (query_terms): an entry is only served for the same terms in the
+    same order.
+
+    Capacity is fixed: the least recently used entry is evicted.
+    Entries also expire after ttl seconds.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, ttl: Optional[float] = None):
+        self.capacity = capacity if capacity is not None else int(
+            os.getenv("MIMIR_ANSWER_CACHE_SIZE", "1024")
+        )
+        self.ttl = ttl if ttl is not None else float(
+            os.getenv("MIMIR_ANSWER_CACHE_TTL", "3600")
+        )
+
+        self._lock = threading.Lock()
+        # allocated on the first store, once the dimension is known
+        self._vectors: Optional[np.ndarray] = None
+        self._scopes = np.full(self.capacity, -1, dtype=np.int64)
+        self._stored_at = np.zeros(self.capacity, dtype=np.float64)
+        self._last_used = np.zeros(self.capacity, dtype=np.int64)
+        # hash of each entry's query terms
+        self._terms = np.zeros(self.capacity, dtype=np.int64)
+        self._answers: List[Optional[Dict[str, Any]]] = [None] * self.capacity
+        self._scope_ids: Dict[Hashable, int] = {}
+        self._next_scope = 0
+        self._clock = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    # ======================
+    # LOOKUP / STORE
+    # ======================
+    def lookup(
+        self,
+        vector,
+        scope: Hashable,
+        min_score: float,
+        terms: Tuple[str, ...] = (),
+    ) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+
+        q = np.asarray(vector, dtype=np.float32).ravel()
+
+        with self._lock:
+            sid = self._scope_ids.get(scope)
+            if sid is None or self._vectors is None or q.shape[0] != self._vectors.shape[1]:
+                self.misses += 1
+                return None
+
+            scores = self._vectors @ q
+            valid = (
+                (self._scopes == sid)
+                & (self._terms == hash(terms))
+                & (self._stored_at > time.time() - self.ttl)
+            )
+            scores[~valid] = -1.0
+            slot = int(np.argmax(scores))
+
+            if scores[slot] < min_score:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            answer = self._answers[slot]
+            age = time.time() - self._stored_at[slot]
+
+        return {
+            **answer,
+            "metadata": {
+                **(answer.get("metadata") or {}),
+                "cache": {
+                    "hit": True,
+                    "score": round(float(scores[slot]), 4),
+                    "age_seconds": round(float(age), 1),
+                },
+            },
+        }
+
+    def store(
+        self,
+        vector,
+        scope: Hashable,
+        answer: Dict[str, Any],
+        terms: Tuple[str, ...] = (),
+    ) -> None:
+        if not self.enabled:
+            return
+
+        v = np.asarray(vector, dtype=np.float32).ravel()
+
+        with self._lock:
+            if self._vectors is None or v.shape[0] != self._vectors.shape[1]:
+                # first store, or the embedder changed: start over
+                self._reset(v.shape[0])
+
+            sid = self._scope_ids.get(scope)
+            if sid is None:
+                sid = self._new_scope(scope)
+
+            # same question again → overwrite, else a free or LRU slot
+            same = np.flatnonzero((self._scopes == sid) & (self._terms == hash(terms)))
+            if len(same):
+                sims = self._vectors[same] @ v
+                if sims.max() >= 0.999:
+                    slot = int(same[int(np.argmax(sims))])
+                else:
+                    slot = self._free_slot()
+            else:
+                slot = self._free_slot()
+
+            self._clock += 1
+            self._vectors[slot] = v
+            self._scopes[slot] = sid
+            self._terms[slot] = hash(terms)
+            self._stored_at[slot] = time.time()
+            self._last_used[slot] = self._clock
+            self._answers[slot] = answer
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vectors = None
+            self._scopes[:] = -1
+            self._answers = [None] * self.capacity
+            self._scope_ids = {}
+
+    # ======================
+    # SLOTS / SCOPES
+    # ======================
+    def _reset(self, dim: int) -> None:
+        self._vectors = np.zeros((self.capacity, dim), dtype=np.float32)
+        self._scopes[:] = -1
+        self._answers = [None] * self.capacity
+        self._scope_ids = {}
+
+    def _free_slot(self) -> int:
+        free = np.flatnonzero(self._scopes < 0)
+        if len(free):
+            return int(free[0])
+
+        # expired entries first, then least recently used
+        expired = self._stored_at <= time.time() - self.ttl
+        if expired.any():
+            return int(np.flatnonzero(expired)[0])
+        return int(np.argmin(self._last_used))
+
+    def _new_scope(self, scope: Hashable) -> int:
+        if len(self._scope_ids) >= self.capacity:
+            # forget scopes that no longer own any entry
+            live = set(self._scopes[self._scopes >= 0].tolist())
+            self._scope_ids = {s: i for s, i in self._scope_ids.items() if i in live}
+
+        sid = self._next_scope
+        self._next_scope += 1
+        self._scope_ids[scope] = sid
+        return sid
+
+    # ======================
+    # STATS
+    # ======================
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = int((self._scopes >= 0).sum())
+            scopes = len(self._scope_ids)
+
+        total = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "entries": entries,
+            "scopes": scopes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "ttl_seconds": self.ttl,
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        vectors = self._vectors.nbytes if self._vectors is not None else 0
+        answers = sum(len(a.get("answer", "")) for a in self._answers if a)
+        usage = {
+            "vectors_bytes": int(vectors),
+            "answers_bytes": answers,
+            "entries": int((self._scopes >= 0).sum()),
+        }
+        usage["total"] = usage["vectors_bytes"] + usage["answers_bytes"]
+        return usage
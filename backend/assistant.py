@@ -1,43 +1,85 @@
+import os
 import re
 import ast
+import json
+import hashlib
 import operator
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-from rag.embeddings import EmbeddingModel
-from rag.retrieve import Retriever
+from rag.embeddings import HashingEmbeddingModel
+from rag.embedding_cache import CachedEmbeddingBackend, default_embedding_cache
+from rag.sharding import ShardPolicy
+from rag.single_flight import SingleFlight
+from rag.snapshots import SnapshotManager, SnapshotStore
+from rag.snippets import SnippetExtractor
+from backend.admission import CallLimiter
 from backend.file_qa.file_qa import FileQASystem
 from backend.personas import PersonaManager
 from backend.web_search import WebSearchQA
+from backend.web_knowledge import WebKnowledge
+from backend.answer_cache import SemanticAnswerCache, query_terms
+from backend.modes import ModeManager
+from backend.query_context import Conversation, ConversationCache
+from backend.matcher import INTENT_MATCHER
 
 
 class MimirAssistant:
     def __init__(self):
-        self.embedder = EmbeddingModel()
-        self.retriever = Retriever(self.embedder)
+        # stateless embeddings: turn vectors stay comparable across turns
+        self.embedder = CachedEmbeddingBackend(
+            HashingEmbeddingModel(), default_embedding_cache()
+        )
+        # versioned domain indices, hot-swapped on reload
+        self.indices = SnapshotManager(
+            SnapshotStore(os.getenv("MIMIR_INDEX_DIR", "data/indices")),
+            shard_policy=ShardPolicy.from_env(),
+        )
+        # best sentences of the top chunks instead of whole chunks
+        self.snippets = SnippetExtractor(self.embedder)
         self.file_qa = FileQASystem()
         self.persona_manager = PersonaManager()
         self.web_search = WebSearchQA()
+        # web calls are the slowest path: their own concurrency and rate
+        self.web_limit = CallLimiter.from_env(
+            "MIMIR_WEB", max_in_flight=4, rate=1.0, burst=5
+        )
+        # web answers written through to a local, TTL-bound domain
+        self.web_knowledge = WebKnowledge(self.embedder)
+        # final answers for near-identical queries, per mode threshold
+        self.answer_cache = SemanticAnswerCache()
+        self.modes = ModeManager()
+        # in-flight answers and web calls, shared by identical requests
+        self.flights = SingleFlight()
 
         # 🔹 short-term conversational memory (last N turns)
-        self.memory: List[Dict[str, str]] = []
         self.MAX_MEMORY = 8
 
+        # 🔹 per-session memory and contextual query vector (one embed per turn)
+        self.conversations = ConversationCache(self.embedder, max_turns=self.MAX_MEMORY)
+
     # =========================
     # MAIN QUERY (SINGLE INPUT)
     # =========================
-    def query(self, text: str, persona="default", mode="factual"):
+    def query(
+        self,
+        text: str,
+        persona="default",
+        mode="factual",
+        filters: Optional[Dict] = None,
+        conversation: Optional[Conversation] = None,
+    ):
+        """
+        Answer one message. conversation carries the session's
+        memory; without one the query is answered on its own.
+        """
+        conversation = conversation or self.conversations.get(None)
         text = text.strip()
-        text_lower = text.lower()
+
+        # single pass over the text for every shortcut intent
+        intents = INTENT_MATCHER.categories(text)
 
         # 🔮 Creator question shortcut
-        if any(q in text_lower for q in [
-            "who is your creator",
-            "who created you",
-            "who made you",
-            "who developed you",
-            "your creator",
-            "who built you",
-        ]):
+        if "creator" in intents:
             return {
                 "answer": "I was created and architected by Kalpesh Sharma.",
                 "sources": [],
@@ -45,12 +87,7 @@ class MimirAssistant:
             }
 
         # 🎓 Major project presentation shortcut
-        if any(q in text_lower for q in [
-            "who got 0 marks in major project presentation",
-            "who got zero marks in major project",
-            "0 marks in major project presentation",
-            "zero marks in major project presentation",
-        ]):
+        if "major_project" in intents:
             return {
                 "answer": (
                     "Kshitij Sidana got 0 marks by Dr. Kango "
@@ -69,7 +106,7 @@ class MimirAssistant:
             }
 
         # store user turn
-        self._add_memory("user", text)
+        conversation.add("user", text)
 
         # math fast-path
         expr = self._extract_math_expression(text)
@@ -80,107 +117,171 @@ class MimirAssistant:
                 "confidence": 1.0,
             }
 
+        # 🔹 contextual query from recency-weighted turn vectors
+        query_vec = conversation.query_vector()
+        # one snapshot for the whole query, even if a reload lands mid-way
+        snapshot = self.indices.current
+
+        # answer cache: same scope, same terms, near-identical query vector
+        scope = self._cache_scope(persona, mode, filters, snapshot)
+        cached = self.answer_cache.lookup(
+            query_vec, scope, self._cache_threshold(mode), query_terms(text)
+        )
+        if cached:
+            conversation.add("mimir", cached["answer"])
+            return cached
+
+        # identical concurrent queries share one computation
+        key = (
+            "answer",
+            scope,
+            " ".join(text.lower().split()),
+            hashlib.sha1(query_vec.tobytes()).hexdigest(),
+        )
+        result = self.flights.do(
+            key, self._answer_and_cache, text, persona, filters, query_vec, snapshot, scope
+        )
+        conversation.add("mimir", result["answer"])
+        return result
+
+    def _answer_and_cache(self, text: str, persona, filters, query_vec, snapshot, scope):
+        result = self._answer(text, persona, filters, query_vec, snapshot)
+        if result.get("confidence", 0) >= 0.5:
+            # failed lookups are not cached: the next attempt may succeed
+            self.answer_cache.store(query_vec, scope, result, query_terms(text))
+        return result
+
+    def _answer(self, text: str, persona, filters, query_vec, snapshot):
+        """
+        File QA, then the domain indices, then web knowledge and the web.
+        """
         # file QA
         if self.file_qa.has_files():
-            result = self.file_qa.answer(text)
-            self._add_memory("mimir", result["answer"])
-            return result
+            result = self.file_qa.answer(text, filters=filters)
+            # a filter that excludes every uploaded file falls through
+            # to the domain indices
+            if result["sources"] or not filters:
+                return result
 
         persona_contract = self.persona_manager.load(persona)
 
-        # 🔹 build contextual query from memory
-        contextual_query = "\n".join(
-            f"{m['role'].capitalize()}: {m['content']}"
-            for m in self.memory
-        )
-
-        query_vec = self.embedder.embed(contextual_query)[0]
-        results = self.retriever.retrieve(query_vec)
+        results, shards = snapshot.search(query_vec, query_text=text, filters=filters)
 
         if results:
-            context = "\n\n".join(r["text"] for r in results)
-            self._add_memory("mimir", context)
+            context, citations = self.snippets.extract(text, results)
+            metadata = {"citations": citations}
+            if shards and (shards["dropped"] or shards["failed"]):
+                # partial answer: some shards missed the deadline
+                metadata["shards"] = shards
             return {
                 "answer": context,
-                "sources": list({r["metadata"]["source"] for r in results}),
+                "sources": list({
+                    src
+                    for r in results
+                    for src in r["metadata"].get("sources", [r["metadata"]["source"]])
+                }),
                 "confidence": 0.9,
+                "metadata": metadata,
             }
 
-        # web fallback
-        web = self.web_search.search(text)
+        # earlier web answers to a similar question, while fresh
+        known = self.web_knowledge.lookup(text)
+        if known:
+            return known
+
+        # web fallback: one external call per burst of the same question
+        web = self.flights.do(
+            ("web", " ".join(text.lower().split())), self._web_search, text
+        )
         if web:
-            self._add_memory("mimir", web["answer"])
             return web
 
-        fallback = "The realms are silent… the connection failed."
-        self._add_memory("mimir", fallback)
         return {
-            "answer": fallback,
+            "answer": "The realms are silent… the connection failed.",
             "sources": [],
             "confidence": 0.2,
         }
 
+    def _web_search(self, text: str):
+        # raises Overloaded when the web path is saturated
+        with self.web_limit.admit():
+            web = self.web_search.search(text)
+        if web:
+            self.web_knowledge.remember(text, web)
+        return web
+
+    def _cache_scope(self, persona, mode, filters, snapshot):
+        # a cached answer is only valid for the corpus it came from
+        corpus = (tuple(sorted(snapshot.versions.items())), self.file_qa.version)
+        return (persona, mode, json.dumps(filters or {}, sort_keys=True, default=str), corpus)
+
+    def _cache_threshold(self, mode: str) -> float:
+        return self.modes.load(mode).get("answer_cache", {}).get("min_similarity", 0.9)
+
     # =========================
     # MEMORY-AWARE QUERY
     # =========================
-    def query_with_memory(self, messages: List[Dict], persona="default", mode="factual"):
+    def query_with_memory(
+        self,
+        messages: List[Dict],
+        persona="default",
+        mode="factual",
+        filters: Optional[Dict] = None,
+        session_id: Optional[str] = None,
+    ):
+        """
+        Answer the last user message given the conversation so far.
+        session_id keeps the session's turn vectors between requests;
+        None answers from messages alone.
+        """
         if not messages:
             return {
                 "answer": "No input provided.",
                 "confidence": 0.2,
             }
 
-        # sync memory from frontend
-        self.memory = messages[-self.MAX_MEMORY:]
+        conversation = self.conversations.get(session_id)
+        with conversation.lock:
+            # sync memory from frontend
+            conversation.sync(messages)
 
-        last_user_msg = next(
-            (m["content"] for m in reversed(messages) if m["role"] == "user"),
-            "",
-        )
+            last_user_msg = next(
+                (m["content"] for m in reversed(messages) if m["role"] == "user"),
+                "",
+            )
 
-        # 🔮 MEMORY-INTENT DETECTION
-        if self._is_memory_question(last_user_msg):
-            recalled = [
-                m["content"]
-                for m in self.memory
-                if m["role"] == "user"
-            ]
-
-            if len(recalled) <= 1:
-                answer = "We have only just begun speaking."
-            else:
-                answer = (
-                    "Earlier, you spoke of: "
-                    + "; ".join(recalled[:-1])
-                )
+            # 🔮 MEMORY-INTENT DETECTION
+            if self._is_memory_question(last_user_msg):
+                recalled = [
+                    m["content"]
+                    for m in conversation.messages
+                    if m["role"] == "user"
+                ]
 
-            self._add_memory("mimir", answer)
-            return {
-                "answer": answer,
-                "confidence": 0.95,
-            }
+                if len(recalled) <= 1:
+                    answer = "We have only just begun speaking."
+                else:
+                    answer = (
+                        "Earlier, you spoke of: "
+                        + "; ".join(recalled[:-1])
+                    )
+
+                conversation.add("mimir", answer)
+                return {
+                    "answer": answer,
+                    "confidence": 0.95,
+                }
 
-        # otherwise continue normally
-        return self.query(last_user_msg, persona, mode)
+            # otherwise continue normally
+            return self.query(
+                last_user_msg, persona, mode, filters=filters, conversation=conversation
+            )
 
     # =========================
     # MEMORY HELPERS
     # =========================
-    def _add_memory(self, role: str, content: str):
-        self.memory.append({"role": role, "content": content})
-        self.memory = self.memory[-self.MAX_MEMORY:]
-
     def _is_memory_question(self, text: str) -> bool:
-        triggers = [
-            "remember",
-            "earlier",
-            "before",
-            "last time",
-            "previous",
-            "you said",
-            "we talked",
-        ]
-        return any(t in text.lower() for t in triggers)
+        return "memory_question" in INTENT_MATCHER.categories(text)
 
     # =========================
     # MATH UTILITIES
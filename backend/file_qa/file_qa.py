@@ -1,48 +1,154 @@
-from typing import List, Dict, Any
+import re
+import codecs
+import hashlib
+import threading
+import time
+from typing import Callable, List, Dict, Any, Optional, Set
 from pathlib import Path
 
 from backend.file_qa.index import FileFaissIndex
+from rag.dedup import collapse_duplicates
+from rag.snippets import SnippetExtractor, sentence_offsets
+from rag.text_arena import TextArena
+
+
+ProgressFn = Callable[..., None]
+
+# Bytes decoded per step when chunking a file
+READ_BLOCK_BYTES = 1 << 20
+
+_TRAILING_WORD_RE = re.compile(r"\S+\Z")
 
 
 class FileQASystem:
     """
     Handles document ingestion and question answering over uploaded files.
+
+    Uploaded files accumulate into one corpus. Each ingest builds a
+    fresh index off to the side and publishes it with a single
+    reference swap, so queries answer from the previous index until
+    the new one is complete.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        dedup: bool = True,
+        snippet_chars: Optional[int] = 800,
+        snippet_tokens: Optional[int] = None,
+    ):
         self.index = FileFaissIndex()
+        self.dedup = dedup
+        # None → answer with whole chunks
+        self.snippet_chars = snippet_chars
+        self.snippet_tokens = snippet_tokens
+        self.last_ingest_stats: Dict[str, Any] = {}
         self._files_loaded = False
 
+        # committed corpus (before dedup, compressed) and its file hashes
+        self._texts = TextArena()
+        self._metadatas: List[Dict[str, Any]] = []
+        self._digests: Set[str] = set()
+        # writers only: serializes ingests / guards the publish step
+        self._ingest_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        # bumped by clear() so in-flight ingests are dropped
+        self._generation = 0
+        # registry generation this index reflects (see sync)
+        self.synced_generation: Optional[int] = None
+        # bumped whenever the answerable corpus changes (cache scoping)
+        self.version = 0
+
     # ======================
     # FILE INGESTION
     # ======================
-    def ingest_files(self, file_paths: List[str]):
-        texts = []
-        metadatas = []
+    def ingest_files(
+        self,
+        file_paths: List[str],
+        names: Optional[List[str]] = None,
+        progress: Optional[ProgressFn] = None,
+        digests: Optional[List[str]] = None,
+    ):
+        """
+        Add files to the corpus and publish a rebuilt index.
 
-        for path in file_paths:
-            p = Path(path)
-            if not p.exists():
-                continue
+        names optionally overrides the source name shown for each
+        path. progress, if given, is called with keyword updates.
+        Files whose content (sha256, from digests or computed while
+        reading) is already indexed are skipped.
+        """
+        generation = self._generation
+        report = progress or (lambda **_: None)
 
-            content = p.read_text(encoding="utf-8", errors="ignore")
+        with self._ingest_lock:
+            texts, metadatas, new_digests = self._read_files(
+                file_paths, names, digests, report
+            )
 
-            # Simple chunking (safe + fast)
-            chunks = self._chunk_text(content)
+            corpus_texts = list(self._texts) + texts
+            corpus_meta = self._metadatas + metadatas
 
-            for c in chunks:
-                texts.append(c)
-                metadatas.append({"source": p.name})
+            report(stage="indexing", chunks=len(corpus_texts))
+
+            index_texts, index_meta = corpus_texts, corpus_meta
+            stats: Dict[str, Any] = {"chunks_in": len(corpus_texts)}
+            if corpus_texts and self.dedup:
+                # Boilerplate / repeated sections collapse to one vector
+                index_texts, index_meta, stats = collapse_duplicates(
+                    corpus_texts, corpus_meta
+                )
+            stats["files_skipped"] = len(file_paths) - len(new_digests)
+
+            index = FileFaissIndex()
+            if index_texts:
+                index.build(index_texts, index_meta)
+            corpus = TextArena(corpus_texts)
 
-        if texts:
-            self.index.build(texts, metadatas)
-            self._files_loaded = True
+            with self._commit_lock:
+                if generation != self._generation:
+                    # cleared while this ingest was running
+                    return {**stats, "discarded": True}
+
+                self._texts, self._metadatas = corpus, corpus_meta
+                self._digests |= new_digests
+                self.index = index
+                self._files_loaded = bool(index_texts)
+                self.version += 1
+                self.last_ingest_stats = stats
+
+        report(stage="committed")
+        return stats
+
+    def sync(self, files: List[Dict[str, Any]], generation: int):
+        """
+        Bring the index in line with a shared file registry (entries
+        with digest, name and path). Files another worker ingested are
+        added; if files were removed, the index is rebuilt from the
+        registry. Unchanged content is never re-embedded.
+        """
+        wanted = {f["digest"] for f in files}
+
+        if self._digests - wanted:
+            self.clear()
+
+        missing = [f for f in files if f["digest"] not in self._digests]
+        stats: Dict[str, Any] = {}
+        if missing:
+            stats = self.ingest_files(
+                [f["path"] for f in missing],
+                names=[f["name"] for f in missing],
+                digests=[f["digest"] for f in missing],
+            )
+
+        self.synced_generation = generation
+        return stats
 
     # ======================
     # ANSWER
     # ======================
-    def answer(self, query: str) -> Dict[str, Any]:
-        results = self.index.search(query)
+    def answer(self, query: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # one index for the whole answer, even if an ingest commits meanwhile
+        index = self.index
+        results = index.search(query, filters=filters)
 
         if not results:
             return {
@@ -51,12 +157,31 @@ class FileQASystem:
                 "confidence": 0.3,
             }
 
-        context = "\n\n".join(r["text"] for r in results)
+        sources = list({
+            src
+            for r in results
+            for src in r["metadata"].get("sources", [r["metadata"]["source"]])
+        })
+
+        if self.snippet_chars is None:
+            return {
+                "answer": "\n\n".join(r["text"] for r in results),
+                "sources": sources,
+                "confidence": 0.9,
+            }
+
+        extractor = SnippetExtractor(
+            index.embedder,
+            budget_chars=self.snippet_chars,
+            budget_tokens=self.snippet_tokens,
+        )
+        answer, citations = extractor.extract(query, results)
 
         return {
-            "answer": context,
-            "sources": list({r["metadata"]["source"] for r in results}),
+            "answer": answer,
+            "sources": sources,
             "confidence": 0.9,
+            "metadata": {"citations": citations},
         }
 
     # ======================
@@ -65,18 +190,141 @@ class FileQASystem:
     def has_files(self) -> bool:
         return self._files_loaded
 
-    def _chunk_text(self, text: str, size: int = 500) -> List[str]:
-        words = text.split()
-        chunks = []
+    def is_ingested(self, digest: str) -> bool:
+        return digest in self._digests
+
+    def memory_usage(self) -> Dict[str, int]:
+        usage = dict(self.index.memory_usage())
+        # raw corpus kept for rebuilds on the next ingest
+        usage["corpus_bytes"] = self._texts.memory_usage()["total"]
+        usage["total"] += usage["corpus_bytes"]
+        return usage
+
+    def _read_files(self, file_paths, names, digests, report):
+        texts = []
+        metadatas = []
+        new_digests: Set[str] = set()
+        ingested_at = time.time()
+
+        for n, path in enumerate(file_paths):
+            p = Path(path)
+            report(stage="reading", files_done=n, files_total=len(file_paths))
+            if not p.exists():
+                continue
+
+            known = self._digests | new_digests
+            if digests and digests[n] in known:
+                continue
+
+            pages: Optional[List[int]] = None
+            if _is_pdf(p):
+                digest = _file_digest(p)
+                if digest in known:
+                    continue
+                chunks, pages = self._pdf_chunks(p)
+            else:
+                # Simple chunking (safe + fast), streamed block by block
+                chunks, digest = self._stream_chunks(p)
+                if digest in known:
+                    continue
+            new_digests.add(digest)
+
+            source = names[n] if names else p.name
+            for i, c in enumerate(chunks):
+                meta = {
+                    "source": source,
+                    "chunk": i,
+                    "digest": digest,
+                    "ingested_at": ingested_at,
+                    "sentences": sentence_offsets(c),
+                }
+                if pages:
+                    # 1-based, filterable (see rag.filters)
+                    meta["page"] = pages[i]
+                texts.append(c)
+                metadatas.append(meta)
+
+        report(files_done=len(file_paths), files_total=len(file_paths))
+        return texts, metadatas, new_digests
+
+    def _stream_chunks(self, path: Path, size: int = 500):
+        """
+        Split a file into size-word chunks without loading it whole.
+        Returns (chunks, sha256 of the raw bytes).
+        """
+        digest = hashlib.sha256()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        chunks: List[str] = []
+        words: List[str] = []
+        carry = ""
+
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(READ_BLOCK_BYTES)
+                digest.update(block)
+                text = carry + decoder.decode(block, final=not block)
+
+                # a word may continue into the next block
+                carry = ""
+                tail = _TRAILING_WORD_RE.search(text) if block else None
+                if tail:
+                    text, carry = text[:tail.start()], tail.group()
 
-        for i in range(0, len(words), size):
-            chunk = " ".join(words[i:i + size])
-            chunks.append(chunk)
+                words.extend(text.split())
+                full = len(words) - len(words) % size
+                for i in range(0, full, size):
+                    chunks.append(" ".join(words[i:i + size]))
+                words = words[full:]
 
-        return chunks
-        # ======================
+                if not block:
+                    break
+
+        if words:
+            chunks.append(" ".join(words))
+
+        return chunks, digest.hexdigest()
+
+    def _pdf_chunks(self, path: Path, size: int = 500):
+        """
+        Split each PDF page's text into size-word chunks; chunks never
+        span pages. Returns (chunks, page number of each chunk).
+        """
+        # PyPDF2 is only imported for the first PDF
+        from PyPDF2 import PdfReader
+
+        chunks: List[str] = []
+        pages: List[int] = []
+        for number, page in enumerate(PdfReader(str(path)).pages, start=1):
+            words = (page.extract_text() or "").split()
+            for i in range(0, len(words), size):
+                chunks.append(" ".join(words[i:i + size]))
+                pages.append(number)
+
+        return chunks, pages
+
+    # ======================
     # CLEAR FILES
     # ======================
     def clear(self):
-        self.index = FileFaissIndex()
-        self._files_loaded = False
+        with self._commit_lock:
+            self._generation += 1
+            self._texts, self._metadatas = TextArena(), []
+            self._digests = set()
+            self.index = FileFaissIndex()
+            self._files_loaded = False
+            self.last_ingest_stats = {}
+            self.version += 1
+
+
+def _is_pdf(path: Path) -> bool:
+    # stored uploads are named by hash, so go by content
+    with open(path, "rb") as f:
+        return f.read(5) == b"%PDF-"
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
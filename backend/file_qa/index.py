@@ -1,38 +1,175 @@
-from typing import List, Dict
-from rag.embeddings import EmbeddingModel
+import os
+import tempfile
+from typing import List, Dict, Optional
+from rag.embeddings import EmbeddingBackend, HashingEmbeddingModel
+from rag.embedding_cache import CachedEmbeddingBackend, default_embedding_cache
+from rag.bm25 import BM25Index
+from rag.filters import MetadataFilterIndex
+from rag.fusion import fuse, top_k_indices
+from rag.mmr import diversify
+from rag.quantization import CompressedVectors
+from rag.sizing import approx_sizeof
+from rag.text_arena import TextArena
 import numpy as np
 
 
 class FileFaissIndex:
     """
     Lightweight in-memory vector index (FAISS-like).
+
+    A BM25 inverted index is built alongside the vectors; search
+    fuses both rankings so exact keyword hits (API names, error
+    codes) are not lost to TF-IDF cosine.
+
+    Vectors are kept in a compressed encoding (float16 by default).
+    With rerank enabled, dense candidates are re-scored exactly
+    against full-precision vectors in a memory-mapped temp file, so
+    only the candidates' rows are paged in.
+
+    Results are diversified with MMR (mmr_lambda=None disables it).
+
+    Metadata filters (e.g. one uploaded file) select chunk ids first;
+    only those rows are scored.
+
+    Chunk texts are kept in a compressed TextArena.
     """
 
-    def __init__(self):
-        self.embedder = EmbeddingModel()
-        self.vectors = []
-        self.texts = []
+    def __init__(
+        self,
+        fusion: str = "rrf",
+        candidate_pool: int = 20,
+        encoding: str = "float16",
+        rerank: bool = True,
+        mmr_lambda: Optional[float] = 0.7,
+        embedder: Optional[EmbeddingBackend] = None,
+    ):
+        # Stateless hashing embeddings are content-addressable, so
+        # re-uploaded files and repeated questions hit the cache
+        self.embedder = embedder or CachedEmbeddingBackend(
+            HashingEmbeddingModel(), default_embedding_cache()
+        )
+        self.bm25 = BM25Index()
+        self.filters = MetadataFilterIndex()
+        self.fusion = fusion
+        self.candidate_pool = candidate_pool
+        self.rerank = rerank
+        self.mmr_lambda = mmr_lambda
+        self.vectors = CompressedVectors(encoding)
+        # full-precision vectors for re-rank / MMR (memory-mapped)
+        self.exact: Optional[np.ndarray] = None
+        self.texts = TextArena()
         self.metadatas = []
 
     def build(self, chunks: List[str], metadatas: List[Dict]):
-        self.vectors = self.embedder.embed_batch(chunks)
-        self.texts = chunks
+        self.embedder.reset_stats()
+        embeddings = np.asarray(self.embedder.embed_batch(chunks), dtype=np.float32)
+        self.vectors.fit(embeddings)
+        if self.rerank and self.vectors.encoding != "float32":
+            self.exact = _mmap_vectors(embeddings)
+        self.bm25.build(chunks)
+        self.filters.build(metadatas)
+        self.texts = TextArena(chunks)
         self.metadatas = metadatas
 
-    def search(self, query: str, top_k: int = 3):
-        if not self.vectors:
+    def search(self, query: str, top_k: int = 3, filters: Optional[Dict] = None):
+        if not len(self.vectors):
             return []
 
-        query_vec = self.embedder.embed(query)[0]
+        ids = self.filters.select(filters)
+        if ids is not None and not len(ids):
+            return []
+
+        pool = max(top_k, self.candidate_pool)
+
+        query_vec = np.asarray(self.embedder.embed_query(query)[0], dtype=np.float32)
+        sims = self.vectors.scores(query_vec, ids)
+        top = top_k_indices(sims, pool)
+        candidates = top if ids is None else ids[top]
+        sims = sims[top]
+
+        if self.exact is not None:
+            exact = self._exact_vectors(candidates) @ query_vec
+            order = np.argsort(-exact, kind="stable")
+            candidates, scores = candidates[order], exact[order]
+        else:
+            scores = sims
 
-        sims = np.dot(self.vectors, query_vec)
+        dense = [
+            (int(i), float(s))
+            for i, s in zip(candidates, scores)
+            if s > 0
+        ]
+
+        sparse = self.bm25.search(query, pool, ids=ids)
 
-        top_idx = sims.argsort()[-top_k:][::-1]
+        if self.mmr_lambda is None:
+            ranked = fuse([dense, sparse], top_k, method=self.fusion)
+        else:
+            # overlapping windows: diversify a wider fused pool
+            ranked = fuse([dense, sparse], pool, method=self.fusion)
+            vectors = self._exact_vectors([i for i, _ in ranked]) if ranked else None
+            ranked = diversify(ranked, vectors, top_k, self.mmr_lambda)
 
+        texts = self.texts.get_many([i for i, _ in ranked])
         return [
             {
-                "text": self.texts[i],
+                "text": text,
                 "metadata": self.metadatas[i],
             }
-            for i in top_idx
+            for text, (i, _) in zip(texts, ranked)
         ]
+
+    def _exact_vectors(self, ids) -> np.ndarray:
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.exact is not None:
+            return np.asarray(self.exact[ids], dtype=np.float32)
+        if self.vectors.encoding == "float32":
+            return self.vectors.codes[ids]
+        # compressed without re-rank: re-embed the few candidates
+        return np.asarray(
+            self.embedder.transform_batch(self.texts.get_many(ids)), dtype=np.float32
+        )
+
+    def memory_usage(self) -> Dict[str, int]:
+        usage = {
+            "vectors_bytes": self.vectors.nbytes,
+            # file-backed, paged in per candidate; not in total
+            "rerank_mapped_bytes": int(self.exact.nbytes) if self.exact is not None else 0,
+            "texts_bytes": self.texts.memory_usage()["total"],
+            "metadatas_bytes": approx_sizeof(self.metadatas),
+            "bm25_bytes": self.bm25.memory_usage()["total"],
+            "filters_bytes": self.filters.memory_usage()["total"],
+            "embedder_bytes": self.embedder.memory_usage()["total"],
+            "chunks": len(self.texts),
+        }
+        usage["total"] = (
+            usage["vectors_bytes"]
+            + usage["texts_bytes"]
+            + usage["metadatas_bytes"]
+            + usage["bm25_bytes"]
+            + usage["filters_bytes"]
+            + usage["embedder_bytes"]
+        )
+        return usage
+
+
+def _mmap_vectors(vectors: np.ndarray) -> np.ndarray:
+    """
+    Write vectors to a temp .npy file and memory-map it read-only.
+
+    The file is unlinked right away, so it goes away with the
+    mapping (POSIX; elsewhere it stays in the temp dir).
+    """
+    directory = os.getenv("MIMIR_FILE_VECTORS_DIR") or None
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".npy", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, vectors)
+        return np.load(path, mmap_mode="r")
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
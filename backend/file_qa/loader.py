@@ -1,5 +1,4 @@
 import os
-from PyPDF2 import PdfReader
 
 
 class FileLoadError(Exception):
@@ -43,6 +42,9 @@ class FileLoader:
                 return f.read()
 
         if file_path.lower().endswith(".pdf"):
+            # PyPDF2 is only imported for the first PDF
+            from PyPDF2 import PdfReader
+
             reader = PdfReader(file_path)
             pages = []
             for page in reader.pages:
@@ -0,0 +1,276 @@
+# backend/file_qa/storage.py
+
+import os
+import time
+import uuid
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, List, Optional
+
+from rag.wal import WalConnection
+
+
+# Bytes read and hashed per step while streaming an upload
+COPY_CHUNK_BYTES = 1 << 20
+
+
+class UploadTooLarge(Exception):
+    """
+    Raised while streaming an upload that exceeds the size limit.
+    """
+
+
+class StoredFile:
+    def __init__(self, digest: str, path: str, size: int, name: str, duplicate: bool):
+        self.digest = digest
+        self.path = path
+        self.size = size
+        self.name = name
+        # content was already stored before this upload
+        self.duplicate = duplicate
+        # this upload added the session's reference (vs. re-upload)
+        self.new_ref = True
+
+    def to_dict(self) -> Dict:
+        return {
+            "digest": self.digest,
+            "name": self.name,
+            "size": self.size,
+            "duplicate": self.duplicate,
+        }
+
+
+class UploadStore:
+    """
+    Content-addressed upload storage with reference counting.
+
+    Uploads are streamed to a temp file in fixed-size chunks and
+    hashed as they arrive; the size limit is checked per chunk, so
+    an oversized upload is rejected without being buffered. The
+    finished file is renamed to objects/<sha256[:2]>/<sha256>, so
+    identical content is stored once.
+
+    A SQLite (WAL) table records which sessions reference which
+    objects. Releasing a session deletes every object no other
+    session still references. The table doubles as the shared file
+    registry: every server worker sees the same session files, and
+    generation(session) changes whenever they do.
+
+    Publishing + referencing an object, and checking + deleting an
+    unreferenced one, each run in a single BEGIN IMMEDIATE
+    transaction. SQLite's write lock spans processes, so garbage
+    collection in one worker never deletes an object another worker
+    is about to reference.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        chunk_bytes: int = COPY_CHUNK_BYTES,
+    ):
+        self.root = root or os.getenv("MIMIR_UPLOAD_DIR", "uploaded_files")
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv("MIMIR_UPLOAD_MAX_BYTES", str(20 * 1024 * 1024))
+        )
+        self.chunk_bytes = chunk_bytes
+
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = WalConnection(
+            os.path.join(self.root, "refs.sqlite"),
+            schema=[
+                "CREATE TABLE IF NOT EXISTS refs ("
+                "session TEXT, digest TEXT, name TEXT, added_at REAL, "
+                "PRIMARY KEY (session, digest))",
+                # bumped on every change so workers can tell they are stale
+                "CREATE TABLE IF NOT EXISTS generations ("
+                "session TEXT PRIMARY KEY, gen INTEGER)",
+            ],
+        )
+
+    # ======================
+    # WRITING
+    # ======================
+    def put(self, fileobj: BinaryIO, name: str, session: str) -> StoredFile:
+        """
+        Stream fileobj into the store and reference it from session.
+        Raises UploadTooLarge.
+        """
+        tmp = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        digest = hashlib.sha256()
+        size = 0
+
+        try:
+            with open(tmp, "wb") as out:
+                while True:
+                    block = fileobj.read(self.chunk_bytes)
+                    if not block:
+                        break
+                    size += len(block)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(
+                            f"'{name}' exceeds the {self.max_bytes} byte upload limit"
+                        )
+                    digest.update(block)
+                    out.write(block)
+
+            key = digest.hexdigest()
+            path = self.object_path(key)
+
+            # publish + reference under the write lock: gc in another
+            # worker cannot delete the object in between
+            with self._transaction() as conn:
+                duplicate = os.path.exists(path)
+                if duplicate:
+                    os.remove(tmp)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp, path)
+
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO refs (session, digest, name, added_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (session, key, name, time.time()),
+                )
+                if cursor.rowcount > 0:
+                    self._bump(conn, session)
+
+            stored = StoredFile(key, path, size, name, duplicate=duplicate)
+            stored.new_ref = cursor.rowcount > 0
+            return stored
+
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    # ======================
+    # REFERENCES
+    # ======================
+    def release(self, session: str, digests: List[str]) -> List[str]:
+        """
+        Drop session references; returns digests whose objects were deleted.
+        """
+        with self._transaction() as conn:
+            conn.executemany(
+                "DELETE FROM refs WHERE session = ? AND digest = ?",
+                [(session, d) for d in digests],
+            )
+            self._bump(conn, session)
+        return self._collect(digests)
+
+    def release_session(self, session: str) -> List[str]:
+        with self._transaction() as conn:
+            digests = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT digest FROM refs WHERE session = ?", (session,)
+                )
+            ]
+            conn.execute("DELETE FROM refs WHERE session = ?", (session,))
+            self._bump(conn, session)
+        return self._collect(digests)
+
+    def session_files(self, session: str) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT digest, name, added_at FROM refs WHERE session = ? "
+                "ORDER BY added_at",
+                (session,),
+            ).fetchall()
+        return [
+            {"digest": d, "name": n, "added_at": t, "path": self.object_path(d)}
+            for d, n, t in rows
+        ]
+
+    def generation(self, session: str) -> int:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT gen FROM generations WHERE session = ?", (session,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, conn, session: str) -> None:
+        # inside a _transaction
+        conn.execute(
+            "INSERT INTO generations (session, gen) VALUES (?, 1) "
+            "ON CONFLICT(session) DO UPDATE SET gen = gen + 1",
+            (session,),
+        )
+
+    # ======================
+    # GARBAGE COLLECTION
+    # ======================
+    def gc(self) -> List[str]:
+        """
+        Full sweep: delete unreferenced objects and stale temp files
+        (e.g. left by a crash mid-upload).
+        """
+        stored = []
+        for prefix in os.listdir(self.objects_dir):
+            folder = os.path.join(self.objects_dir, prefix)
+            if os.path.isdir(folder):
+                stored.extend(os.listdir(folder))
+
+        cutoff = time.time() - 3600
+        for name in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+        return self._collect(stored)
+
+    def stats(self) -> Dict[str, int]:
+        objects = 0
+        total = 0
+        for prefix in os.listdir(self.objects_dir):
+            folder = os.path.join(self.objects_dir, prefix)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                objects += 1
+                total += os.path.getsize(os.path.join(folder, name))
+
+        with self._lock:
+            refs = self._db.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+
+        return {"objects": objects, "bytes": total, "references": refs}
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Write transaction holding SQLite's write lock, which is shared
+        by every process using the store.
+        """
+        with self._lock:
+            conn = self._db.conn
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                yield conn
+
+    def _collect(self, digests: List[str]) -> List[str]:
+        removed = []
+        # unreferenced check and delete under the same write lock as put()
+        with self._transaction() as conn:
+            for digest in set(digests):
+                (count,) = conn.execute(
+                    "SELECT COUNT(*) FROM refs WHERE digest = ?", (digest,)
+                ).fetchone()
+                if count:
+                    continue
+
+                path = self.object_path(digest)
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed.append(digest)
+
+        return removed
@@ -0,0 +1,170 @@
+# backend/jobs.py
+
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+
+class QueueFull(Exception):
+    """
+    Raised when a job is submitted while the pending queue is full.
+    """
+
+
+class Job:
+    """
+    One unit of background work and its progress.
+
+    The job function receives the Job and calls report() as it goes;
+    readers get a consistent copy through to_dict().
+    """
+
+    def __init__(self, kind: str, fn: Callable[["Job"], Any], payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.fn = fn
+        self.payload = payload
+
+        self.status = "queued"
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def report(self, **progress) -> None:
+        with self._lock:
+            self.progress = {**self.progress, **progress}
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                **self.payload,
+            }
+
+    def _run(self) -> None:
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+
+        try:
+            result = self.fn(self)
+            with self._lock:
+                self.result = result
+                self.status = "done"
+        except Exception as e:
+            with self._lock:
+                self.error = f"{type(e).__name__}: {e}"
+                self.status = "failed"
+        finally:
+            with self._lock:
+                self.finished_at = time.time()
+            self._done.set()
+
+
+class JobQueue:
+    """
+    Bounded background worker pool.
+
+    At most max_pending jobs wait in the queue; submit() raises
+    QueueFull beyond that instead of blocking the caller. Workers
+    are daemon threads started on first use. The last `retain`
+    jobs stay queryable by id.
+    """
+
+    def __init__(self, max_workers: int = 1, max_pending: int = 8, retain: int = 100):
+        self.max_workers = max(1, max_workers)
+        self.retain = retain
+
+        self._queue: "queue.Queue[Job]" = queue.Queue(maxsize=max(1, max_pending))
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+
+    # ======================
+    # SUBMISSION
+    # ======================
+    def submit(self, kind: str, fn: Callable[[Job], Any], **payload) -> Job:
+        job = Job(kind, fn, payload)
+
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise QueueFull(f"{self._queue.maxsize} jobs already pending")
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = list(self._jobs.values())[-limit:]
+        return [job.to_dict() for job in reversed(jobs)]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+
+        counts: Dict[str, int] = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+
+        return {"pending": self._queue.qsize(), "workers": len(self._workers), **counts}
+
+    # ======================
+    # WORKERS
+    # ======================
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                job._run()
+            finally:
+                self._queue.task_done()
+
+    def _evict(self) -> None:
+        # drop the oldest finished jobs beyond the retention window
+        excess = len(self._jobs) - self.retain
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].finished:
+                del self._jobs[job_id]
+                excess -= 1
@@ -0,0 +1,166 @@
+# backend/matcher.py
+
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+class PhraseMatcher:
+    """
+    Word-level Aho-Corasick automaton over categorized phrases.
+
+    Phrases and text are tokenized the same way, so matches always
+    fall on word boundaries ("who" does not match "whole"). One
+    left-to-right pass over the tokens reports every category hit.
+
+    The automaton state is a plain int, so callers can feed tokens
+    incrementally (e.g. streamed chunks) and carry the state over.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        # goto[state][token] -> state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # outputs[state] -> [(category, phrase), ...]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+
+        for category, phrases in categories.items():
+            for phrase in phrases:
+                self._insert(category, phrase)
+
+        self._build_failure_links()
+
+    # ======================
+    # SCANNING
+    # ======================
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """
+        Map each matching category to the phrases found in text.
+        """
+        found: Dict[str, List[str]] = {}
+        state = 0
+        for token in tokenize(text):
+            state = self.step(state, token)
+            for category, phrase in self._out[state]:
+                found.setdefault(category, []).append(phrase)
+        return found
+
+    def categories(self, text: str) -> Set[str]:
+        return set(self.scan(text))
+
+    def step(self, state: int, token: str) -> int:
+        while state and token not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(token, 0)
+
+    def outputs(self, state: int) -> List[Tuple[str, str]]:
+        return self._out[state]
+
+    # ======================
+    # BUILD
+    # ======================
+    def _insert(self, category: str, phrase: str) -> None:
+        tokens = tokenize(phrase)
+        if not tokens:
+            return
+
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+
+        self._out[state].append((category, phrase))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(token, 0)
+                if self._fail[nxt] == nxt:
+                    self._fail[nxt] = 0
+
+                # inherit matches that end at the failure state
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+
+# =========================
+# SHARED PHRASE SETS
+# =========================
+
+INTENT_PHRASES: Dict[str, List[str]] = {
+    # assistant shortcuts
+    "creator": [
+        "who is your creator",
+        "who created you",
+        "who made you",
+        "who developed you",
+        "your creator",
+        "who built you",
+    ],
+    "major_project": [
+        "who got 0 marks in major project presentation",
+        "who got zero marks in major project",
+        "0 marks in major project presentation",
+        "zero marks in major project presentation",
+    ],
+    "memory_question": [
+        "remember",
+        "earlier",
+        "before",
+        "last time",
+        "previous",
+        "you said",
+        "we talked",
+    ],
+    # router
+    "factual": [
+        "who", "when", "where", "won",
+        "president", "prime minister",
+        "winner", "result", "capital",
+        "population", "opposite",
+    ],
+    # validators
+    "speculative": [
+        "might be",
+        "could be",
+        "possibly",
+        "i think",
+        "it seems",
+    ],
+    "explanation": [
+        "because",
+        "this means",
+        "explanation",
+        "in summary",
+    ],
+    "empathy": [
+        "i’m sorry",
+        "that sounds",
+        "i understand",
+        "it’s okay to feel",
+        "you’re not alone",
+    ],
+}
+
+# Compiled once at import; shared by assistant, router and validators
+INTENT_MATCHER = PhraseMatcher(INTENT_PHRASES)
@@ -0,0 +1,152 @@
+# backend/memory_accounting.py
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from rag.embedding_cache import default_embedding_cache
+
+
+UsageFn = Callable[[], Dict[str, int]]
+SessionSizesFn = Callable[[], Dict[str, int]]
+
+
+class MemoryAccountant:
+    """
+    Aggregates approximate memory usage of registered components.
+
+    Components report their own breakdown through a callable that
+    returns a dict with at least a "total" key (bytes). Session
+    sources return {session_id: bytes}.
+
+    Each report is also recorded as a gauge sample, so /debug/memory
+    can show how totals evolve over time.
+    """
+
+    def __init__(self, history_size: int = 360):
+        self._components: Dict[str, UsageFn] = {}
+        self._session_sources: Dict[str, SessionSizesFn] = {}
+        self._history: deque = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    # ======================
+    # REGISTRATION
+    # ======================
+    def register(self, name: str, usage_fn: UsageFn) -> None:
+        self._components[name] = usage_fn
+
+    def register_sessions(self, name: str, sizes_fn: SessionSizesFn) -> None:
+        self._session_sources[name] = sizes_fn
+
+    # ======================
+    # REPORTING
+    # ======================
+    def report(self, top_n: int = 10) -> Dict[str, Any]:
+        components = {}
+        for name, usage_fn in list(self._components.items()):
+            try:
+                components[name] = usage_fn()
+            except Exception as exc:
+                # Never fail the whole report on one component
+                components[name] = {"total": 0, "error": str(exc)}
+
+        sessions = []
+        for source, sizes_fn in list(self._session_sources.items()):
+            try:
+                sizes = sizes_fn()
+            except Exception:
+                continue
+            for session_id, size in sizes.items():
+                sessions.append(
+                    {"source": source, "session_id": session_id, "bytes": size}
+                )
+
+        sessions.sort(key=lambda s: s["bytes"], reverse=True)
+        session_total = sum(s["bytes"] for s in sessions)
+
+        totals = {name: usage.get("total", 0) for name, usage in components.items()}
+        totals["sessions"] = session_total
+
+        self._record(totals)
+
+        return {
+            "total_bytes": sum(totals.values()),
+            "components": components,
+            "sessions": {
+                "count": len(sessions),
+                "total": session_total,
+                "top": sessions[:top_n],
+            },
+            "rss_bytes": self._rss_bytes(),
+        }
+
+    def history(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._history)
+
+    # ======================
+    # GAUGES
+    # ======================
+    def sample(self) -> None:
+        self.report(top_n=0)
+
+    def start_sampler(self, interval_seconds: float) -> None:
+        """
+        Record a gauge sample every interval_seconds in a daemon thread.
+        """
+        if interval_seconds <= 0 or self._sampler is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.sample()
+                except Exception:
+                    pass
+
+        self._sampler = threading.Thread(
+            target=loop, name="mimir-memory-sampler", daemon=True
+        )
+        self._sampler.start()
+
+    # ======================
+    # HELPERS
+    # ======================
+    def _record(self, totals: Dict[str, int]) -> None:
+        with self._lock:
+            self._history.append({"ts": time.time(), **totals})
+
+    def _rss_bytes(self) -> Optional[int]:
+        # Linux only; other platforms report None
+        try:
+            with open("/proc/self/statm") as f:
+                pages = int(f.read().split()[1])
+            return pages * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+
+
+def build_assistant_accountant(assistant) -> MemoryAccountant:
+    """
+    Wire the standard MimirAssistant structures into an accountant.
+
+    Attributes are resolved lazily so replaced objects (e.g. a fresh
+    file index after clear()) are always measured.
+    """
+    accountant = MemoryAccountant()
+
+    accountant.register("embedder", lambda: assistant.embedder.memory_usage())
+    accountant.register("indices", lambda: assistant.indices.memory_usage())
+    accountant.register("file_index", lambda: assistant.file_qa.memory_usage())
+    accountant.register("web_knowledge", lambda: assistant.web_knowledge.memory_usage())
+    accountant.register("answer_cache", lambda: assistant.answer_cache.memory_usage())
+    accountant.register(
+        "embedding_cache", lambda: default_embedding_cache().memory_usage()
+    )
+    accountant.register_sessions("conversation", assistant.conversations.sizes)
+
+    return accountant
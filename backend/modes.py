@@ -37,6 +37,10 @@ class ModeManager:
                     "refuse_if_no_sources": True,
                     "refuse_if_low_confidence": True,
                 },
+                # cosine needed to reuse a cached answer to another query
+                "answer_cache": {
+                    "min_similarity": 0.85,
+                },
                 "metadata": {
                     "label": "Factual Mode",
                     "description": "Grounded responses only. Refuses to answer without evidence.",
@@ -52,6 +56,9 @@ class ModeManager:
                 "refusal_policy": {
                     "refuse_if_no_sources": False,
                 },
+                "answer_cache": {
+                    "min_similarity": 0.75,
+                },
                 "metadata": {
                     "label": "Creative Mode",
                     "description": "Allows fictional, speculative, and imaginative responses.",
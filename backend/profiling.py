@@ -0,0 +1,168 @@
+# backend/profiling.py
+
+import os
+import re
+import random
+import cProfile
+import pstats
+import io
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+
+class RequestProfiler:
+    """
+    Opt-in per-request profiler.
+
+    A request is profiled when it carries the profile header or
+    falls inside the sampling rate. Profiles are written as
+    cProfile dumps named after the request id; each write prunes
+    dumps older than max_age seconds and all but the newest
+    max_files.
+
+    When disabled (no header, sample rate 0) the only cost is
+    a header check before calling the wrapped function directly.
+    """
+
+    _SAFE_ID = re.compile(r"^[A-Za-z0-9_\-]{1,64}$")
+
+    def __init__(
+        self,
+        profile_dir: Optional[str] = None,
+        sample_rate: Optional[float] = None,
+        max_files: Optional[int] = None,
+        max_age: Optional[float] = None,
+    ):
+        self.profile_dir = profile_dir or os.getenv(
+            "MIMIR_PROFILE_DIR", "data/profiles"
+        )
+        if sample_rate is None:
+            sample_rate = float(os.getenv("MIMIR_PROFILE_SAMPLE_RATE", "0"))
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.max_files = max_files if max_files is not None else int(
+            os.getenv("MIMIR_PROFILE_MAX_FILES", "200")
+        )
+        self.max_age = max_age if max_age is not None else float(
+            os.getenv("MIMIR_PROFILE_MAX_AGE_SECONDS", str(7 * 24 * 3600))
+        )
+
+    # ======================
+    # DECISION
+    # ======================
+    def should_profile(self, header_value: Optional[str] = None) -> bool:
+        if header_value and header_value.strip().lower() in ("1", "true", "yes"):
+            return True
+
+        if self.sample_rate <= 0.0:
+            return False
+
+        return random.random() < self.sample_rate
+
+    def request_id(self, candidate: Optional[str] = None) -> str:
+        """
+        Use the caller-supplied request id when it is filesystem-safe,
+        otherwise generate a fresh one.
+        """
+        if candidate and self._SAFE_ID.match(candidate):
+            return candidate
+        return uuid.uuid4().hex
+
+    # ======================
+    # RUN
+    # ======================
+    def run(
+        self,
+        request_id: str,
+        fn: Callable[..., Any],
+        *args,
+        **kwargs,
+    ) -> Any:
+        """
+        Run fn under cProfile and dump the stats for request_id.
+        """
+        if not self._SAFE_ID.match(request_id):
+            raise ValueError(f"Invalid request id: {request_id}")
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(fn, *args, **kwargs)
+        finally:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profiler.dump_stats(self._path(request_id))
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Delete expired and surplus profiles; returns how many.
+        """
+        profiles = self.list_profiles()
+        cutoff = time.time() - self.max_age
+        stale = [
+            p for i, p in enumerate(profiles)
+            if i >= self.max_files or p["created_at"] < cutoff
+        ]
+
+        removed = 0
+        for profile in stale:
+            try:
+                os.remove(self._path(profile["request_id"]))
+                removed += 1
+            except FileNotFoundError:
+                # pruned by another worker
+                continue
+        return removed
+
+    # ======================
+    # LISTING / FETCHING
+    # ======================
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.profile_dir):
+            return []
+
+        profiles = []
+        for filename in os.listdir(self.profile_dir):
+            if not filename.endswith(".prof"):
+                continue
+
+            path = os.path.join(self.profile_dir, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            profiles.append(
+                {
+                    "request_id": filename[: -len(".prof")],
+                    "size_bytes": stat.st_size,
+                    "created_at": stat.st_mtime,
+                }
+            )
+
+        profiles.sort(key=lambda p: p["created_at"], reverse=True)
+        return profiles
+
+    def profile_path(self, request_id: str) -> Optional[str]:
+        if not self._SAFE_ID.match(request_id):
+            return None
+
+        path = self._path(request_id)
+        return path if os.path.exists(path) else None
+
+    def summary(self, request_id: str, limit: int = 30) -> Optional[str]:
+        """
+        Human-readable cumulative-time summary of a stored profile.
+        """
+        path = self.profile_path(request_id)
+        if not path:
+            return None
+
+        out = io.StringIO()
+        stats = pstats.Stats(path, stream=out)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    # ======================
+    # HELPERS
+    # ======================
+    def _path(self, request_id: str) -> str:
+        return os.path.join(self.profile_dir, f"{request_id}.prof")
@@ -0,0 +1,198 @@
+# backend/query_context.py
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class ContextualQueryEncoder:
+    """
+    Running query representation for a conversation.
+
+    Each turn is embedded once and cached by content hash. The
+    contextual query vector is a recency-weighted sum of the last
+    turn vectors, so its cost per turn is one embedding of the new
+    message, independent of conversation length. Turns are embedded
+    when a query vector is first needed: answers that never retrieve
+    (e.g. arithmetic) never touch the embedder.
+
+    Assistant turns are left out unless they are short answers;
+    long retrieved contexts would otherwise dominate the query.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        decay: float = 0.5,
+        max_turns: int = 8,
+        max_assistant_chars: int = 0,
+        cache_size: int = 256,
+    ):
+        self.embedder = embedder
+        self.decay = decay
+        self.max_turns = max_turns
+        self.max_assistant_chars = max_assistant_chars
+        self.cache_size = cache_size
+
+        # turn texts; vectors live in _cache
+        self._turns: List[str] = []
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    # ======================
+    # TURNS
+    # ======================
+    def add_turn(self, role: str, content: str) -> None:
+        if not self._include(role, content):
+            return
+
+        self._turns.append(content)
+        self._turns = self._turns[-self.max_turns:]
+
+    def sync(self, messages: List[Dict[str, str]]) -> None:
+        """
+        Rebuild from a message list (e.g. memory sent by the frontend).
+        Turns seen before are served from the per-turn cache.
+        """
+        self._turns = []
+        for m in messages:
+            self.add_turn(m.get("role", ""), m.get("content", ""))
+
+    def clear(self) -> None:
+        self._turns = []
+
+    # ======================
+    # QUERY VECTOR
+    # ======================
+    def query_vector(self) -> Optional[np.ndarray]:
+        if not self._turns:
+            return None
+
+        # newest turn weight 1, then decay, decay^2, ...
+        stacked = np.vstack(self._turn_vectors(self._turns))
+        weights = self.decay ** np.arange(len(self._turns) - 1, -1, -1)
+        combined = (weights[:, None] * stacked).sum(axis=0, keepdims=True)
+
+        return np.asarray(self.embedder.weight_query(combined))[0]
+
+    def memory_usage(self) -> Dict[str, int]:
+        turns = sum(len(t) for t in self._turns)
+        cache = sum(v.nbytes for v in self._cache.values())
+        return {
+            "turn_bytes": turns,
+            "cache_bytes": cache,
+            "total": turns + cache,
+        }
+
+    # ======================
+    # HELPERS
+    # ======================
+    def _include(self, role: str, content: str) -> bool:
+        if not content:
+            return False
+        if role == "user":
+            return True
+        return len(content) <= self.max_assistant_chars
+
+    def _turn_vectors(self, turns: List[str]) -> List[np.ndarray]:
+        keys = [hashlib.sha256(t.encode("utf-8")).hexdigest() for t in turns]
+
+        missing = {k: t for k, t in zip(keys, turns) if k not in self._cache}
+        if missing:
+            vectors = np.asarray(
+                self.embedder.transform_batch(list(missing.values())), dtype=np.float32
+            )
+            self._cache.update(zip(missing, vectors))
+
+        found = []
+        for key in keys:
+            self._cache.move_to_end(key)
+            found.append(self._cache[key])
+
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return found
+
+
+class Conversation:
+    """
+    One conversation's short-term memory and contextual query vector.
+
+    Each session gets its own Conversation, passed explicitly into
+    MimirAssistant.query(), so concurrent sessions never mix turns.
+    Requests for the same session hold its lock.
+    """
+
+    def __init__(self, embedder, max_turns: int = 8):
+        self.max_turns = max_turns
+        self.messages: List[Dict[str, str]] = []
+        # per-turn vectors are reused when the session is synced again
+        self.encoder = ContextualQueryEncoder(
+            embedder, max_turns=max_turns, cache_size=2 * max_turns
+        )
+        self.lock = threading.Lock()
+
+    def sync(self, messages: List[Dict[str, str]]) -> None:
+        self.messages = list(messages[-self.max_turns:])
+        self.encoder.sync(self.messages)
+
+    def add(self, role: str, content: str) -> None:
+        self.messages.append({"role": role, "content": content})
+        self.messages = self.messages[-self.max_turns:]
+        self.encoder.add_turn(role, content)
+
+    def query_vector(self) -> Optional[np.ndarray]:
+        return self.encoder.query_vector()
+
+    def memory_usage(self) -> Dict[str, int]:
+        messages = sum(len(m.get("content", "")) for m in self.messages)
+        encoder = self.encoder.memory_usage()["total"]
+        return {
+            "messages_bytes": messages,
+            "encoder_bytes": encoder,
+            "total": messages + encoder,
+        }
+
+
+class ConversationCache:
+    """
+    Conversations by session id, least recently used evicted.
+
+    An evicted session is rebuilt from the history the caller sends
+    (or the shared session store) on its next request.
+    """
+
+    def __init__(self, embedder, max_turns: int = 8, capacity: Optional[int] = None):
+        self.embedder = embedder
+        self.max_turns = max_turns
+        self.capacity = capacity if capacity is not None else int(
+            os.getenv("MIMIR_CONVERSATIONS", "256")
+        )
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[str]) -> Conversation:
+        """
+        The session's Conversation; a fresh, unshared one if None.
+        """
+        if session_id is None:
+            return Conversation(self.embedder, self.max_turns)
+
+        with self._lock:
+            conversation = self._conversations.get(session_id)
+            if conversation is None:
+                conversation = Conversation(self.embedder, self.max_turns)
+                self._conversations[session_id] = conversation
+                while len(self._conversations) > self.capacity:
+                    self._conversations.popitem(last=False)
+            else:
+                self._conversations.move_to_end(session_id)
+            return conversation
+
+    def sizes(self) -> Dict[str, int]:
+        with self._lock:
+            conversations = list(self._conversations.items())
+        return {sid: c.memory_usage()["total"] for sid, c in conversations}
@@ -2,6 +2,8 @@
 
 from typing import Dict, Any
 
+from backend.matcher import INTENT_MATCHER
+
 
 def route_query(
     text: str,
@@ -11,7 +13,7 @@ def route_query(
 ) -> Dict[str, Any]:
 
     metadata = metadata or {}
-    text_lower = text.lower()
+    intents = INTENT_MATCHER.categories(text)
 
     routing = {
         "use_web_search": False,
@@ -20,15 +22,8 @@ def route_query(
         "notes": [],
     }
 
-    # Live / factual detection
-    factual_keywords = [
-        "who", "when", "where", "won",
-        "president", "prime minister",
-        "winner", "result", "capital",
-        "population", "opposite",
-    ]
-
-    if any(k in text_lower for k in factual_keywords):
+    # Live / factual detection (phrases in backend.matcher)
+    if "factual" in intents:
         routing["use_web_search"] = True
         routing["notes"].append("General factual query → web search")
 
@@ -0,0 +1,75 @@
+# backend/session_store.py
+
+import os
+import time
+import threading
+from typing import Dict, List, Optional
+
+from rag.wal import WalConnection
+
+
+class SessionStore:
+    """
+    Conversation turns per session in a local SQLite (WAL) file.
+
+    Every server worker on the host opens the same file, so any
+    worker can serve any session. Only the last max_turns turns of
+    a session are kept.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_turns: int = 8):
+        self.path = path or os.getenv("MIMIR_SESSION_DB", "data/sessions.sqlite")
+        self.max_turns = max_turns
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = WalConnection(
+            self.path,
+            schema=[
+                "CREATE TABLE IF NOT EXISTS turns ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "session TEXT, role TEXT, content TEXT, ts REAL)",
+                "CREATE INDEX IF NOT EXISTS turns_session ON turns (session, id)",
+            ],
+        )
+
+    def history(self, session: str) -> List[Dict[str, str]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT role, content FROM turns WHERE session = ? "
+                "ORDER BY id DESC LIMIT ?",
+                (session, self.max_turns),
+            ).fetchall()
+        return [{"role": r, "content": c} for r, c in reversed(rows)]
+
+    def append(self, session: str, turns: List[Dict[str, str]]) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._db.conn
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO turns (session, role, content, ts) VALUES (?, ?, ?, ?)",
+                    [(session, t["role"], t["content"], now) for t in turns],
+                )
+                # trim to the window the assistant actually uses
+                conn.execute(
+                    "DELETE FROM turns WHERE session = ? AND id NOT IN ("
+                    "SELECT id FROM turns WHERE session = ? ORDER BY id DESC LIMIT ?)",
+                    (session, session, self.max_turns),
+                )
+
+    def clear(self, session: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM turns WHERE session = ?", (session,))
+
+    def sizes(self) -> Dict[str, int]:
+        """
+        Approximate stored bytes per session.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT session, SUM(LENGTH(content)) FROM turns GROUP BY session"
+            ).fetchall()
+        return {session: size or 0 for session, size in rows}
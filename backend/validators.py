@@ -1,8 +1,38 @@
 # backend/validators.py
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Set, Tuple
+from functools import lru_cache
 import re
 
+from backend.matcher import INTENT_MATCHER, tokenize
+
+
+# Compiled once: any hit means the text looks like Python
+_PYTHON_RE = re.compile(
+    "|".join(
+        [
+            r"^def\s+\w+\(",
+            r"^class\s+\w+",
+            r"import\s+\w+",
+            r"for\s+\w+\s+in\s+",
+            r"if\s+.+:",
+        ]
+    ),
+    re.MULTILINE,
+)
+
+_WORD_CHAR_RE = re.compile(r"\w")
+
+# Characters of finished lines kept for Python patterns that span a
+# line break ("for x\nin y")
+_LINE_TAIL = 256
+
+REASON_NO_SOURCES = "No grounded sources available for a factual response."
+REASON_SPECULATIVE = "Speculative language detected in factual mode."
+REASON_NOT_PYTHON = "Output violates Python-only persona constraints."
+REASON_EXPLANATION = "Explanation detected where it is not allowed."
+REASON_NO_EMPATHY = "Empathetic language required but not detected."
+
 
 class OutputValidator:
     """
@@ -23,17 +53,22 @@ class OutputValidator:
         answer = response.get("answer", "")
         sources = response.get("sources", [])
 
+        # One phrase scan serves both rule sets
+        found = INTENT_MATCHER.categories(answer)
+
         # 1. Enforce mode-level rules
         validated = self._enforce_mode_rules(
             answer=answer,
             sources=sources,
             mode=mode,
+            found=found,
         )
 
         # 2. Enforce persona-level rules
         validated = self._enforce_persona_rules(
             validated_response=validated,
             persona=persona,
+            found=found if validated["answer"] is answer else None,
         )
 
         return validated
@@ -45,8 +80,12 @@ class OutputValidator:
         answer: str,
         sources: List[Any],
         mode: Dict[str, Any],
+        found: Optional[Set[str]] = None,
     ) -> Dict[str, Any]:
 
+        if found is None:
+            found = INTENT_MATCHER.categories(answer)
+
         hard_rules = mode.get("hard_rules", {})
         refusal_policy = mode.get("refusal_policy", {})
 
@@ -54,25 +93,17 @@ class OutputValidator:
         if hard_rules.get("requires_retrieval") and not sources:
             if refusal_policy.get("refuse_if_no_sources"):
                 return self._refusal(
-                    reason="No grounded sources available for a factual response."
+                    reason=REASON_NO_SOURCES
                 )
 
         # Factual mode: speculative language check
         # IMPORTANT:
         # Speculative language is allowed IF content is grounded in sources
         if not hard_rules.get("allow_speculation") and not sources:
-            speculative_phrases = [
-                "might be",
-                "could be",
-                "possibly",
-                "i think",
-                "it seems",
-            ]
-            for phrase in speculative_phrases:
-                if phrase in answer.lower():
-                    return self._refusal(
-                        reason="Speculative language detected in factual mode."
-                    )
+            if "speculative" in found:
+                return self._refusal(
+                    reason=REASON_SPECULATIVE
+                )
 
         return {
             "answer": answer,
@@ -86,37 +117,34 @@ class OutputValidator:
         self,
         validated_response: Dict[str, Any],
         persona: Dict[str, Any],
+        found: Optional[Set[str]] = None,
     ) -> Dict[str, Any]:
 
         answer = validated_response.get("answer", "")
         hard_rules = persona.get("hard_rules", {})
 
+        if found is None:
+            found = INTENT_MATCHER.categories(answer)
+
         # Python-only persona: output must look like Python code
         if hard_rules.get("output_format") == "python":
             if not self._looks_like_python(answer):
                 return self._refusal(
-                    reason="Output violates Python-only persona constraints."
+                    reason=REASON_NOT_PYTHON
                 )
 
         # No explanations persona rule
         if hard_rules.get("no_explanations"):
-            explanation_markers = [
-                "because",
-                "this means",
-                "explanation",
-                "in summary",
-            ]
-            for marker in explanation_markers:
-                if marker in answer.lower():
-                    return self._refusal(
-                        reason="Explanation detected where it is not allowed."
-                    )
+            if "explanation" in found:
+                return self._refusal(
+                    reason=REASON_EXPLANATION
+                )
 
         # Emotional support: enforce empathy
         if hard_rules.get("empathetic_language_required"):
-            if not self._contains_empathy(answer):
+            if "empathy" not in found:
                 return self._refusal(
-                    reason="Empathetic language required but not detected."
+                    reason=REASON_NO_EMPATHY
                 )
 
         return validated_response
@@ -131,28 +159,202 @@ class OutputValidator:
         }
 
     def _looks_like_python(self, text: str) -> bool:
-        python_patterns = [
-            r"^def\s+\w+\(",
-            r"^class\s+\w+",
-            r"import\s+\w+",
-            r"for\s+\w+\s+in\s+",
-            r"if\s+.+:",
-        ]
+        return _PYTHON_RE.search(text) is not None
 
-        for pattern in python_patterns:
-            if re.search(pattern, text, re.MULTILINE):
-                return True
+    def _contains_empathy(self, text: str) -> bool:
+        return "empathy" in INTENT_MATCHER.categories(text)
 
-        return False
+    # ---------- STREAMING ----------
 
-    def _contains_empathy(self, text: str) -> bool:
-        empathy_markers = [
-            "i’m sorry",
-            "that sounds",
-            "i understand",
-            "it’s okay to feel",
-            "you’re not alone",
-        ]
+    def stream(
+        self,
+        persona: Dict[str, Any],
+        mode: Dict[str, Any],
+        sources: List[Any],
+    ) -> "StreamingValidator":
+        """
+        Validator for an answer that arrives in chunks.
+        """
+        return StreamingValidator(compile_rule_plan(persona, mode, bool(sources)))
+
+
+# =========================
+# STREAMING VALIDATION
+# =========================
+
+class RulePlan:
+    """
+    Precompiled checks for one (persona, mode, has_sources) combination.
+    """
+
+    def __init__(
+        self,
+        refuse_upfront: Optional[str],
+        forbidden: Tuple[Tuple[str, str], ...],
+        required: Tuple[Tuple[str, str], ...],
+        require_python: bool,
+    ):
+        # reason to refuse before any output is produced
+        self.refuse_upfront = refuse_upfront
+        # (category, reason): abort as soon as the category appears
+        self.forbidden = forbidden
+        # (category, reason): must appear before the stream ends
+        self.required = required
+        self.require_python = require_python
+
+
+def compile_rule_plan(
+    persona: Dict[str, Any],
+    mode: Dict[str, Any],
+    has_sources: bool,
+) -> RulePlan:
+    return _compile_rule_plan(
+        _freeze(persona.get("hard_rules", {})),
+        _freeze(mode.get("hard_rules", {})),
+        _freeze(mode.get("refusal_policy", {})),
+        has_sources,
+    )
+
+
+@lru_cache(maxsize=128)
+def _compile_rule_plan(persona_rules, mode_rules, refusal_policy, has_sources):
+    persona_rules = dict(persona_rules)
+    mode_rules = dict(mode_rules)
+    refusal_policy = dict(refusal_policy)
+
+    refuse_upfront = None
+    if (
+        mode_rules.get("requires_retrieval")
+        and not has_sources
+        and refusal_policy.get("refuse_if_no_sources")
+    ):
+        refuse_upfront = REASON_NO_SOURCES
+
+    forbidden = []
+    if not mode_rules.get("allow_speculation") and not has_sources:
+        forbidden.append(("speculative", REASON_SPECULATIVE))
+    if persona_rules.get("no_explanations"):
+        forbidden.append(("explanation", REASON_EXPLANATION))
+
+    required = []
+    if persona_rules.get("empathetic_language_required"):
+        required.append(("empathy", REASON_NO_EMPATHY))
+
+    return RulePlan(
+        refuse_upfront=refuse_upfront,
+        forbidden=tuple(forbidden),
+        required=tuple(required),
+        require_python=persona_rules.get("output_format") == "python",
+    )
+
+
+def _freeze(rules: Dict[str, Any]):
+    return tuple(sorted(rules.items()))
+
+
+class StreamingValidator:
+    """
+    Incremental validator over streamed answer chunks.
+
+    Carry-over state makes checks independent of chunk boundaries:
+    - a trailing partial word is held back until the next chunk;
+    - the Aho-Corasick state spans word boundaries across chunks;
+    - the current unfinished line, plus a bounded tail of the lines
+      before it, is kept for the Python patterns.
+
+    feed() returns a refusal reason as soon as a forbidden phrase
+    appears, so the producer can stop generating.
+    """
+
+    def __init__(self, plan: RulePlan):
+        self.plan = plan
+        self.violation: Optional[str] = plan.refuse_upfront
+
+        self._state = 0
+        self._word_carry = ""
+        self._line_carry = ""
+        # where the carry's own text starts (after one char of context)
+        self._line_pos = 0
+        self._seen: Set[str] = set()
+        self._python_seen = False
+
+    def feed(self, chunk: str) -> Optional[str]:
+        if self.violation or not chunk:
+            return self.violation
+
+        self._scan_words(chunk)
+
+        if self.plan.require_python and not self._python_seen:
+            self._scan_lines(chunk)
+
+        return self.violation
+
+    def finish(self) -> Optional[str]:
+        """
+        Flush carry-over and check rules that need the whole answer.
+        """
+        if self.violation:
+            return self.violation
+
+        if self._word_carry:
+            self._consume_tokens(tokenize(self._word_carry))
+            self._word_carry = ""
+        if self.violation:
+            return self.violation
+
+        if self.plan.require_python and not self._python_seen:
+            if not _PYTHON_RE.search(self._line_carry, self._line_pos):
+                self.violation = REASON_NOT_PYTHON
+                return self.violation
+
+        for category, reason in self.plan.required:
+            if category not in self._seen:
+                self.violation = reason
+                return self.violation
+
+        return None
+
+    def refusal(self) -> Dict[str, Any]:
+        return OutputValidator()._refusal(self.violation or "")
+
+    # ---------- HELPERS ----------
+
+    def _scan_words(self, chunk: str) -> None:
+        text = self._word_carry + chunk
+
+        # hold back a trailing partial word for the next chunk
+        cut = len(text)
+        while cut and _WORD_CHAR_RE.match(text[cut - 1]):
+            cut -= 1
+        self._word_carry = text[cut:]
+
+        self._consume_tokens(tokenize(text[:cut]))
+
+    def _consume_tokens(self, tokens: List[str]) -> None:
+        forbidden = self.plan.forbidden
+        for token in tokens:
+            self._state = INTENT_MATCHER.step(self._state, token)
+            for category, _ in INTENT_MATCHER.outputs(self._state):
+                self._seen.add(category)
+                for banned, reason in forbidden:
+                    if category == banned:
+                        self.violation = reason
+                        return
+
+    def _scan_lines(self, chunk: str) -> None:
+        text = self._line_carry + chunk
+        end = text.rfind("\n") + 1
+        if not end:
+            self._line_carry = text
+            return
+
+        if _PYTHON_RE.search(text, self._line_pos, end):
+            self._python_seen = True
+            self._line_carry = ""
+            return
 
-        text = text.lower()
-        return any(marker in text for marker in empathy_markers)
+        # keep the unfinished line and up to _LINE_TAIL characters
+        # before it, plus one character so "^" still sees line starts
+        cut = max(self._line_pos, end - _LINE_TAIL)
+        self._line_carry = text[cut - 1:] if cut else text
+        self._line_pos = 1 if cut else 0
@@ -0,0 +1,328 @@
+# backend/web_knowledge.py
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.jobs import JobQueue, QueueFull
+from rag.snippets import sentence_offsets
+from rag.wal import WalConnection
+
+
+class WebKnowledge:
+    """
+    Local "web" knowledge domain filled from web search answers.
+
+    remember() queues a write-through: the question is embedded on
+    its own and the answer is split into sentence-aligned chunks,
+    each embedded alone; all are stored with the source URLs, fetch
+    time and expiry (ttl) in a SQLite (WAL) file shared by all
+    server workers.
+
+    lookup() scores a question against the fresh stored questions
+    (min_score) and then against the answer chunks (min_chunk_score:
+    a question shares few words with a long answer, so only a close
+    restatement should match one), and returns the stored answer of
+    the best match, so a repeated topic is answered without a web
+    call. Each worker picks up rows written by others on its next
+    lookup.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        min_score: Optional[float] = None,
+        min_chunk_score: Optional[float] = None,
+        chunk_chars: int = 500,
+        max_pending: int = 32,
+    ):
+        self.embedder = embedder
+        self.path = path or os.getenv("MIMIR_WEB_KNOWLEDGE_DB", "data/web_knowledge.sqlite")
+        self.ttl = ttl if ttl is not None else float(
+            os.getenv("MIMIR_WEB_TTL_SECONDS", str(24 * 3600))
+        )
+        # cosine to a stored question / answer chunk needed to reuse an answer
+        self.min_score = min_score if min_score is not None else float(
+            os.getenv("MIMIR_WEB_MIN_SCORE", "0.6")
+        )
+        self.min_chunk_score = min_chunk_score if min_chunk_score is not None else float(
+            os.getenv("MIMIR_WEB_MIN_CHUNK_SCORE", "0.5")
+        )
+        self.chunk_chars = chunk_chars
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._db = WalConnection(
+            self.path,
+            schema=[
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, query TEXT, answer TEXT, "
+                "sources TEXT, tool TEXT, fetched_at REAL, expires_at REAL)",
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, entry INTEGER, "
+                "text TEXT, vector BLOB)",
+                "CREATE INDEX IF NOT EXISTS chunks_entry ON chunks (entry)",
+                "CREATE TABLE IF NOT EXISTS questions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, entry INTEGER, vector BLOB)",
+                "CREATE INDEX IF NOT EXISTS questions_entry ON questions (entry)",
+            ],
+        )
+        self._writes = JobQueue(max_workers=1, max_pending=max_pending, retain=0)
+
+        # serializes the shared connection and view rebuilds
+        self._lock = threading.Lock()
+        self._last = {table: 0 for table in _TABLES}
+        # ({table: (vectors, entry id per row, expiry per row)}, entries),
+        # replaced as a whole so lookups never see a partial update
+        self._view = ({table: _EMPTY_VIEW for table in _TABLES}, {})
+
+    # ======================
+    # READ
+    # ======================
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Stored answer for a similar, still fresh question, or None.
+        """
+        self._refresh()
+
+        views, entries = self._view
+        now = time.time()
+        q = None
+        for table, min_score in (
+            ("questions", self.min_score),
+            ("chunks", self.min_chunk_score),
+        ):
+            vectors, entry_ids, expires = views[table]
+            if not len(vectors):
+                continue
+
+            if q is None:
+                q = np.asarray(self.embedder.transform_batch([query]), dtype=np.float32)[0]
+            if q.shape[0] != vectors.shape[1]:
+                continue
+
+            scores = vectors @ q
+            scores[expires <= now] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] >= min_score:
+                return self._hit(entries[int(entry_ids[best])], float(scores[best]), table)
+
+        return None
+
+    def _hit(self, entry: Dict[str, Any], score: float, table: str) -> Dict[str, Any]:
+        return {
+            "answer": entry["answer"],
+            "sources": entry["sources"],
+            "confidence": 0.8,
+            "metadata": {
+                "tool": "web_knowledge",
+                "origin": entry["tool"],
+                "fetched_at": entry["fetched_at"],
+                "age_seconds": round(time.time() - entry["fetched_at"], 1),
+                "matched": table[:-1],
+                "score": round(score, 4),
+            },
+        }
+
+    def _refresh(self) -> None:
+        """
+        Add questions and chunks written since the last refresh (by
+        any worker) and drop expired ones from the in-memory view.
+        """
+        with self._lock:
+            last = {
+                table: self._db.execute(
+                    f"SELECT COALESCE(MAX(id), 0) FROM {table}"
+                ).fetchone()[0]
+                for table in _TABLES
+            }
+            if last == self._last:
+                return
+
+            now = time.time()
+            views, entries = self._view
+            fresh: Dict[int, Dict[str, Any]] = {}
+            new_views = {}
+            for table in _TABLES:
+                rows = self._db.execute(
+                    f"SELECT c.entry, c.vector, e.answer, e.sources, e.tool, "
+                    f"e.fetched_at, e.expires_at "
+                    f"FROM {table} c JOIN entries e ON e.id = c.entry "
+                    f"WHERE c.id > ? AND e.expires_at > ? ORDER BY c.id",
+                    (self._last[table], now),
+                ).fetchall()
+                new_views[table] = _extend(views[table], rows, now, entries, fresh)
+
+            self._last = last
+            self._view = (new_views, fresh)
+
+    # ======================
+    # WRITE-THROUGH
+    # ======================
+    def remember(self, query: str, result: Dict[str, Any]) -> bool:
+        """
+        Queue a web answer for storage; False if the write queue is full.
+        """
+        try:
+            self._writes.submit("web_knowledge", lambda job: self.write(query, result))
+            return True
+        except QueueFull:
+            return False
+
+    def write(self, query: str, result: Dict[str, Any]) -> int:
+        """
+        Chunk, embed and store one answer. Returns the entry id.
+        """
+        answer = result.get("answer") or ""
+        chunks = self._chunk(answer)
+        if not chunks:
+            return 0
+
+        # the question on its own, then each chunk on its own
+        question, *vectors = np.asarray(
+            self.embedder.transform_batch([query] + chunks),
+            dtype=np.float32,
+        )
+
+        now = time.time()
+        with self._lock:
+            conn = self._db.conn
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.execute(
+                    "INSERT INTO entries "
+                    "(query, answer, sources, tool, fetched_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        query,
+                        answer,
+                        json.dumps(result.get("sources") or []),
+                        (result.get("metadata") or {}).get("tool", "web"),
+                        now,
+                        now + self.ttl,
+                    ),
+                )
+                entry = cursor.lastrowid
+                conn.execute(
+                    "INSERT INTO questions (entry, vector) VALUES (?, ?)",
+                    (entry, question.tobytes()),
+                )
+                conn.executemany(
+                    "INSERT INTO chunks (entry, text, vector) VALUES (?, ?, ?)",
+                    [(entry, c, v.tobytes()) for c, v in zip(chunks, vectors)],
+                )
+
+        self.prune()
+        return entry
+
+    def prune(self) -> int:
+        """
+        Delete expired entries; returns how many were removed.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._db.conn
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for table in _TABLES:
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE entry IN "
+                        "(SELECT id FROM entries WHERE expires_at <= ?)",
+                        (now,),
+                    )
+                cursor = conn.execute(
+                    "DELETE FROM entries WHERE expires_at <= ?", (now,)
+                )
+        return cursor.rowcount
+
+    def _chunk(self, text: str) -> List[str]:
+        # sentence-aligned pieces of at most ~chunk_chars
+        chunks: List[str] = []
+        current = ""
+        for start, end in sentence_offsets(text).tolist():
+            sentence = text[start:end].strip()
+            if current and len(current) + len(sentence) + 1 > self.chunk_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current} {sentence}".strip()
+        if current:
+            chunks.append(current)
+        return chunks
+
+    # ======================
+    # STATS
+    # ======================
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, fresh = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(expires_at > ?), 0) FROM entries",
+                (time.time(),),
+            ).fetchone()
+        return {
+            "entries": entries,
+            "fresh": fresh,
+            "ttl_seconds": self.ttl,
+            "pending_writes": self._writes.stats()["pending"],
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        views, entries = self._view
+        usage = {
+            "vectors_bytes": sum(int(v.nbytes) for v, _, _ in views.values()),
+            "answers_bytes": sum(len(e["answer"]) for e in entries.values()),
+            "questions": len(views["questions"][1]),
+            "chunks": len(views["chunks"][1]),
+        }
+        usage["total"] = usage["vectors_bytes"] + usage["answers_bytes"]
+        return usage
+
+
+_TABLES = ("questions", "chunks")
+
+_EMPTY_VIEW = (
+    np.empty((0, 0), dtype=np.float32),
+    np.empty(0, dtype=np.int64),
+    np.empty(0, dtype=np.float64),
+)
+
+
+def _extend(view, rows, now: float, entries, fresh):
+    """
+    One table's view without expired rows, plus the new rows; the
+    entries of all kept rows are added to fresh.
+    """
+    vectors, entry_ids, expires = view
+    keep = expires > now
+    for entry in entry_ids[keep].tolist():
+        fresh[entry] = entries[entry]
+
+    dim = vectors.shape[1] if len(vectors) else (len(rows[0][1]) // 4 if rows else 0)
+    if not dim:
+        return _EMPTY_VIEW
+
+    new_vectors, new_ids, new_expires = [], [], []
+    for entry, blob, answer, sources, tool, fetched_at, expires_at in rows:
+        vector = np.frombuffer(blob, dtype=np.float32)
+        if len(vector) != dim:
+            # written with a different embedder
+            continue
+        new_vectors.append(vector)
+        new_ids.append(entry)
+        new_expires.append(expires_at)
+        fresh[entry] = {
+            "answer": answer,
+            "sources": json.loads(sources),
+            "tool": tool,
+            "fetched_at": fetched_at,
+        }
+
+    return (
+        np.vstack([vectors[keep].reshape(-1, dim)] + [v[None, :] for v in new_vectors]),
+        np.concatenate([entry_ids[keep], np.asarray(new_ids, dtype=np.int64)]),
+        np.concatenate([expires[keep], np.asarray(new_expires, dtype=np.float64)]),
+    )
@@ -1,7 +1,6 @@
 # backend/web_search.py
 
 import os
-import requests
 from typing import Dict, Any, Optional
 
 try:
@@ -65,6 +64,9 @@ class WebSearchQA:
             "max_results": 5,
         }
 
+        # imported on the first web fallback, not at server start
+        import requests
+
         r = requests.post(url, json=payload, timeout=15)
         r.raise_for_status()
 
@@ -100,6 +102,8 @@ class WebSearchQA:
             "num": 5,
         }
 
+        import requests
+
         r = requests.get(url, params=params, timeout=15)
         r.raise_for_status()
 
@@ -0,0 +1,188 @@
+# evaluation/cold_start.py
+
+"""
+Cold-start benchmark for the API.
+
+Each run starts a fresh interpreter and measures:
+- import_s:          time to import api.main
+- first_response_s:  import + startup events + the first /query answer
+
+The same is measured for a reference app (bare FastAPI + numpy, the
+floor the API cannot go below), interleaved with the API runs:
+
+    python -m evaluation.cold_start
+    python -m evaluation.cold_start --max-ratio 1.8
+
+Exits non-zero when a module that should load lazily is imported at
+start-up, or when an API median exceeds max_ratio times the
+reference median. Both come from the same run on the same machine,
+so there is no stored baseline to go stale.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy modules that must not load just by importing the API
+DEFERRED_MODULES = ("sklearn", "scipy", "faiss", "PyPDF2", "requests")
+
+METRICS = ("import_s", "first_response_s")
+
+_CHILD = """
+import json, sys, time
+
+t0 = time.perf_counter()
+import api.main
+import_s = time.perf_counter() - t0
+eager = [m for m in {deferred!r} if m in sys.modules]
+
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+client_s = time.perf_counter() - t1
+
+with TestClient(api.main.app) as client:
+    response = client.post("/query", json={{"query": "2 + 2"}})
+    first_response_s = time.perf_counter() - t0 - client_s
+
+print(json.dumps({{
+    "import_s": import_s,
+    "first_response_s": first_response_s,
+    "status": response.status_code,
+    "eager": eager,
+}}))
+"""
+
+# Same measurement for an app that only pays for FastAPI and numpy
+_REFERENCE = """
+import json, time
+
+t0 = time.perf_counter()
+import numpy
+from fastapi import FastAPI
+
+app = FastAPI()
+
+@app.post("/query")
+def query(payload: dict):
+    return {{"answer": str(numpy.int64(4))}}
+
+import_s = time.perf_counter() - t0
+
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+client_s = time.perf_counter() - t1
+
+with TestClient(app) as client:
+    response = client.post("/query", json={{"query": "2 + 2"}})
+    first_response_s = time.perf_counter() - t0 - client_s
+
+print(json.dumps({{
+    "import_s": import_s,
+    "first_response_s": first_response_s,
+    "status": response.status_code,
+    "eager": [],
+}}))
+"""
+
+
+def run_once(env: Dict[str, str], code: str) -> Dict:
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # startup may print; the measurement is the last line
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure(runs: int) -> Dict:
+    """
+    Medians for the API and the reference app, run alternately so
+    both see the same machine load.
+    """
+    api = _CHILD.format(deferred=DEFERRED_MODULES)
+    reference = _REFERENCE.format()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            # keep state stores out of the working tree
+            "MIMIR_UPLOAD_DIR": os.path.join(tmp, "uploads"),
+            "MIMIR_SESSION_DB": os.path.join(tmp, "sessions.sqlite"),
+            "MIMIR_WEB_KNOWLEDGE_DB": os.path.join(tmp, "web_knowledge.sqlite"),
+            "MIMIR_EMBEDDING_CACHE_DIR": os.path.join(tmp, "embedding_cache"),
+        }
+        # the web client refuses to start without a key; /query "2 + 2"
+        # never reaches it
+        env.setdefault("TAVILY_API_KEY", "cold-start-benchmark")
+
+        # first runs warm the bytecode and page caches
+        run_once(env, api)
+        run_once(env, reference)
+        samples: List[Dict] = []
+        floor: List[Dict] = []
+        for _ in range(runs):
+            samples.append(run_once(env, api))
+            floor.append(run_once(env, reference))
+
+    return {
+        **{m: statistics.median(s[m] for s in samples) for m in METRICS},
+        "reference": {m: statistics.median(s[m] for s in floor) for m in METRICS},
+        "status": samples[-1]["status"],
+        "eager": sorted({m for s in samples for m in s["eager"]}),
+        "runs": runs,
+    }
+
+
+def check(result: Dict, max_ratio: float) -> List[str]:
+    failures = []
+
+    if result["eager"]:
+        failures.append(f"imported at start-up: {', '.join(result['eager'])}")
+
+    if result["status"] != 200:
+        failures.append(f"first /query returned {result['status']}")
+
+    for metric in METRICS:
+        floor = result["reference"][metric]
+        if result[metric] > floor * max_ratio:
+            failures.append(
+                f"{metric} {result[metric]:.3f}s > {max_ratio:g} x "
+                f"reference {floor:.3f}s"
+            )
+
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ratio", type=float, default=2.0,
+                        help="allowed API / reference-app ratio per metric")
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs)
+    print(json.dumps(result, indent=2))
+
+    failures = check(result, args.max_ratio)
+    for failure in failures:
+        print(f"[✗] {failure}")
+    if not failures:
+        print("[✓] Cold start within budget.")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+# rag/ann.py
+
+import os
+import json
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from rag.embeddings import create_backend
+from rag.fusion import top_k_indices
+from rag.quantization import ENCODINGS
+
+# imported on first use (see require_faiss), not at server start
+faiss = None
+
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw")
+
+# <domain>@<part>: files of one shard partition
+PARTITION_SEP = "@"
+
+
+def require_faiss():
+    """
+    Import faiss on first use and return the module.
+    """
+    global faiss
+    if faiss is None:
+        try:
+            import faiss as _faiss
+        except ImportError:
+            raise ImportError(
+                "faiss not installed. Install with: pip install faiss-cpu"
+            )
+        faiss = _faiss
+    return faiss
+
+
+def partition_name(domain: str, part: int, parts: int) -> str:
+    """
+    File name prefix of one shard partition of a domain (see
+    DocumentIngestor); the domain itself when unpartitioned.
+    """
+    return domain if parts <= 1 else f"{domain}{PARTITION_SEP}{part}"
+
+
+def manifest_path(index_dir: str, domain: str) -> str:
+    return os.path.join(index_dir, f"{domain}_manifest.json")
+
+
+def vectors_path(index_dir: str, domain: str) -> str:
+    return os.path.join(index_dir, f"{domain}_vectors.npy")
+
+
+def doc_freq_path(index_dir: str, domain: str) -> str:
+    return os.path.join(index_dir, f"{domain}_embedding_df.npy")
+
+
+def build_faiss_index(
+    embeddings: np.ndarray,
+    index_type: str = "flat",
+    encoding: str = "float32",
+    nlist: int = 256,
+    hnsw_m: int = 32,
+    ef_construction: int = 200,
+    pq_m: int = 16,
+    pq_nbits: int = 8,
+    train_sample: int = 50_000,
+    num_threads: Optional[int] = None,
+    seed: int = 0,
+):
+    """
+    Build an inner-product FAISS index of the requested type and
+    vector encoding.
+
+    Returns (index, params) where params is what must be recorded
+    in the manifest to reopen and tune the index correctly.
+    """
+    require_faiss()
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}")
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding: {encoding}")
+
+    if num_threads:
+        faiss.omp_set_num_threads(num_threads)
+
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n, dim = embeddings.shape
+
+    if index_type == "hnsw" and encoding == "pq" and n < 256:
+        # HNSW-PQ is fixed at 8-bit codes and cannot train on fewer points
+        encoding = "int8"
+
+    params: Dict[str, Any] = {"encoding": encoding}
+
+    if encoding == "pq":
+        pq_m = _largest_divisor(dim, pq_m)
+        # k-means needs at least 2^nbits training points
+        pq_nbits = max(1, min(pq_nbits, int(np.log2(max(n, 2)))))
+        params.update({"pq_m": pq_m, "pq_nbits": pq_nbits})
+
+    if index_type == "ivf_flat":
+        # at least ~39 training points per list keeps k-means stable
+        nlist = max(1, min(nlist, n // 39 or 1))
+        params.update({"nlist": nlist, "nprobe": max(1, nlist // 16)})
+
+    elif index_type == "hnsw":
+        params.update(
+            {
+                "hnsw_m": hnsw_m,
+                "ef_construction": ef_construction,
+                "ef_search": 64,
+            }
+        )
+
+    factory = _factory_string(index_type, encoding, nlist, hnsw_m, pq_m, pq_nbits)
+    index = faiss.index_factory(dim, factory, faiss.METRIC_INNER_PRODUCT)
+    params["factory"] = factory
+
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = ef_construction
+
+    if not index.is_trained:
+        index.train(_training_sample(embeddings, train_sample, seed))
+
+    index.add(embeddings)
+    return index, params
+
+
+def _factory_string(
+    index_type: str,
+    encoding: str,
+    nlist: int,
+    hnsw_m: int,
+    pq_m: int,
+    pq_nbits: int,
+) -> str:
+    # "np": no polysemous training; it only serves Hamming-filtered
+    # search, which is never used, and costs ~30 s per build
+    codes = {
+        "float32": "Flat",
+        "float16": "SQfp16",
+        "int8": "SQ8",
+        "pq": f"PQ{pq_m}x{pq_nbits}np",
+    }
+
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},{codes[encoding]}"
+
+    if index_type == "hnsw":
+        if encoding == "float32":
+            return f"HNSW{hnsw_m}"
+        if encoding == "pq":
+            # HNSW-PQ only supports 8-bit codes
+            return f"HNSW{hnsw_m}_PQ{pq_m}np"
+        return f"HNSW{hnsw_m}_{codes[encoding]}"
+
+    return codes[encoding]
+
+
+def _largest_divisor(dim: int, upper: int) -> int:
+    for m in range(min(upper, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def write_manifest(
+    index_dir: str,
+    domain: str,
+    index_type: str,
+    dim: int,
+    num_chunks: int,
+    params: Dict[str, Any],
+    **extra,
+) -> Dict[str, Any]:
+    manifest = {
+        "domain": domain,
+        "index_type": index_type,
+        "dim": dim,
+        "num_chunks": num_chunks,
+        "params": params,
+        **extra,
+    }
+
+    with open(manifest_path(index_dir, domain), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def read_manifest(index_dir: str, domain: str) -> Dict[str, Any]:
+    """
+    Read a domain manifest. Indices built before manifests existed
+    are reported as flat.
+    """
+    path = manifest_path(index_dir, domain)
+    if not os.path.exists(path):
+        return {"domain": domain, "index_type": "flat", "params": {}}
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def open_faiss_index(
+    index_dir: str,
+    domain: str,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    mmap: Optional[bool] = None,
+):
+    """
+    Open a domain index according to its manifest and apply
+    query-time search parameters.
+
+    With mmap (default: MIMIR_INDEX_MMAP=1) vector codes are mapped
+    read-only from the file, so server workers share one copy in
+    the page cache. Index types that cannot be mapped are read
+    into memory as usual.
+    """
+    require_faiss()
+
+    if mmap is None:
+        mmap = os.getenv("MIMIR_INDEX_MMAP", "0") == "1"
+
+    manifest = read_manifest(index_dir, domain)
+    path = os.path.join(index_dir, f"{domain}.index")
+
+    index = None
+    if mmap:
+        try:
+            index = faiss.read_index(
+                path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+            )
+        except (RuntimeError, AttributeError):
+            index = None
+    if index is None:
+        index = faiss.read_index(path)
+
+    params = manifest.get("params", {})
+    set_search_params(
+        index,
+        nprobe=nprobe or params.get("nprobe"),
+        ef_search=ef_search or params.get("ef_search"),
+    )
+
+    return index, manifest
+
+
+def open_rerank_vectors(index_dir: str, domain: str) -> Optional[np.ndarray]:
+    """
+    Memory-map the full-precision vectors kept for exact re-ranking.
+
+    Only the rows of re-ranked candidates are ever paged in.
+    """
+    manifest = read_manifest(index_dir, domain)
+    if not manifest.get("rerank_vectors"):
+        return None
+
+    path = vectors_path(index_dir, domain)
+    if not os.path.exists(path):
+        return None
+
+    return np.load(path, mmap_mode="r")
+
+
+def save_embedding_state(index_dir: str, domain: str, backend) -> Dict[str, Any]:
+    """
+    Persist what the query side needs to embed in the index's space.
+
+    Returns the spec to record in the manifest.
+    """
+    spec = backend.spec()
+
+    doc_freq = getattr(backend, "doc_freq", None)
+    if doc_freq is not None:
+        np.save(doc_freq_path(index_dir, domain), doc_freq)
+        spec["num_docs"] = int(backend.num_docs)
+
+    return spec
+
+
+def open_embedding_backend(index_dir: str, domain: str):
+    """
+    Rebuild the embedding backend recorded in a domain manifest,
+    or None if the index predates backend specs.
+    """
+    spec = dict(read_manifest(index_dir, domain).get("embedding") or {})
+    if not spec:
+        return None
+
+    num_docs = spec.pop("num_docs", 0)
+    backend = create_backend(spec)
+
+    path = doc_freq_path(index_dir, domain)
+    if num_docs and os.path.exists(path):
+        backend.merge_idf(np.load(path), num_docs)
+
+    return backend
+
+
+def set_search_params(
+    index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> None:
+    """
+    Tune recall/latency at query time. Parameters that do not
+    apply to the index type are ignored.
+    """
+    if nprobe is not None and hasattr(index, "nprobe"):
+        index.nprobe = int(nprobe)
+
+    if ef_search is not None and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = int(ef_search)
+
+
+def search_with_ids(index, query: np.ndarray, k: int, ids: np.ndarray):
+    """
+    FAISS search restricted to ids through an IDSelector, keeping
+    the index's own nprobe / efSearch. Returns (scores, ids).
+
+    Flat PQ indexes take no selector; their ids are scored against
+    the decoded codes instead (the same inner products).
+    """
+    require_faiss()
+
+    if isinstance(index, faiss.IndexPQ):
+        return _scan_ids(index, query, k, ids)
+
+    selector = faiss.IDSelectorBatch(np.ascontiguousarray(ids, dtype=np.int64))
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    elif hasattr(index, "hnsw"):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+
+    return index.search(query.reshape(1, -1), k, params=params)
+
+
+def _scan_ids(index, query: np.ndarray, k: int, ids: np.ndarray, batch: int = 4096):
+    # running top-k over batches of decoded vectors, padded like faiss
+    best_ids = np.zeros(0, dtype=np.int64)
+    best_scores = np.zeros(0, dtype=np.float32)
+
+    for start in range(0, len(ids), batch):
+        part = np.ascontiguousarray(ids[start:start + batch], dtype=np.int64)
+        scores = index.reconstruct_batch(part) @ query
+        best_ids = np.concatenate([best_ids, part])
+        best_scores = np.concatenate([best_scores, scores.astype(np.float32)])
+        top = top_k_indices(best_scores, k)
+        best_ids, best_scores = best_ids[top], best_scores[top]
+
+    found = np.full((1, k), -1, dtype=np.int64)
+    scores = np.full((1, k), -np.inf, dtype=np.float32)
+    found[0, :len(best_ids)] = best_ids
+    scores[0, :len(best_scores)] = best_scores
+    return scores, found
+
+
+def _training_sample(embeddings: np.ndarray, size: int, seed: int) -> np.ndarray:
+    if len(embeddings) <= size:
+        return embeddings
+
+    rng = np.random.default_rng(seed)
+    idx = rng.choice(len(embeddings), size=size, replace=False)
+    return embeddings[idx]
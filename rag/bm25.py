@@ -0,0 +1,238 @@
+# rag/bm25.py
+
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag.fusion import top_k_indices
+from rag.sizing import approx_sizeof
+from rag.stop_words import ENGLISH_STOP_WORDS
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    # the embedders' stop words: "how do the" must not match any corpus
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in ENGLISH_STOP_WORDS]
+
+
+class BM25Index:
+    """
+    Array-backed BM25 inverted index.
+
+    Postings are stored CSR-style: for term id t, its documents are
+    doc_ids[offsets[t]:offsets[t + 1]] and the matching precomputed
+    BM25 impacts (idf * saturated tf) sit in the same slice of
+    impacts. Scoring a query is a handful of vectorized slice adds.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self.vocab: Dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.impacts = np.zeros(0, dtype=np.float32)
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.doc_len = np.zeros(0, dtype=np.int32)
+        self.avgdl = 0.0
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_len)
+
+    # ======================
+    # BUILD
+    # ======================
+    def build(self, texts: List[str]) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        term_col: List[int] = []
+        doc_col: List[int] = []
+        tf_col: List[int] = []
+        doc_len = np.zeros(len(texts), dtype=np.int32)
+
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                term_col.append(vocab.setdefault(term, len(vocab)))
+                doc_col.append(doc_id)
+                tf_col.append(tf)
+
+        terms = np.asarray(term_col, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")
+        terms = terms[order]
+        doc_ids = np.asarray(doc_col, dtype=np.int32)[order]
+        tfs = np.asarray(tf_col, dtype=np.float32)[order]
+
+        df = np.bincount(terms, minlength=len(vocab))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+
+        n = max(len(texts), 1)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        avgdl = float(doc_len.mean()) if len(texts) else 0.0
+        norm = self.k1 * (
+            1.0 - self.b + self.b * doc_len[doc_ids] / max(avgdl, 1e-9)
+        )
+        impacts = idf[terms] * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.impacts = impacts.astype(np.float32)
+        self.idf = idf
+        self.doc_len = doc_len
+        self.avgdl = avgdl
+        return self
+
+    def subset(self, ids: np.ndarray) -> "BM25Index":
+        """
+        Index over the sorted doc ids only, renumbered 0..len(ids)-1.
+
+        Impacts, idf and avgdl are kept from this index, so a subset
+        scores its documents exactly as the full index does.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        local = np.full(self.num_docs, -1, dtype=np.int64)
+        local[ids] = np.arange(len(ids))
+
+        terms = np.repeat(np.arange(len(self.vocab)), np.diff(self.offsets))
+        keep = local[self.doc_ids] >= 0
+        terms = terms[keep]
+
+        # drop terms with no postings left
+        used = np.unique(terms)
+        remap = np.full(len(self.vocab), -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+
+        offsets = np.zeros(len(used) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(remap[terms], minlength=len(used)), out=offsets[1:])
+
+        words = sorted(self.vocab, key=self.vocab.get)
+
+        index = BM25Index(k1=self.k1, b=self.b)
+        index.vocab = {words[t]: i for i, t in enumerate(used.tolist())}
+        index.offsets = offsets
+        index.doc_ids = local[self.doc_ids[keep]].astype(np.int32)
+        index.impacts = self.impacts[keep]
+        index.idf = self.idf[used]
+        index.doc_len = self.doc_len[ids]
+        index.avgdl = self.avgdl
+        return index
+
+    # ======================
+    # SEARCH
+    # ======================
+    def scores(self, query: str) -> np.ndarray:
+        """
+        Dense BM25 score array over all documents.
+        """
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # doc ids are unique within one postings list
+            scores[self.doc_ids[start:end]] += self.impacts[start:end]
+
+        return scores
+
+    def coverage(self, query: str) -> np.ndarray:
+        """
+        Fraction of the query's distinct terms found in each document;
+        all 0 for a query with no terms left.
+        """
+        terms = set(tokenize(query))
+        found = np.zeros(self.num_docs, dtype=np.float32)
+        if not terms:
+            return found
+
+        for term in terms:
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            found[self.doc_ids[start:end]] += 1.0
+
+        return found / len(terms)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        ids: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Top-k documents, optionally restricted to sorted ids.
+        """
+        if not self.num_docs:
+            return []
+
+        scores = self.scores(query)
+        if ids is not None:
+            sub = scores[ids]
+            return [
+                (int(ids[j]), float(sub[j]))
+                for j in top_k_indices(sub, top_k)
+                if sub[j] > 0
+            ]
+
+        return [
+            (int(i), float(scores[i]))
+            for i in top_k_indices(scores, top_k)
+            if scores[i] > 0
+        ]
+
+    # ======================
+    # PERSISTENCE
+    # ======================
+    def save(self, path: str) -> None:
+        terms = sorted(self.vocab, key=self.vocab.get)
+        np.savez(
+            path,
+            terms=np.asarray(terms, dtype=str),
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            impacts=self.impacts,
+            idf=self.idf,
+            doc_len=self.doc_len,
+            params=np.asarray([self.k1, self.b, self.avgdl]),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        data = np.load(path)
+        k1, b, avgdl = data["params"].tolist()
+
+        index = cls(k1=k1, b=b)
+        index.vocab = {t: i for i, t in enumerate(data["terms"].tolist())}
+        index.offsets = data["offsets"]
+        index.doc_ids = data["doc_ids"]
+        index.impacts = data["impacts"]
+        index.idf = data["idf"]
+        index.doc_len = data["doc_len"]
+        index.avgdl = avgdl
+        return index
+
+    def memory_usage(self) -> Dict[str, int]:
+        arrays = (
+            self.offsets.nbytes
+            + self.doc_ids.nbytes
+            + self.impacts.nbytes
+            + self.idf.nbytes
+            + self.doc_len.nbytes
+        )
+        vocab = approx_sizeof(self.vocab)
+        return {
+            "postings_bytes": arrays,
+            "vocabulary_bytes": vocab,
+            "total": arrays + vocab,
+        }
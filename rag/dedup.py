@@ -0,0 +1,151 @@
+# rag/dedup.py
+
+import re
+import hashlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+_BITS = 64
+_BANDS = 4
+_BAND_BITS = _BITS // _BANDS
+_BIT_POSITIONS = np.arange(_BITS, dtype=np.uint64)
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    64-bit SimHash over word shingles.
+
+    Texts that differ by a few words map to fingerprints that
+    differ in only a few bits.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return 0
+
+    if len(tokens) < shingle_size:
+        shingles = [" ".join(tokens)]
+    else:
+        shingles = [
+            " ".join(tokens[i:i + shingle_size])
+            for i in range(len(tokens) - shingle_size + 1)
+        ]
+
+    hashes = np.fromiter(
+        (
+            int.from_bytes(
+                hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(),
+                "little",
+            )
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+    bits = (hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)
+    votes = bits.sum(axis=0) * 2 > len(shingles)
+
+    return int((votes.astype(np.uint64) << _BIT_POSITIONS).sum())
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateFilter:
+    """
+    Finds near-duplicate texts with SimHash + LSH banding.
+
+    Fingerprints are split into 4 bands of 16 bits. Two texts within
+    max_distance <= 3 bits must agree on at least one band, so only
+    texts sharing a band bucket are compared.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        if max_distance >= _BANDS:
+            raise ValueError(
+                f"max_distance must be < {_BANDS} for banded lookup"
+            )
+        self.max_distance = max_distance
+
+    def groups(self, texts: List[str]) -> Dict[int, List[int]]:
+        """
+        Map each kept text index to the indices it absorbs.
+
+        The first occurrence of a near-duplicate cluster is kept.
+        """
+        buckets: Dict[Tuple[int, int], List[int]] = {}
+        fingerprints: List[int] = []
+        groups: Dict[int, List[int]] = {}
+        mask = (1 << _BAND_BITS) - 1
+
+        for i, text in enumerate(texts):
+            fp = simhash(text)
+            fingerprints.append(fp)
+            keys = [(b, (fp >> (b * _BAND_BITS)) & mask) for b in range(_BANDS)]
+
+            match = None
+            for key in keys:
+                for kept in buckets.get(key, ()):
+                    if hamming(fp, fingerprints[kept]) <= self.max_distance:
+                        match = kept
+                        break
+                if match is not None:
+                    break
+
+            if match is not None:
+                groups[match].append(i)
+                continue
+
+            groups[i] = []
+            for key in keys:
+                buckets.setdefault(key, []).append(i)
+
+        return groups
+
+
+def collapse_duplicates(
+    texts: List[str],
+    metadatas: List[Dict],
+    max_distance: int = 3,
+) -> Tuple[List[str], List[Dict], Dict[str, float]]:
+    """
+    Collapse near-duplicate chunks into one entry each.
+
+    The kept entry's metadata gains "sources" (every distinct source
+    of the cluster) and "duplicates" (metadata of absorbed chunks,
+    without their text).
+    """
+    groups = NearDuplicateFilter(max_distance).groups(texts)
+
+    kept_texts = []
+    kept_meta = []
+
+    for kept, dups in groups.items():
+        meta = dict(metadatas[kept])
+
+        if dups:
+            absorbed = [
+                {k: v for k, v in metadatas[d].items() if k != "text"}
+                for d in dups
+            ]
+            sources = [meta.get("source")] + [a.get("source") for a in absorbed]
+            meta["sources"] = list(dict.fromkeys(s for s in sources if s))
+            meta["duplicates"] = absorbed
+
+        kept_texts.append(texts[kept])
+        kept_meta.append(meta)
+
+    total = len(texts)
+    stats = {
+        "chunks_in": total,
+        "chunks_kept": len(kept_texts),
+        "duplicates_removed": total - len(kept_texts),
+        "dedup_ratio": (total - len(kept_texts)) / total if total else 0.0,
+    }
+
+    return kept_texts, kept_meta, stats
@@ -0,0 +1,432 @@
+# rag/embedding_cache.py
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: in-process locking only
+    fcntl = None
+
+from rag.embeddings import EmbeddingBackend
+from rag.single_flight import SingleFlight
+from rag.wal import WalConnection
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def backend_namespace(backend: EmbeddingBackend) -> str:
+    """
+    (backend id, model version) part of the cache key.
+
+    The version is a digest of the backend spec minus streaming
+    statistics, so any change that alters vectors changes it.
+    """
+    spec = {k: v for k, v in backend.spec().items() if k != "num_docs"}
+    version = hashlib.sha1(
+        json.dumps(spec, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:12]
+    return f"{backend.backend_id}-{version}"
+
+
+class MmapVectorStore:
+    """
+    Append-only float32 vector file plus a SQLite (WAL) key index.
+
+    Vectors are read through np.memmap, so every worker process on
+    the host shares the same page cache. Appends take an exclusive
+    file lock; lookups are lock-free on the vector file.
+
+    The file is capped at max_bytes: an append that would pass the
+    cap starts a new, empty generation (new file, key index
+    cleared). The old file is unlinked, not truncated, so readers
+    that still map it keep valid pages until they remap.
+    """
+
+    def __init__(self, path_prefix: str, dim: int, max_bytes: Optional[int] = None):
+        self.dim = dim
+        self.path_prefix = path_prefix
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._mmap: Optional[np.memmap] = None
+        self._mmap_generation = -1
+
+        self._db = WalConnection(
+            f"{path_prefix}.sqlite",
+            schema=[
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER)",
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)",
+            ],
+        )
+
+    def vec_path(self, generation: int) -> str:
+        # generation 0 keeps the original file name
+        if generation:
+            return f"{self.path_prefix}.{generation}.f32"
+        return f"{self.path_prefix}.f32"
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, int] = {}
+
+        with self._lock:
+            conn = self._db.conn
+            # one read snapshot: rows always belong to this generation
+            conn.execute("BEGIN")
+            try:
+                generation = self._generation(conn)
+                for start in range(0, len(keys), 500):
+                    batch = keys[start:start + 500]
+                    marks = ",".join("?" * len(batch))
+                    rows = conn.execute(
+                        f"SELECT key, row FROM entries WHERE key IN ({marks})",
+                        batch,
+                    ).fetchall()
+                    found.update(rows)
+            finally:
+                conn.execute("COMMIT")
+
+        if not found:
+            return {}
+
+        vectors = self._vectors(generation, max(found.values()) + 1)
+        if vectors is None:
+            return {}
+
+        return {key: np.array(vectors[row]) for key, row in found.items()}
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        if not items:
+            return
+
+        keys = list(items)
+        block = np.ascontiguousarray(
+            np.vstack([items[k] for k in keys]), dtype=np.float32
+        )
+
+        with self._lock, open(f"{self.path_prefix}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                conn = self._db.conn
+                generation = self._generation(conn)
+                path = self.vec_path(generation)
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+
+                if self.max_bytes and size and size + block.nbytes > self.max_bytes:
+                    generation = self._rotate(conn, generation)
+                    path = self.vec_path(generation)
+
+                with open(path, "ab") as f:
+                    size = f.seek(0, os.SEEK_END)
+                    row_bytes = self.dim * 4
+                    if size % row_bytes:
+                        # drop a torn row left by an interrupted writer
+                        f.truncate(size - size % row_bytes)
+                        size -= size % row_bytes
+                    first_row = size // row_bytes
+                    f.write(block.tobytes())
+                    f.flush()
+
+                conn.executemany(
+                    "INSERT OR IGNORE INTO entries (key, row) VALUES (?, ?)",
+                    [(k, first_row + i) for i, k in enumerate(keys)],
+                )
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def nbytes(self) -> int:
+        path = self.vec_path(self._generation(self._db.conn))
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def _generation(self, conn) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def _rotate(self, conn, generation: int) -> int:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM entries")
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)",
+                (generation + 1,),
+            )
+        try:
+            os.unlink(self.vec_path(generation))
+        except OSError:
+            pass
+        return generation + 1
+
+    def _vectors(self, generation: int, min_rows: int) -> Optional[np.memmap]:
+        # Re-map when another writer has grown or rotated the file
+        if (
+            self._mmap is None
+            or self._mmap_generation != generation
+            or len(self._mmap) < min_rows
+        ):
+            path = self.vec_path(generation)
+            try:
+                rows = os.path.getsize(path) // (self.dim * 4)
+                if rows < min_rows:
+                    return None
+                self._mmap = np.memmap(
+                    path, dtype=np.float32, mode="r", shape=(rows, self.dim)
+                )
+            except (OSError, ValueError):
+                # rotated away between the index read and the map
+                return None
+            self._mmap_generation = generation
+        return self._mmap
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache.
+
+    Keys are (backend id, model version, content hash). Document
+    embeddings (persist=True, ingest time) go to a per-namespace
+    MmapVectorStore shared by all workers and capped at max_bytes.
+    Query-time text (questions, turns, snippet sentences) only goes
+    to a bounded in-process LRU, so serving never grows the disk.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        lru_size: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.cache_dir = cache_dir or os.getenv(
+            "MIMIR_EMBEDDING_CACHE_DIR", "data/embedding_cache"
+        )
+        self.lru_size = lru_size if lru_size is not None else int(
+            os.getenv("MIMIR_EMBEDDING_LRU_SIZE", "2048")
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv("MIMIR_EMBEDDING_CACHE_MAX_BYTES", str(1 << 30))
+        )
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._stores: Dict[str, MmapVectorStore] = {}
+        self._lock = threading.Lock()
+        # concurrent misses for the same key are computed once
+        self._flights = SingleFlight()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(
+        self,
+        backend: EmbeddingBackend,
+        texts: List[str],
+        compute: Callable[[List[str]], np.ndarray],
+        persist: bool = False,
+    ) -> np.ndarray:
+        """
+        Return vectors for texts, computing (and caching) only misses.
+
+        persist=True uses the shared on-disk store (documents),
+        otherwise the in-process LRU only.
+        """
+        namespace = backend_namespace(backend)
+        keys = [f"{namespace}:{content_hash(t)}" for t in texts]
+        found = self._lookup(namespace, keys, persist)
+
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            # identical texts within a batch are computed once
+            unique = list(dict.fromkeys(keys[i] for i in missing))
+            first = {}
+            for i in missing:
+                first.setdefault(keys[i], texts[i])
+
+            # keys another thread is already computing are waited on
+            flights = {k: self._flights.begin(k) for k in unique}
+            own = [k for k in unique if flights[k][1]]
+
+            if own:
+                try:
+                    computed = np.asarray(
+                        compute([first[k] for k in own]), dtype=np.float32
+                    )
+                    new_items = dict(zip(own, computed))
+                    self._store(namespace, new_items, persist)
+                except BaseException as error:
+                    for k in own:
+                        self._flights.finish(k, error=error)
+                    raise
+
+                for k, vec in new_items.items():
+                    self._flights.finish(k, vec)
+                found.update(new_items)
+
+            for k in unique:
+                if k not in found:
+                    found[k] = flights[k][0].result()
+
+        return np.vstack([found[k] for k in keys])
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "lru_entries": len(self._lru),
+            "coalesced": self._flights.shared,
+            "disk_bytes": sum(s.nbytes() for s in list(self._stores.values())),
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        lru_bytes = sum(v.nbytes for v in list(self._lru.values()))
+        return {
+            "lru_entries": len(self._lru),
+            "lru_bytes": lru_bytes,
+            "total": lru_bytes,
+        }
+
+    # ======================
+    # HELPERS
+    # ======================
+    def _lookup(self, namespace: str, keys: List[str], persist: bool) -> Dict[str, np.ndarray]:
+        if persist:
+            store = self._stores.get(namespace) or self._open_existing(namespace)
+            if store is None:
+                return {}
+            return store.get_many(list(dict.fromkeys(keys)))
+
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vec
+        return found
+
+    def _store(self, namespace: str, items: Dict[str, np.ndarray], persist: bool) -> None:
+        if not persist:
+            self._remember(items)
+            return
+
+        store = self._stores.get(namespace)
+        if store is None:
+            dim = len(next(iter(items.values())))
+            store = self._open(namespace, dim)
+        store.put_many(items)
+
+    def _remember(self, items: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vec in items.items():
+                self._lru[key] = vec
+                self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _open_existing(self, namespace: str) -> Optional[MmapVectorStore]:
+        meta_path = os.path.join(self.cache_dir, f"{namespace}.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            dim = json.load(f)["dim"]
+        return self._open(namespace, dim)
+
+    def _open(self, namespace: str, dim: int) -> MmapVectorStore:
+        with self._lock:
+            if namespace in self._stores:
+                return self._stores[namespace]
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            meta_path = os.path.join(self.cache_dir, f"{namespace}.json")
+            if not os.path.exists(meta_path):
+                with open(meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"namespace": namespace, "dim": dim}, f)
+
+            store = MmapVectorStore(
+                os.path.join(self.cache_dir, namespace), dim, max_bytes=self.max_bytes
+            )
+            self._stores[namespace] = store
+            return store
+
+
+class CachedEmbeddingBackend(EmbeddingBackend):
+    """
+    Wraps a stateless backend so document embeddings (embed_batch)
+    go through the persistent EmbeddingCache store and query-time
+    text (transform_batch, embed_query) through its in-memory LRU.
+    Stateful backends (TF-IDF refits per batch) are passed through
+    untouched.
+    """
+
+    def __init__(self, backend: EmbeddingBackend, cache: EmbeddingCache):
+        self.inner = backend
+        self.cache = cache
+        self.backend_id = backend.backend_id
+        self.stateless = backend.stateless
+
+    def __getattr__(self, name):
+        # doc_freq, num_docs, merge_idf, ... live on the inner backend
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def embed(self, text: str):
+        return self.embed_query(text)
+
+    def embed_query(self, text: str):
+        if not self.stateless:
+            return self.inner.embed_query(text)
+        return self.inner.weight_query(self.transform_batch([text or ""]))
+
+    def embed_batch(self, texts: List[str], transform=None):
+        if not self.stateless:
+            return self.inner.embed_batch(texts)
+
+        vectors = self.cache.get_or_compute(
+            self.inner, texts, transform or self.inner.transform_batch, persist=True
+        )
+        self.inner.observe_batch(vectors)
+        return vectors
+
+    def transform_batch(self, texts: List[str]):
+        if not self.stateless:
+            return self.inner.transform_batch(texts)
+        return self.cache.get_or_compute(self.inner, texts, self.inner.transform_batch)
+
+    def observe_batch(self, vectors) -> None:
+        self.inner.observe_batch(vectors)
+
+    def reset_stats(self) -> None:
+        self.inner.reset_stats()
+
+    def weight_query(self, vectors):
+        return self.inner.weight_query(vectors)
+
+    def spec(self):
+        return self.inner.spec()
+
+    def memory_usage(self) -> Dict[str, int]:
+        return self.inner.memory_usage()
+
+
+_default_cache: Optional[EmbeddingCache] = None
+_default_lock = threading.Lock()
+
+
+def default_embedding_cache() -> EmbeddingCache:
+    """
+    Process-wide cache shared by ingestion and query paths.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
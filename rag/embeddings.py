@@ -1,17 +1,89 @@
 import re
-from sklearn.feature_extraction.text import TfidfVectorizer
+from typing import Any, Callable, Dict, List, Optional
 
+import numpy as np
 
-class EmbeddingModel:
+from rag.sizing import approx_sizeof
+
+
+def _sklearn_text():
+    # scikit-learn takes most of a second to import; only pay for it
+    # on the first embed, not at server start
+    from sklearn.feature_extraction import text
+
+    return text
+
+
+class EmbeddingBackend:
+    """
+    Interface every embedding backend implements.
+
+    - embed_batch(texts): embed documents (may fit, for stateful backends)
+    - embed_query(text):  embed a query in the same space as the documents
+    - transform_batch(texts): embed documents without changing any state
+    - spec(): JSON-serializable description, enough to rebuild the
+      backend elsewhere via create_backend(spec)
+
+    Stateless backends can embed in any process and append to an
+    existing index without re-vectorizing the corpus.
+    """
+
+    backend_id = "base"
+    stateless = False
+
+    def embed(self, text: str):
+        raise NotImplementedError
+
+    def embed_query(self, text: str):
+        raise NotImplementedError
+
+    def embed_batch(self, texts: List[str]):
+        raise NotImplementedError
+
+    def transform_batch(self, texts: List[str]):
+        raise NotImplementedError
+
+    def observe_batch(self, vectors) -> None:
+        """
+        Update streaming statistics from document vectors (no-op by default).
+        """
+
+    def reset_stats(self) -> None:
+        """
+        Forget streaming statistics before re-embedding a corpus.
+        """
+
+    def weight_query(self, vectors):
+        """
+        Turn transform_batch() output into query vectors (identity by default).
+        """
+        return vectors
+
+    def spec(self) -> Dict[str, Any]:
+        return {"backend": self.backend_id}
+
+    def memory_usage(self) -> Dict[str, int]:
+        return {"total": 0}
+
+
+class EmbeddingModel(EmbeddingBackend):
     """
     Simple TF-IDF embedding model with safety checks.
     """
 
+    backend_id = "tfidf"
+
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(
-            stop_words="english",
-            token_pattern=r"(?u)\b\w+\b"
-        )
+        self._vectorizer = None
+
+    @property
+    def vectorizer(self):
+        if self._vectorizer is None:
+            self._vectorizer = _sklearn_text().TfidfVectorizer(
+                stop_words="english",
+                token_pattern=r"(?u)\b\w+\b"
+            )
+        return self._vectorizer
 
     def _has_valid_tokens(self, text: str) -> bool:
         # Check if text has at least one alphabetic token
@@ -26,6 +98,28 @@ class EmbeddingModel:
         vec = self.vectorizer.transform([text]).toarray()
         return vec.tolist()
 
+    def embed_query(self, text: str):
+        """
+        Embed a query in the space of the last fitted batch.
+
+        Unlike embed(), this does not refit, so the result is
+        comparable with vectors produced by embed_batch().
+        """
+        if not hasattr(self.vectorizer, "vocabulary_"):
+            return self.embed(text)
+
+        vec = self.vectorizer.transform([text or ""]).toarray()
+        return vec.tolist()
+
+    def transform_batch(self, texts):
+        """
+        Embed texts in the fitted space without refitting.
+        """
+        if not hasattr(self.vectorizer, "vocabulary_"):
+            return [[0.0] for _ in texts]
+
+        return self.vectorizer.transform(texts).toarray().tolist()
+
     def embed_batch(self, texts):
         valid_texts = [t for t in texts if self._has_valid_tokens(t)]
 
@@ -35,3 +129,188 @@ class EmbeddingModel:
         self.vectorizer.fit(valid_texts)
         vectors = self.vectorizer.transform(texts).toarray()
         return vectors.tolist()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Approximate bytes held by the fitted vocabulary and IDF weights.
+        """
+        vocab = getattr(self._vectorizer, "vocabulary_", {})
+        idf = getattr(self._vectorizer, "idf_", None)
+        stop_words = getattr(self._vectorizer, "stop_words_", set())
+
+        usage = {
+            "vocabulary_bytes": approx_sizeof(vocab),
+            "idf_bytes": approx_sizeof(idf) if idf is not None else 0,
+            "stop_words_bytes": approx_sizeof(stop_words),
+            "vocabulary_terms": len(vocab),
+        }
+        usage["total"] = (
+            usage["vocabulary_bytes"]
+            + usage["idf_bytes"]
+            + usage["stop_words_bytes"]
+        )
+        return usage
+
+
+class HashingEmbeddingModel(EmbeddingBackend):
+    """
+    Stateless feature-hashing embeddings.
+
+    Terms are hashed into a fixed number of dimensions, so there is
+    no vocabulary to fit or ship: any worker with the same spec
+    produces the same vectors, and new documents can be appended to
+    an index forever.
+
+    Document vectors use (optionally sublinear) TF only and are L2
+    normalized. IDF is estimated from a streaming document-frequency
+    count and applied on the query side, so improving the estimate
+    never invalidates stored vectors.
+    """
+
+    backend_id = "hashing"
+    stateless = True
+
+    def __init__(
+        self,
+        dim: int = 2048,
+        sublinear_tf: bool = True,
+        use_idf: bool = True,
+    ):
+        self.dim = dim
+        self.sublinear_tf = sublinear_tf
+        self.use_idf = use_idf
+
+        self._vectorizer = None
+
+        # streaming IDF estimate
+        self.doc_freq = np.zeros(dim, dtype=np.int64)
+        self.num_docs = 0
+
+    @property
+    def vectorizer(self):
+        if self._vectorizer is None:
+            self._vectorizer = _sklearn_text().HashingVectorizer(
+                n_features=self.dim,
+                stop_words="english",
+                token_pattern=r"(?u)\b\w+\b",
+                alternate_sign=False,
+                norm=None,
+            )
+        return self._vectorizer
+
+    # ======================
+    # STREAMING IDF
+    # ======================
+    def partial_fit(self, texts: List[str]) -> "HashingEmbeddingModel":
+        """
+        Update document frequencies with a new batch.
+        """
+        self.observe_batch(self.transform_batch(texts))
+        return self
+
+    def observe_batch(self, vectors) -> None:
+        # A feature is present in a document iff its TF weight is non-zero
+        if not self.use_idf:
+            return
+        vectors = np.asarray(vectors)
+        self.doc_freq += np.count_nonzero(vectors, axis=0)
+        self.num_docs += len(vectors)
+
+    def reset_stats(self) -> None:
+        self.doc_freq[:] = 0
+        self.num_docs = 0
+
+    def merge_idf(self, doc_freq: np.ndarray, num_docs: int) -> None:
+        """
+        Merge document frequencies gathered by another worker.
+        """
+        self.doc_freq += np.asarray(doc_freq, dtype=np.int64)
+        self.num_docs += int(num_docs)
+
+    def idf(self) -> np.ndarray:
+        return (
+            np.log((1.0 + self.num_docs) / (1.0 + self.doc_freq)) + 1.0
+        ).astype(np.float32)
+
+    # ======================
+    # EMBEDDING
+    # ======================
+    def embed(self, text: str):
+        return self.embed_query(text)
+
+    def embed_query(self, text: str):
+        return self.weight_query(self.transform_batch([text or ""]))
+
+    def weight_query(self, vectors):
+        vectors = np.array(vectors, dtype=np.float32)
+        if self.use_idf and self.num_docs:
+            vectors *= self.idf()
+        return _l2_normalize(vectors)
+
+    def embed_batch(
+        self,
+        texts: List[str],
+        update_idf: bool = True,
+        transform: Optional[Callable[[List[str]], np.ndarray]] = None,
+    ):
+        """
+        Embed documents. transform lets callers compute the
+        (stateless) TF vectors elsewhere, e.g. in worker processes.
+        """
+        vectors = np.asarray((transform or self.transform_batch)(texts))
+        if update_idf:
+            self.observe_batch(vectors)
+        return vectors
+
+    def transform_batch(self, texts: List[str]):
+        return _l2_normalize(self._tf(texts))
+
+    def spec(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend_id,
+            "dim": self.dim,
+            "sublinear_tf": self.sublinear_tf,
+            "use_idf": self.use_idf,
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        return {
+            "idf_bytes": self.doc_freq.nbytes,
+            "total": self.doc_freq.nbytes,
+        }
+
+    def _tf(self, texts: List[str]) -> np.ndarray:
+        counts = self.vectorizer.transform(texts).astype(np.float32)
+        if self.sublinear_tf:
+            counts.data = np.log1p(counts.data)
+        return counts.toarray()
+
+
+def _l2_normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+BACKENDS = {
+    EmbeddingModel.backend_id: EmbeddingModel,
+    HashingEmbeddingModel.backend_id: HashingEmbeddingModel,
+}
+
+
+def create_backend(spec) -> EmbeddingBackend:
+    """
+    Build a backend from a name or a spec dict produced by spec().
+    """
+    if isinstance(spec, str):
+        spec = {"backend": spec}
+
+    spec = dict(spec)
+    name = spec.pop("backend", HashingEmbeddingModel.backend_id)
+
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend '{name}'. Use one of {tuple(BACKENDS)}"
+        )
+
+    return BACKENDS[name](**spec)
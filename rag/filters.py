@@ -0,0 +1,203 @@
+# rag/filters.py
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+FILTER_FIELDS = ("source", "domain", "page", "ingested_at")
+
+# Fields that also accept {"gte": .., "lt": ..} range conditions
+RANGE_FIELDS = ("page", "ingested_at")
+
+_RANGE_OPS = ("gt", "gte", "lt", "lte")
+
+# JSON scalars an equality clause can match
+_SCALARS = (str, int, float, bool, type(None))
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class MetadataFilterIndex:
+    """
+    Precomputed id sets over chunk metadata.
+
+    Each (field, value) pair maps to a sorted id array; range fields
+    also keep a value-sorted column, so a range is two binary
+    searches. A filter resolves to a sorted array of allowed chunk
+    ids before any scoring happens, and callers score only those
+    ids: the more selective the filter, the cheaper the query.
+
+    Filter syntax (all clauses must hold):
+        {"source": "a.txt"}                    equality
+        {"source": ["a.txt", "b.txt"]}         any of
+        {"ingested_at": {"gte": 1700000000}}   range (gt/gte/lt/lte)
+    """
+
+    def __init__(self, fields: Iterable[str] = FILTER_FIELDS):
+        self.fields = tuple(fields)
+        self.num_docs = 0
+        # field -> value -> sorted ids
+        self._postings: Dict[str, Dict[Any, np.ndarray]] = {}
+        # field -> (sorted values, ids in the same order)
+        self._columns: Dict[str, tuple] = {}
+
+    def build(self, metadatas: List[Dict[str, Any]]) -> "MetadataFilterIndex":
+        postings: Dict[str, Dict[Any, List[int]]] = {f: {} for f in self.fields}
+        columns: Dict[str, tuple] = {f: ([], []) for f in self.fields if f in RANGE_FIELDS}
+
+        for doc_id, meta in enumerate(metadatas):
+            for field in self.fields:
+                for value in _field_values(meta, field):
+                    postings[field].setdefault(value, []).append(doc_id)
+                    if field in columns and isinstance(value, (int, float)):
+                        columns[field][0].append(value)
+                        columns[field][1].append(doc_id)
+
+        self.num_docs = len(metadatas)
+        self._postings = {
+            field: {
+                value: np.unique(np.asarray(ids, dtype=np.int64))
+                for value, ids in values.items()
+            }
+            for field, values in postings.items()
+        }
+
+        self._columns = {}
+        for field, (values, ids) in columns.items():
+            values = np.asarray(values, dtype=np.float64)
+            order = np.argsort(values, kind="stable")
+            self._columns[field] = (values[order], np.asarray(ids, dtype=np.int64)[order])
+
+        return self
+
+    # ======================
+    # SELECTION
+    # ======================
+    def select(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        Sorted ids allowed by filters, or None when nothing is filtered.
+        """
+        if not filters:
+            return None
+
+        validate_filters(filters, self.fields)
+
+        clauses = [
+            self._clause(field, condition)
+            for field, condition in filters.items()
+        ]
+
+        # intersect smallest first: the result only shrinks
+        clauses.sort(key=len)
+        ids = clauses[0]
+        for other in clauses[1:]:
+            if not len(ids):
+                break
+            ids = np.intersect1d(ids, other, assume_unique=True)
+
+        return ids
+
+    def values(self, field: str) -> List[Any]:
+        return sorted(self._postings.get(field, {}), key=str)
+
+    def memory_usage(self) -> Dict[str, int]:
+        postings = sum(
+            ids.nbytes
+            for values in self._postings.values()
+            for ids in values.values()
+        )
+        columns = sum(v.nbytes + i.nbytes for v, i in self._columns.values())
+        return {
+            "postings_bytes": postings,
+            "columns_bytes": columns,
+            "total": postings + columns,
+        }
+
+    # ======================
+    # HELPERS
+    # ======================
+    def _clause(self, field: str, condition: Any) -> np.ndarray:
+        if isinstance(condition, dict):
+            return self._range(field, condition)
+
+        if isinstance(condition, (list, tuple, set)):
+            parts = [self._postings.get(field, {}).get(v, _EMPTY) for v in condition]
+            return np.unique(np.concatenate(parts)) if parts else _EMPTY
+
+        return self._postings.get(field, {}).get(condition, _EMPTY)
+
+    def _range(self, field: str, condition: Dict[str, Any]) -> np.ndarray:
+        if field not in self._columns:
+            return _EMPTY
+
+        values, ids = self._columns[field]
+        lo, hi = 0, len(values)
+
+        if "gte" in condition:
+            lo = max(lo, np.searchsorted(values, condition["gte"], side="left"))
+        if "gt" in condition:
+            lo = max(lo, np.searchsorted(values, condition["gt"], side="right"))
+        if "lte" in condition:
+            hi = min(hi, np.searchsorted(values, condition["lte"], side="right"))
+        if "lt" in condition:
+            hi = min(hi, np.searchsorted(values, condition["lt"], side="left"))
+
+        if lo >= hi:
+            return _EMPTY
+        return np.unique(ids[lo:hi])
+
+
+def validate_filters(
+    filters: Optional[Dict[str, Any]],
+    fields: Iterable[str] = FILTER_FIELDS,
+) -> None:
+    """
+    Raise ValueError on unknown fields or range operators, range
+    bounds that are not numbers and values that are not scalars.
+    """
+    if filters is not None and not isinstance(filters, dict):
+        raise ValueError("Filters must be an object of field conditions")
+
+    for field, condition in (filters or {}).items():
+        if field not in fields:
+            raise ValueError(f"Unsupported filter field: {field}")
+
+        if isinstance(condition, dict):
+            if field not in RANGE_FIELDS:
+                raise ValueError(f"Range filters are not supported on: {field}")
+            unknown = set(condition) - set(_RANGE_OPS)
+            if unknown:
+                raise ValueError(f"Unknown range operator(s): {sorted(unknown)}")
+            for op, bound in condition.items():
+                if isinstance(bound, bool) or not isinstance(bound, (int, float)):
+                    raise ValueError(f"Range bound {field}.{op} must be a number")
+            continue
+
+        values = condition if isinstance(condition, (list, tuple, set)) else [condition]
+        for value in values:
+            if not isinstance(value, _SCALARS):
+                raise ValueError(f"Filter values for {field} must be strings or numbers")
+
+
+def select_domains(filters: Optional[Dict[str, Any]], domains: Iterable[str]) -> List[str]:
+    """
+    Domains a filter's "domain" clause can match, in the given order.
+    """
+    domains = list(domains)
+    wanted = (filters or {}).get("domain")
+    if wanted is None or isinstance(wanted, dict):
+        return domains
+
+    if isinstance(wanted, (list, tuple, set)):
+        return [d for d in domains if d in wanted]
+    return [wanted] if wanted in domains else []
+
+
+def _field_values(meta: Dict[str, Any], field: str) -> List[Any]:
+    # collapsed near-duplicates answer for every source they stand for
+    if field == "source" and meta.get("sources"):
+        return list(meta["sources"])
+
+    value = meta.get(field)
+    return [] if value is None else [value]
@@ -0,0 +1,79 @@
+# rag/fusion.py
+
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+Ranking = List[Tuple[int, float]]
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first.
+
+    Uses argpartition so only the k winners are sorted.
+    """
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Ranking],
+    top_k: int,
+    weights: Optional[Sequence[float]] = None,
+    k: int = 60,
+) -> Ranking:
+    """
+    Fuse ranked lists with (weighted) reciprocal rank fusion.
+
+    Each ranking is a best-first list of (doc_id, score).
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[int, float] = {}
+
+    for ranking, weight in zip(rankings, weights):
+        for rank, (doc_id, _) in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank + 1)
+
+    return heapq.nlargest(top_k, fused.items(), key=lambda item: item[1])
+
+
+def weighted_score_fusion(
+    rankings: Sequence[Ranking],
+    top_k: int,
+    weights: Optional[Sequence[float]] = None,
+) -> Ranking:
+    """
+    Fuse ranked lists by a weighted sum of max-normalized scores.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[int, float] = {}
+
+    for ranking, weight in zip(rankings, weights):
+        if not ranking:
+            continue
+        best = max(score for _, score in ranking) or 1.0
+        for doc_id, score in ranking:
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight * score / best
+
+    return heapq.nlargest(top_k, fused.items(), key=lambda item: item[1])
+
+
+def fuse(
+    rankings: Sequence[Ranking],
+    top_k: int,
+    method: str = "rrf",
+    weights: Optional[Sequence[float]] = None,
+) -> Ranking:
+    if method == "weighted":
+        return weighted_score_fusion(rankings, top_k, weights)
+    return reciprocal_rank_fusion(rankings, top_k, weights)
@@ -2,21 +2,40 @@
 
 import os
 import pickle
-from typing import List, Dict
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Dict, Optional, Union
 
 import numpy as np
 
-try:
-    import faiss
-except ImportError:
-    faiss = None
-
-from rag.embeddings import EmbeddingModel
+from rag.embeddings import EmbeddingBackend, create_backend
+from rag.embedding_cache import CachedEmbeddingBackend, EmbeddingCache
+from rag.bm25 import BM25Index
+from rag.dedup import collapse_duplicates
+from rag.sharding import ShardPolicy
+from rag.snippets import clip_offsets, sentence_offsets
+from rag.snapshots import SnapshotStore
+from rag.text_arena import TextArena
+from rag.ann import (
+    ENCODINGS,
+    INDEX_TYPES,
+    build_faiss_index,
+    partition_name,
+    require_faiss,
+    save_embedding_state,
+    vectors_path,
+    write_manifest,
+)
 
 
 class DocumentIngestor:
     """
     Handles document ingestion and FAISS index creation.
+
+    With partitions > 1 (default: ShardPolicy.from_env(), if
+    sharding is enabled) each domain is also written as that many
+    self-contained partitions, one per shard process.
     """
 
     def __init__(
@@ -25,18 +44,60 @@ class DocumentIngestor:
         index_dir: str = "data/indices",
         chunk_size: int = 500,
         overlap: int = 100,
-        embedding_model: str = "all-MiniLM-L6-v2",
+        embedding_model: Union[str, Dict[str, Any], EmbeddingBackend] = "hashing",
+        index_type: str = "flat",
+        encoding: str = "float32",
+        rerank: bool = True,
+        pq_m: int = 16,
+        dedup: bool = True,
+        dedup_max_distance: int = 3,
+        nlist: int = 256,
+        hnsw_m: int = 32,
+        train_sample: int = 50_000,
+        num_threads: Optional[int] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        num_workers: int = 1,
+        embed_batch_size: int = 1024,
+        partitions: Optional[int] = None,
     ):
-        if faiss is None:
-            raise ImportError(
-                "faiss not installed. Install with: pip install faiss-cpu"
-            )
+        require_faiss()
 
         self.data_dir = data_dir
         self.index_dir = index_dir
         self.chunk_size = chunk_size
         self.overlap = overlap
-        self.embedder = EmbeddingModel(embedding_model)
+
+        if index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index type '{index_type}'. Use one of {INDEX_TYPES}"
+            )
+        self.index_type = index_type
+
+        if encoding not in ENCODINGS:
+            raise ValueError(
+                f"Unknown encoding '{encoding}'. Use one of {ENCODINGS}"
+            )
+        self.encoding = encoding
+        self.rerank = rerank
+        self.pq_m = pq_m
+        self.dedup = dedup
+        self.dedup_max_distance = dedup_max_distance
+        self.dedup_stats: Dict = {}
+        self.nlist = nlist
+        self.hnsw_m = hnsw_m
+        self.train_sample = train_sample
+        self.num_threads = num_threads
+
+        self.embedder = (
+            embedding_model
+            if isinstance(embedding_model, EmbeddingBackend)
+            else create_backend(embedding_model)
+        )
+        if embedding_cache is not None:
+            self.embedder = CachedEmbeddingBackend(self.embedder, embedding_cache)
+        self.num_workers = num_workers
+        self.embed_batch_size = embed_batch_size
+        self.partitions = partitions
 
         os.makedirs(self.index_dir, exist_ok=True)
 
@@ -53,12 +114,94 @@ class DocumentIngestor:
 
         chunks, chunk_meta = self._chunk_texts(texts, metadata)
 
-        embeddings = self.embedder.embed_batch(chunks)
+        # filterable fields (see rag.filters)
+        ingested_at = time.time()
+        for meta in chunk_meta:
+            meta["domain"] = domain
+            meta["ingested_at"] = ingested_at
+
+        self.dedup_stats = {}
+        if self.dedup:
+            chunks, chunk_meta, self.dedup_stats = collapse_duplicates(
+                chunks, chunk_meta, max_distance=self.dedup_max_distance
+            )
+            print(
+                f"[✓] Dedup '{domain}': kept {self.dedup_stats['chunks_kept']}"
+                f"/{self.dedup_stats['chunks_in']} chunks "
+                f"(ratio {self.dedup_stats['dedup_ratio']:.1%})."
+            )
+
+        embeddings = self._embed_chunks(chunks)
+
+        parts = self._num_partitions(len(chunks))
+
+        self._build_index(domain, embeddings, chunk_meta, partitions=parts)
+
+        bm25 = self._build_bm25(domain, chunks)
+
+        self._build_text_arena(domain, chunks)
+
+        for part in range(parts if parts > 1 else 0):
+            self._build_partition(domain, part, parts, embeddings, chunk_meta, chunks, bm25)
+
+    def ingest_snapshot(self, domain: str, publish: bool = True, keep: int = 3) -> str:
+        """
+        Ingest a domain into a new version directory under index_dir
+        (see rag.snapshots) and publish it. Servers pick it up on
+        their next reload; the previous version stays intact.
+        """
+        store = SnapshotStore(self.index_dir)
+        version = store.create_version(domain)
+
+        root = self.index_dir
+        self.index_dir = store.version_dir(domain, version)
+        try:
+            self.ingest_domain(domain)
+        except Exception:
+            shutil.rmtree(self.index_dir, ignore_errors=True)
+            raise
+        finally:
+            self.index_dir = root
 
-        self._build_index(domain, embeddings, chunk_meta)
+        if publish:
+            store.publish(domain, version)
+            store.prune(domain, keep=keep)
+
+        return version
 
     # ---------- HELPERS ----------
 
+    def _embed_chunks(self, chunks: List[str]):
+        """
+        Embed chunks, fanning out to worker processes when the
+        backend is stateless. Workers share the embedding space by
+        construction; document frequencies are updated here from
+        the returned vectors.
+        """
+        if not self.embedder.stateless or self.num_workers <= 1:
+            return self.embedder.embed_batch(chunks)
+
+        return self.embedder.embed_batch(chunks, transform=self._parallel_transform)
+
+    def _parallel_transform(self, texts: List[str]) -> np.ndarray:
+        if len(texts) <= self.embed_batch_size:
+            # the uncached backend: cache lookups already happened upstream
+            base = getattr(self.embedder, "inner", self.embedder)
+            return np.asarray(base.transform_batch(texts))
+
+        batches = [
+            texts[i:i + self.embed_batch_size]
+            for i in range(0, len(texts), self.embed_batch_size)
+        ]
+        spec = self.embedder.spec()
+
+        with ProcessPoolExecutor(max_workers=self.num_workers) as pool:
+            results = list(
+                pool.map(_embed_worker, [spec] * len(batches), batches)
+            )
+
+        return np.vstack(results)
+
     def _load_documents(self, domain_path: str):
         texts = []
         metadata = []
@@ -85,6 +228,8 @@ class DocumentIngestor:
         chunk_meta = []
 
         for text, meta in zip(texts, metadata):
+            # on the whole text: a chunk may start or end mid-sentence
+            sentences = sentence_offsets(text)
             start = 0
             while start < len(text):
                 end = start + self.chunk_size
@@ -93,10 +238,13 @@ class DocumentIngestor:
                 chunks.append(chunk)
                 chunk_meta.append(
                     {
+                        **meta,
                         "text": chunk,
                         "source": meta["source"],
                         "start_char": start,
                         "end_char": end,
+                        # sentence spans for snippet extraction
+                        "sentences": clip_offsets(sentences, start, end),
                     }
                 )
 
@@ -109,18 +257,103 @@ class DocumentIngestor:
         domain: str,
         embeddings: np.ndarray,
         metadata: List[Dict],
+        **manifest_extra,
     ):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
         dim = embeddings.shape[1]
 
-        index = faiss.IndexFlatIP(dim)
-        index.add(embeddings)
+        index, params = build_faiss_index(
+            embeddings,
+            index_type=self.index_type,
+            encoding=self.encoding,
+            pq_m=self.pq_m,
+            nlist=self.nlist,
+            hnsw_m=self.hnsw_m,
+            train_sample=self.train_sample,
+            num_threads=self.num_threads,
+        )
 
         index_path = os.path.join(self.index_dir, f"{domain}.index")
         meta_path = os.path.join(self.index_dir, f"{domain}_meta.pkl")
 
-        faiss.write_index(index, index_path)
+        require_faiss().write_index(index, index_path)
 
+        # chunk text is stored once, in the compressed text arena
         with open(meta_path, "wb") as f:
-            pickle.dump(metadata, f)
+            pickle.dump(
+                [{k: v for k, v in m.items() if k != "text"} for m in metadata], f
+            )
 
-        print(f"[✓] Built index for domain '{domain}' with {len(metadata)} chunks.")
+        # Compressed codes are approximate: keep exact vectors on disk
+        # (memory-mapped at query time) to re-rank top candidates.
+        keep_exact = self.rerank and self.encoding != "float32"
+        if keep_exact:
+            np.save(vectors_path(self.index_dir, domain), embeddings)
+
+        write_manifest(
+            self.index_dir,
+            domain,
+            index_type=self.index_type,
+            dim=dim,
+            num_chunks=len(metadata),
+            params=params,
+            rerank_vectors=keep_exact,
+            embedding=save_embedding_state(self.index_dir, domain, self.embedder),
+            dedup=self.dedup_stats,
+            **manifest_extra,
+        )
+
+        print(
+            f"[✓] Built {self.index_type}/{self.encoding} index for domain '{domain}' "
+            f"with {len(metadata)} chunks."
+        )
+
+    def _build_bm25(self, domain: str, chunks: List[str]) -> BM25Index:
+        bm25_path = os.path.join(self.index_dir, f"{domain}_bm25.npz")
+        bm25 = BM25Index().build(chunks)
+        bm25.save(bm25_path)
+        return bm25
+
+    def _build_text_arena(self, domain: str, chunks: List[str]):
+        texts_path = os.path.join(self.index_dir, f"{domain}_texts.npz")
+        TextArena(chunks).save(texts_path)
+
+    def _num_partitions(self, num_chunks: int) -> int:
+        if self.partitions is not None:
+            parts = self.partitions
+        else:
+            policy = ShardPolicy.from_env()
+            parts = policy.parts(num_chunks) if policy else 1
+        return max(1, min(parts, num_chunks))
+
+    def _build_partition(
+        self,
+        domain: str,
+        part: int,
+        parts: int,
+        embeddings: np.ndarray,
+        metadata: List[Dict],
+        chunks: List[str],
+        bm25: BM25Index,
+    ):
+        """
+        Chunks with id % parts == part, as their own index, BM25
+        postings and text arena. The postings keep the domain-wide
+        idf and average length, so shard scores stay comparable.
+        """
+        ids = np.arange(part, len(chunks), parts)
+        name = partition_name(domain, part, parts)
+
+        self._build_index(
+            name,
+            np.asarray(embeddings)[ids],
+            [metadata[i] for i in ids],
+            partition=[part, parts],
+        )
+        bm25.subset(ids).save(os.path.join(self.index_dir, f"{name}_bm25.npz"))
+        self._build_text_arena(name, [chunks[i] for i in ids])
+
+
+def _embed_worker(spec: Dict[str, Any], texts: List[str]) -> np.ndarray:
+    spec = {k: v for k, v in spec.items() if k != "num_docs"}
+    return np.asarray(create_backend(spec).transform_batch(texts), dtype=np.float32)
@@ -0,0 +1,73 @@
+# rag/mmr.py
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    vectors: np.ndarray,
+    top_k: int,
+    lambda_: float = 0.7,
+) -> List[int]:
+    """
+    Maximal marginal relevance over a candidate pool.
+
+    relevance: (n,) relevance of each candidate (any scale; it is
+               max-normalized so it is comparable to cosine).
+    vectors:   (n, d) candidate vectors, used for redundancy.
+
+    The pairwise similarity matrix is computed once; each greedy
+    step is a vectorized update over the pool, so there are no
+    per-pair Python loops. Returns candidate positions, best first.
+    """
+    n = len(relevance)
+    if n == 0 or top_k <= 0:
+        return []
+
+    rel = np.asarray(relevance, dtype=np.float32)
+    peak = np.abs(rel).max()
+    if peak > 0:
+        rel = rel / peak
+
+    vecs = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vecs = vecs / norms
+    sim = vecs @ vecs.T
+
+    max_sim = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+
+    for _ in range(min(top_k, n)):
+        scores = lambda_ * rel - (1.0 - lambda_) * max_sim
+        scores[~available] = -np.inf
+
+        best = int(scores.argmax())
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_sim, sim[best], out=max_sim)
+
+    return selected
+
+
+def diversify(
+    ranked: List[Tuple[int, float]],
+    vectors: Optional[np.ndarray],
+    top_k: int,
+    lambda_: float = 0.7,
+) -> List[Tuple[int, float]]:
+    """
+    Re-rank a best-first (doc_id, score) pool with MMR.
+
+    vectors are the candidates' vectors in pool order; without them
+    the pool is simply truncated.
+    """
+    if vectors is None or len(ranked) <= 1:
+        return list(ranked[:top_k])
+
+    relevance = np.asarray([score for _, score in ranked], dtype=np.float32)
+    order = mmr_select(relevance, vectors, top_k, lambda_)
+    return [ranked[i] for i in order]
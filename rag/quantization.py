@@ -0,0 +1,170 @@
+# rag/quantization.py
+
+from typing import Optional
+
+import numpy as np
+
+
+ENCODINGS = ("float32", "float16", "int8", "pq")
+
+# Rows scored per block, bounds the float32 temporaries at query time
+_BLOCK_ROWS = 4096
+
+
+class CompressedVectors:
+    """
+    Numpy vector store with a selectable compressed encoding.
+
+    - float32: exact, 4 bytes / dim
+    - float16: 2 bytes / dim
+    - int8:    1 byte / dim + one float32 scale per row
+    - pq:      pq_m bytes / vector (product quantization, 8-bit codes)
+
+    scores(q) returns approximate inner products against every
+    stored vector; callers re-rank the top candidates exactly when
+    they need full accuracy.
+    """
+
+    def __init__(
+        self,
+        encoding: str = "float32",
+        pq_m: int = 16,
+        pq_iters: int = 15,
+        seed: int = 0,
+    ):
+        if encoding not in ENCODINGS:
+            raise ValueError(
+                f"Unknown encoding '{encoding}'. Use one of {ENCODINGS}"
+            )
+
+        self.encoding = encoding
+        self.pq_m = pq_m
+        self.pq_iters = pq_iters
+        self.seed = seed
+
+        self.dim = 0
+        self.codes: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return 0 if self.codes is None else len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            a.nbytes
+            for a in (self.codes, self.scales, self.centroids)
+            if a is not None
+        )
+
+    # ======================
+    # ENCODE
+    # ======================
+    def fit(self, vectors) -> "CompressedVectors":
+        x = np.asarray(vectors, dtype=np.float32)
+        if x.ndim != 2:
+            x = x.reshape(len(x), -1)
+        self.dim = x.shape[1]
+
+        if self.encoding == "float32":
+            self.codes = x
+
+        elif self.encoding == "float16":
+            self.codes = x.astype(np.float16)
+
+        elif self.encoding == "int8":
+            scales = np.abs(x).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.codes = np.round(x / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+
+        else:
+            self._fit_pq(x)
+
+        return self
+
+    # ======================
+    # SCORE
+    # ======================
+    def scores(self, query, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Approximate inner products, for every row or only for ids
+        (in ids order); a filtered call touches only those rows.
+        """
+        q = np.asarray(query, dtype=np.float32).reshape(-1)
+        size = len(self) if ids is None else len(ids)
+        if self.codes is None or q.shape[0] != self.dim:
+            return np.zeros(size, dtype=np.float32)
+
+        codes = self.codes if ids is None else self.codes[ids]
+
+        if self.encoding == "float32":
+            return codes @ q
+
+        if self.encoding == "pq":
+            return self._pq_scores(q, codes)
+
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _BLOCK_ROWS):
+            block = codes[start:start + _BLOCK_ROWS].astype(np.float32)
+            out[start:start + _BLOCK_ROWS] = block @ q
+
+        if self.scales is not None:
+            out *= self.scales if ids is None else self.scales[ids]
+
+        return out
+
+    # ======================
+    # PRODUCT QUANTIZATION
+    # ======================
+    def _fit_pq(self, x: np.ndarray) -> None:
+        n, dim = x.shape
+        m = max(1, min(self.pq_m, dim))
+        dsub = -(-dim // m)
+
+        # zero-pad so every subspace has the same width
+        padded = np.zeros((n, m * dsub), dtype=np.float32)
+        padded[:, :dim] = x
+        sub = padded.reshape(n, m, dsub)
+
+        ksub = min(256, n)
+        rng = np.random.default_rng(self.seed)
+        centroids = np.empty((m, ksub, dsub), dtype=np.float32)
+        codes = np.empty((n, m), dtype=np.uint8)
+
+        for j in range(m):
+            data = sub[:, j, :]
+            cent = data[rng.choice(n, size=ksub, replace=False)].copy()
+
+            for _ in range(self.pq_iters):
+                assign = _nearest(data, cent)
+                sums = np.zeros_like(cent)
+                np.add.at(sums, assign, data)
+                counts = np.bincount(assign, minlength=ksub)
+                filled = counts > 0
+                cent[filled] = sums[filled] / counts[filled, None]
+
+            centroids[j] = cent
+            codes[:, j] = _nearest(data, cent)
+
+        self.pq_m = m
+        self.centroids = centroids
+        self.codes = codes
+
+    def _pq_scores(self, q: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        m, _, dsub = self.centroids.shape
+        padded = np.zeros(m * dsub, dtype=np.float32)
+        padded[: self.dim] = q
+
+        # (m, ksub) lookup table of partial inner products
+        table = np.einsum("mkd,md->mk", self.centroids, padded.reshape(m, dsub))
+        return table[np.arange(m), codes].sum(axis=1)
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    dists = (
+        (centroids ** 2).sum(axis=1)[None, :]
+        - 2.0 * data @ centroids.T
+    )
+    return dists.argmin(axis=1)
@@ -1,30 +1,388 @@
+import logging
+import os
+import pickle
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from rag.ann import (
+    open_embedding_backend,
+    open_faiss_index,
+    open_rerank_vectors,
+    search_with_ids,
+    set_search_params,
+)
+from rag.bm25 import BM25Index
+from rag.filters import MetadataFilterIndex
+from rag.fusion import Ranking, fuse, top_k_indices
+from rag.mmr import diversify
+from rag.sizing import approx_sizeof
+from rag.text_arena import TextArena
+
+
+logger = logging.getLogger(__name__)
+
+
 class Retriever:
     """
     Simple in-memory retriever over indexed documents.
+
+    Dense vectors (when provided) and a BM25 inverted index are
+    searched side by side and fused into a single top-k.
+
+    With mmr_lambda set, a larger fused pool is re-ranked with
+    maximal marginal relevance so near-identical chunks do not
+    crowd the results.
+
+    Metadata filters resolve to an id set before scoring. Filters
+    that leave at most exact_filter_max chunks are scored exactly
+    against those vectors only; wider filters run inside FAISS
+    through an ID selector.
+
+    Chunk texts live in a compressed TextArena; only the blocks
+    holding returned hits are decompressed.
+
+    A query vector is taken to be in document space (term weights
+    only, e.g. a conversation's recency-weighted turns); the index's
+    own embedder applies its query weighting (the IDF saved at
+    ingest). A vector of another dimension is replaced by the query
+    text embedded with that embedder.
+
+    Chunks holding less than min_coverage of the query's (non stop
+    word) terms are left out like filtered ones, so an off-topic
+    question finds nothing instead of whatever shares one word
+    with it.
+
+    retrieve() is candidates() → rank() → hits(); shard processes
+    (see rag.sharding) return their candidates and the fusion runs
+    once over all of them.
     """
 
-    def __init__(self, embedder):
+    def __init__(
+        self,
+        embedder,
+        fusion: str = "rrf",
+        candidate_pool: int = 20,
+        rerank_factor: int = 4,
+        mmr_lambda: Optional[float] = None,
+        mmr_pool: int = 20,
+        exact_filter_max: int = 4096,
+        min_coverage: float = 0.5,
+    ):
         self.embedder = embedder
-        self.documents = []
+        self.fusion = fusion
+        self.candidate_pool = candidate_pool
+        self.rerank_factor = rerank_factor
+        self.mmr_lambda = mmr_lambda
+        self.mmr_pool = mmr_pool
+        self.exact_filter_max = exact_filter_max
+        self.min_coverage = min_coverage
+        self.documents = TextArena()
         self.metadatas = []
+        self.vectors: Optional[np.ndarray] = None
+        self.index = None
+        self.manifest: Dict = {}
+        self.rerank_vectors: Optional[np.ndarray] = None
+        self.bm25 = BM25Index()
+        self.filters = MetadataFilterIndex()
+
+    def add_documents(self, texts, metadatas, vectors=None):
+        texts = list(texts)
+        self.documents = TextArena(list(self.documents) + texts)
+        self.metadatas.extend(metadatas)
+
+        if vectors is not None:
+            vectors = np.asarray(vectors, dtype=np.float32)
+            self.vectors = (
+                vectors if self.vectors is None
+                else np.vstack([self.vectors, vectors])
+            )
+
+        self.bm25.build(self.documents)
+        self.filters.build(self.metadatas)
+
+    def load_domain(
+        self,
+        index_dir: str,
+        domain: str,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> None:
+        """
+        Load a domain written by DocumentIngestor: chunk metadata,
+        the FAISS index (opened per its manifest) and BM25 postings.
+        """
+        meta_path = os.path.join(index_dir, f"{domain}_meta.pkl")
+        index_path = os.path.join(index_dir, f"{domain}.index")
+        bm25_path = os.path.join(index_dir, f"{domain}_bm25.npz")
+        texts_path = os.path.join(index_dir, f"{domain}_texts.npz")
+
+        with open(meta_path, "rb") as f:
+            metadata = pickle.load(f)
 
-    def add_documents(self, texts, metadatas):
-        for t, m in zip(texts, metadatas):
-            self.documents.append(t)
-            self.metadatas.append(m)
+        # older indices keep chunk text in the metadata entries
+        texts = [m.pop("text", "") for m in metadata]
+        for m in metadata:
+            # indices written before domains were recorded per chunk
+            m.setdefault("domain", domain)
 
-    def retrieve(self, query_vector, top_k=5):
+        arena = (
+            TextArena.load(texts_path) if os.path.exists(texts_path)
+            else TextArena(texts)
+        )
+
+        if self.documents:
+            # Merging into an existing corpus: FAISS ids would not line up
+            self.add_documents(list(arena), metadata)
+            return
+
+        self.documents = arena
+        self.metadatas = metadata
+
+        if os.path.exists(index_path):
+            self.index, self.manifest = open_faiss_index(
+                index_dir, domain, nprobe=nprobe, ef_search=ef_search
+            )
+            if self.rerank_factor > 1:
+                self.rerank_vectors = open_rerank_vectors(index_dir, domain)
+            if self.embedder is None:
+                self.embedder = open_embedding_backend(index_dir, domain)
+            if self.embedder is None:
+                logger.warning(
+                    "%s: index has no embedding spec (built before manifests); "
+                    "serving BM25 only. Re-ingest it to enable dense search.",
+                    os.path.join(index_dir, domain),
+                )
+
+        if os.path.exists(bm25_path):
+            self.bm25 = BM25Index.load(bm25_path)
+        else:
+            self.bm25.build(self.documents)
+
+        self.filters.build(self.metadatas)
+
+    def set_search_params(
+        self,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> None:
+        """
+        Trade recall for latency on IVF (nprobe) and HNSW (efSearch) indices.
+        """
+        if self.index is not None:
+            set_search_params(self.index, nprobe=nprobe, ef_search=ef_search)
+
+    def retrieve(
+        self,
+        query_vector,
+        top_k=5,
+        query_text: Optional[str] = None,
+        filters: Optional[Dict] = None,
+    ):
+        found = self.candidates(query_vector, top_k, query_text, filters)
+        return self.hits(self.rank(found, top_k, self.candidate_vectors))
+
+    def candidates(
+        self,
+        query_vector,
+        top_k: int = 5,
+        query_text: Optional[str] = None,
+        filters: Optional[Dict] = None,
+    ) -> Dict[str, Ranking]:
+        """
+        Unfused "dense" and "bm25" rankings of raw scores, each up to
+        the candidate pool.
+        """
+        found: Dict[str, Ranking] = {"dense": [], "bm25": []}
         if not self.documents:
+            return found
+
+        ids = self.filters.select(filters)
+        if query_text and self.min_coverage > 0:
+            relevant = np.flatnonzero(self.bm25.coverage(query_text) >= self.min_coverage)
+            ids = relevant if ids is None else np.intersect1d(ids, relevant)
+        if ids is not None and not len(ids):
+            return found
+
+        pool = max(top_k, self.candidate_pool)
+
+        query_vector = self._query_vector(query_vector, query_text)
+
+        found["dense"] = self._dense_search(query_vector, pool, ids)
+        if query_text:
+            found["bm25"] = self.bm25.search(query_text, pool, ids=ids)
+        return found
+
+    def _query_vector(self, query_vector, query_text: Optional[str]):
+        """
+        The dense query in this index's space, or None.
+        """
+        dim = (
+            self.index.d if self.index is not None
+            else self.vectors.shape[1] if self.vectors is not None
+            else None
+        )
+        if query_vector is not None and len(query_vector) != dim:
+            query_vector = None
+
+        if self.embedder is None:
+            return query_vector
+        if query_vector is not None:
+            return np.asarray(self.embedder.weight_query([query_vector]), dtype=np.float32)[0]
+        if query_text:
+            return np.asarray(self.embedder.embed_query(query_text), dtype=np.float32)[0]
+        return None
+
+    def rank(self, found: Dict[str, Ranking], top_k: int, vectors) -> Ranking:
+        """
+        Fuse candidate rankings into the top_k (chunk id, score);
+        vectors(ids) feeds MMR when mmr_lambda is set.
+        """
+        rankings = [r for r in (found["dense"], found["bm25"]) if r]
+        if not rankings:
+            return []
+
+        if self.mmr_lambda is None:
+            return fuse(rankings, top_k, method=self.fusion)
+
+        ranked = fuse(rankings, max(top_k, self.mmr_pool), method=self.fusion)
+        return diversify(
+            ranked,
+            vectors([i for i, _ in ranked]),
+            top_k,
+            self.mmr_lambda,
+        )
+
+    def hits(self, ranked: Ranking) -> List[Dict[str, Any]]:
+        if not ranked:
+            return []
+
+        texts = self.documents.get_many([i for i, _ in ranked])
+        return [
+            {
+                "text": text,
+                "metadata": self.metadatas[i],
+                "score": score,
+            }
+            for text, (i, score) in zip(texts, ranked)
+        ]
+
+    def _dense_search(self, query_vector, k: int, ids: Optional[np.ndarray] = None):
+        if query_vector is None:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+
+        if self.index is not None:
+            if query.shape[-1] != self.index.d:
+                return []
+            if (
+                ids is not None
+                and self.rerank_vectors is not None
+                and len(ids) <= self.exact_filter_max
+            ):
+                return self._exact_search(self.rerank_vectors, query, k, ids)
+            if self.rerank_vectors is not None:
+                return self._search_and_rerank(query, k, ids)
+
+            scores, found = self._index_search(query, k, ids)
+            return [
+                (int(i), float(s))
+                for i, s in zip(found[0], scores[0])
+                if i >= 0 and s > 0
+            ]
+
+        if self.vectors is None:
+            return []
+
+        if query.shape[-1] != self.vectors.shape[1]:
             return []
 
-        # Since we are using TF-IDF, similarity is implicit
-        results = []
-        for text, meta in zip(self.documents, self.metadatas):
-            results.append(
-                {
-                    "text": text,
-                    "metadata": meta,
-                }
+        return self._exact_search(self.vectors, query, k, ids)
+
+    def _index_search(self, query: np.ndarray, k: int, ids: Optional[np.ndarray]):
+        if ids is None:
+            return self.index.search(query.reshape(1, -1), k)
+        return search_with_ids(self.index, query, k, ids)
+
+    def _exact_search(self, vectors, query: np.ndarray, k: int, ids: Optional[np.ndarray]):
+        """
+        Brute-force inner products over all rows, or only over ids.
+        """
+        if ids is None:
+            sims = np.asarray(vectors, dtype=np.float32) @ query
+            return [
+                (int(i), float(sims[i]))
+                for i in top_k_indices(sims, k)
+                if sims[i] > 0
+            ]
+
+        ids = ids[ids < len(vectors)]
+        sims = np.asarray(vectors[ids], dtype=np.float32) @ query
+        return [
+            (int(ids[j]), float(sims[j]))
+            for j in top_k_indices(sims, k)
+            if sims[j] > 0
+        ]
+
+    def candidate_vectors(self, ids) -> Optional[np.ndarray]:
+        """
+        Vectors for a candidate pool: exact on-disk vectors, in-memory
+        vectors, or re-embedded chunk text as a last resort.
+        """
+        if not ids:
+            return None
+
+        if self.rerank_vectors is not None:
+            return np.asarray(self.rerank_vectors[np.asarray(ids)], dtype=np.float32)
+
+        if self.vectors is not None and len(self.vectors) == len(self.documents):
+            return self.vectors[np.asarray(ids)]
+
+        if self.embedder is not None and hasattr(self.embedder, "transform_batch"):
+            return np.asarray(
+                self.embedder.transform_batch(self.documents.get_many(ids)),
+                dtype=np.float32,
             )
 
-        return results[:top_k]
+        return None
+
+    def _search_and_rerank(
+        self,
+        query: np.ndarray,
+        k: int,
+        allowed: Optional[np.ndarray] = None,
+    ):
+        """
+        Over-fetch from the compressed index, then re-score the
+        candidates exactly against memory-mapped float32 vectors.
+        """
+        _, ids = self._index_search(query, k * self.rerank_factor, allowed)
+        ids = np.sort(ids[0][ids[0] >= 0])
+        if not len(ids):
+            return []
+
+        exact = np.asarray(self.rerank_vectors[ids], dtype=np.float32) @ query
+        return [
+            (int(ids[j]), float(exact[j]))
+            for j in top_k_indices(exact, k)
+            if exact[j] > 0
+        ]
+
+    def memory_usage(self) -> Dict[str, int]:
+        usage = {
+            "documents_bytes": self.documents.memory_usage()["total"],
+            "metadatas_bytes": approx_sizeof(self.metadatas),
+            "vectors_bytes": self.vectors.nbytes if self.vectors is not None else 0,
+            "bm25_bytes": self.bm25.memory_usage()["total"],
+            "filters_bytes": self.filters.memory_usage()["total"],
+            "documents": len(self.documents),
+        }
+        usage["total"] = (
+            usage["documents_bytes"]
+            + usage["metadatas_bytes"]
+            + usage["vectors_bytes"]
+            + usage["bm25_bytes"]
+            + usage["filters_bytes"]
+        )
+        return usage
@@ -0,0 +1,383 @@
+# rag/sharding.py
+
+import heapq
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag.ann import partition_name, read_manifest
+from rag.fusion import Ranking
+from rag.retrieve import Retriever
+
+
+# Per-process shard state, set by _init_shard in each worker
+_SHARD: Optional[Retriever] = None
+_PART: Tuple[int, int] = (0, 1)
+
+
+class ShardBusy(RuntimeError):
+    """
+    A shard already has max_pending requests queued or running.
+    """
+
+
+# ======================
+# WORKER PROCESS
+# ======================
+def _init_shard(index_dir: str, domain: str, part: int, parts: int, retriever_kwargs: Dict):
+    global _SHARD, _PART
+    retriever = Retriever(None, **retriever_kwargs)
+    # only this partition's files: index, BM25 postings and texts
+    retriever.load_domain(index_dir, partition_name(domain, part, parts))
+    _SHARD = retriever
+    _PART = (part, parts)
+
+
+def _warm_shard() -> int:
+    # the first query loads the embedder and lazily imported modules
+    _SHARD.retrieve(None, top_k=1, query_text="warm up")
+    return os.getpid()
+
+
+def _search_shard(
+    query_vector,
+    top_k: int,
+    query_text: Optional[str],
+    filters: Optional[Dict],
+    expires: float,
+):
+    """
+    Raw candidates under domain-wide chunk ids, with the text and
+    metadata (and vector, for MMR) of each; None once expired.
+    """
+    if time.time() > expires:
+        # waited past the deadline: the answer has gone without us
+        return None
+
+    found = _SHARD.candidates(query_vector, top_k, query_text, filters)
+    ids = sorted({i for ranking in found.values() for i, _ in ranking})
+
+    part, parts = _PART
+    vectors = (
+        _SHARD.candidate_vectors(ids) if _SHARD.mmr_lambda is not None else None
+    )
+    docs = {
+        i * parts + part: {
+            "text": text,
+            "metadata": _SHARD.metadatas[i],
+            "vector": vectors[j] if vectors is not None else None,
+        }
+        for j, (i, text) in enumerate(zip(ids, _SHARD.documents.get_many(ids)))
+    }
+    found = {
+        name: [(i * parts + part, score) for i, score in ranking]
+        for name, ranking in found.items()
+    }
+    return found, docs
+
+
+def _shard_memory() -> Dict[str, int]:
+    return _SHARD.memory_usage()
+
+
+class ShardPolicy:
+    """
+    How domains are split into shard processes.
+
+    DocumentIngestor writes a domain as parts(num_chunks) partitions
+    (chunk id mod parts): one per chunks_per_shard chunks, at least
+    one, at most max_parts. Each partition is served from its own
+    process. Shards that miss deadline seconds are dropped from the
+    answer, and a shard with max_pending requests in flight rejects
+    more instead of queueing them.
+    """
+
+    def __init__(
+        self,
+        chunks_per_shard: int = 200_000,
+        max_parts: Optional[int] = None,
+        deadline: float = 0.5,
+        max_pending: int = 4,
+        start_method: str = "spawn",
+        retriever_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        self.chunks_per_shard = chunks_per_shard
+        self.max_parts = max_parts or os.cpu_count() or 1
+        self.deadline = deadline
+        self.max_pending = max_pending
+        self.start_method = start_method
+        # passed to Retriever() in the worker; must be picklable
+        self.retriever_kwargs = retriever_kwargs or {}
+
+    @classmethod
+    def from_env(cls) -> Optional["ShardPolicy"]:
+        """
+        MIMIR_SHARD_PROCESSES=1 enables sharding; None when disabled.
+        """
+        if os.getenv("MIMIR_SHARD_PROCESSES", "0") != "1":
+            return None
+
+        return cls(
+            chunks_per_shard=int(os.getenv("MIMIR_SHARD_CHUNKS", "200000")),
+            max_parts=int(os.getenv("MIMIR_SHARD_MAX_PARTS", "0")) or None,
+            deadline=float(os.getenv("MIMIR_SHARD_DEADLINE_MS", "500")) / 1000,
+            max_pending=int(os.getenv("MIMIR_SHARD_MAX_PENDING", "4")),
+            start_method=os.getenv("MIMIR_SHARD_START_METHOD", "spawn"),
+        )
+
+    def parts(self, num_chunks: int) -> int:
+        return max(1, min(self.max_parts, math.ceil(num_chunks / self.chunks_per_shard)))
+
+
+class ShardWorker:
+    """
+    One shard loaded once in its own single-process pool.
+
+    The pool is started lazily and restarted after a fork, since a
+    pool's management threads do not survive into a child process.
+    At most max_pending searches are queued or running; a submitted
+    task cannot be stopped, so the bound is what keeps late work
+    from piling up behind a slow shard.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        domain: str,
+        part: int = 0,
+        parts: int = 1,
+        start_method: str = "spawn",
+        retriever_kwargs: Optional[Dict[str, Any]] = None,
+        max_pending: int = 4,
+    ):
+        self.index_dir = index_dir
+        self.domain = domain
+        self.part = part
+        self.parts = parts
+        self.name = domain if parts == 1 else f"{domain}[{part}/{parts}]"
+        self.start_method = start_method
+        self.retriever_kwargs = retriever_kwargs or {}
+        self.max_pending = max_pending
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args) -> Future:
+        return self._executor().submit(fn, *args)
+
+    def search(self, query_vector, top_k: int, query_text, filters, expires: float) -> Future:
+        """
+        Future of the shard's candidates (None if still queued at
+        expires); fails with ShardBusy at once if max_pending
+        searches are already in flight.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # counts inherited through a fork belong to the parent's pool
+                self._pending = 0
+            if self._pending >= self.max_pending:
+                future: Future = Future()
+                future.set_exception(ShardBusy(f"{self._pending} searches pending"))
+                return future
+            self._pending += 1
+
+        try:
+            future = self.submit(_search_shard, query_vector, top_k, query_text, filters, expires)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def warm(self) -> Future:
+        """
+        Start the process, load the shard and run a first query;
+        resolves when ready.
+        """
+        return self.submit(_warm_shard)
+
+    @property
+    def started(self) -> bool:
+        # a pool inherited through a fork is not this process's
+        return self._pool is not None and self._pid == os.getpid()
+
+    def close(self) -> None:
+        if self.started:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    def _done(self, _future) -> None:
+        with self._lock:
+            self._pending = max(0, self._pending - 1)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_shard,
+                initargs=(
+                    self.index_dir,
+                    self.domain,
+                    self.part,
+                    self.parts,
+                    self.retriever_kwargs,
+                ),
+            )
+            self._pid = os.getpid()
+        return self._pool
+
+
+class ShardedDomain:
+    """
+    A domain served by one ShardWorker per ingested partition.
+
+    Shards return raw dense and BM25 candidates (BM25 impacts use
+    domain-wide statistics); merge() fuses them once, as a single
+    Retriever over the whole domain would. Has the Retriever
+    interface so an IndexSnapshot can hold it in place of one.
+    """
+
+    def __init__(self, index_dir: str, domain: str, policy: ShardPolicy):
+        self.domain = domain
+        self.policy = policy
+        # fusion settings only; holds no documents
+        self.fuser = Retriever(None, **policy.retriever_kwargs)
+        parts = read_manifest(index_dir, domain).get("partitions") or 1
+        self.workers = [
+            ShardWorker(
+                index_dir,
+                domain,
+                part,
+                parts,
+                start_method=policy.start_method,
+                retriever_kwargs=policy.retriever_kwargs,
+                max_pending=policy.max_pending,
+            )
+            for part in range(parts)
+        ]
+
+    def warm(self, timeout: Optional[float] = None) -> None:
+        """
+        Load every shard; raises if one fails to load.
+        """
+        for future in [w.warm() for w in self.workers]:
+            future.result(timeout=timeout)
+
+    def submit(self, query_vector, top_k: int, query_text=None, filters=None):
+        expires = time.time() + self.policy.deadline
+        return [
+            (w.name, w.search(query_vector, top_k, query_text, filters, expires))
+            for w in self.workers
+        ]
+
+    def merge(
+        self,
+        calls: List[Tuple[str, Future]],
+        top_k: int,
+        deadline: float,
+        started: Optional[float] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Gather shard candidates and fuse them into the domain top_k.
+        Returns (results, report); see gather().
+        """
+        replies, report = gather(calls, deadline, started)
+
+        found: Dict[str, Ranking] = {"dense": [], "bm25": []}
+        docs: Dict[int, Dict[str, Any]] = {}
+        for shard_found, shard_docs in replies:
+            for name, ranking in shard_found.items():
+                found[name].extend(ranking)
+            docs.update(shard_docs)
+
+        # the domain-wide candidate pool of each ranking, best first
+        # (ties by chunk id, as a stable sort over the domain gives)
+        pool = max(top_k, self.fuser.candidate_pool)
+        for name, ranking in found.items():
+            found[name] = heapq.nsmallest(pool, ranking, key=lambda c: (-c[1], c[0]))
+
+        ranked = self.fuser.rank(
+            found, top_k, lambda ids: np.stack([docs[i]["vector"] for i in ids])
+        )
+        results = [
+            {"text": docs[i]["text"], "metadata": docs[i]["metadata"], "score": score}
+            for i, score in ranked
+        ]
+        return results, report
+
+    def retrieve(self, query_vector, top_k=5, query_text=None, filters=None):
+        results, _ = self.merge(
+            self.submit(query_vector, top_k, query_text, filters),
+            top_k,
+            self.policy.deadline,
+        )
+        return results
+
+    def close(self) -> None:
+        for w in self.workers:
+            w.close()
+
+    def memory_usage(self) -> Dict[str, int]:
+        usage = {"shards": len(self.workers), "total": 0}
+        for worker in self.workers:
+            if not worker.started:
+                # not loaded yet: reporting must not start it
+                continue
+            try:
+                usage["total"] += worker.submit(_shard_memory).result(timeout=5)["total"]
+            except Exception:
+                continue
+        return usage
+
+
+def gather(
+    calls: List[Tuple[str, Future]],
+    deadline: float,
+    started: Optional[float] = None,
+) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Wait up to deadline (from started) for per-shard replies. Shards
+    that are late, busy or fail are left out and reported.
+
+    Returns (replies, report).
+    """
+    started = time.perf_counter() if started is None else started
+    remaining = max(0.0, deadline - (time.perf_counter() - started))
+
+    done, _ = wait([f for _, f in calls], timeout=remaining)
+
+    replies = []
+    report: Dict[str, Any] = {"shards": len(calls), "dropped": [], "failed": {}}
+    for name, future in calls:
+        if future not in done:
+            # still queued in the pool → never runs; handed to the
+            # shard already → skipped there once expired
+            future.cancel()
+            report["dropped"].append(name)
+            continue
+
+        error = future.exception()
+        if isinstance(error, ShardBusy):
+            report["dropped"].append(name)
+            continue
+        if error is not None:
+            report["failed"][name] = f"{type(error).__name__}: {error}"
+            continue
+
+        reply = future.result()
+        if reply is None:
+            report["dropped"].append(name)
+            continue
+        replies.append(reply)
+
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return replies, report
@@ -0,0 +1,74 @@
+# rag/single_flight.py
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key.
+
+    The first caller for a key (the leader) runs the work; callers
+    arriving while it is in flight wait for the leader's result or
+    exception instead of repeating it. Once the call finishes the
+    key is forgotten, so later calls run again: this deduplicates
+    bursts, it is not a cache.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as error:
+            self.finish(key, error=error)
+            raise
+
+        self.finish(key, result)
+        return result
+
+    # ======================
+    # LOW-LEVEL
+    # ======================
+    def begin(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+        (future, leader). The leader must call finish(key, ...).
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def finish(self, key: Hashable, result: Any = None, error: BaseException = None) -> None:
+        with self._lock:
+            future = self._calls.pop(key)
+
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "in_flight": in_flight,
+            "leaders": self.leaders,
+            "shared": self.shared,
+        }
@@ -0,0 +1,52 @@
+# rag/sizing.py
+
+import sys
+from typing import Any, Optional, Set
+
+
+def approx_sizeof(obj: Any, _seen: Optional[Set[int]] = None) -> int:
+    """
+    Approximate deep size of an object in bytes.
+
+    Follows containers, numpy arrays (via nbytes) and scipy sparse
+    matrices. Shared objects are counted once. This is an estimate
+    meant for attribution, not exact RSS.
+    """
+    if _seen is None:
+        _seen = set()
+
+    obj_id = id(obj)
+    if obj_id in _seen:
+        return 0
+    _seen.add(obj_id)
+
+    # numpy arrays: __sizeof__ already includes owned buffers
+    if hasattr(obj, "dtype") and hasattr(obj, "nbytes"):
+        return sys.getsizeof(obj)
+
+    # scipy sparse: component arrays
+    if hasattr(obj, "tocsr") and hasattr(obj, "data"):
+        size = sys.getsizeof(obj)
+        for attr in ("data", "indices", "indptr", "row", "col"):
+            part = getattr(obj, attr, None)
+            if part is not None:
+                size += approx_sizeof(part, _seen)
+        return size
+
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += approx_sizeof(k, _seen)
+            size += approx_sizeof(v, _seen)
+        return size
+
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += approx_sizeof(item, _seen)
+        return size
+
+    return size
@@ -0,0 +1,388 @@
+# rag/snapshots.py
+
+import heapq
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from rag.ann import PARTITION_SEP
+from rag.filters import select_domains
+from rag.retrieve import Retriever
+from rag.sharding import ShardedDomain, ShardPolicy
+
+
+# Root-level files written before versioned snapshots existed
+LEGACY_VERSION = "legacy"
+
+_CURRENT_FILE = "CURRENT"
+
+
+class SnapshotStore:
+    """
+    Versioned index layout under one root:
+
+        <root>/<domain>/<version>/...   files written by DocumentIngestor
+        <root>/<domain>/CURRENT         name of the published version
+
+    A version directory is never modified after it is published;
+    publishing rewrites CURRENT with an atomic rename. Flat files
+    at the root (<root>/<domain>_meta.pkl) are served as the
+    "legacy" version of that domain.
+    """
+
+    def __init__(self, root: str = "data/indices"):
+        self.root = root
+
+    # ======================
+    # LAYOUT
+    # ======================
+    def domains(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+
+        found = set()
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path) and self.versions(name):
+                found.add(name)
+            elif name.endswith("_meta.pkl") and PARTITION_SEP not in name:
+                found.add(name[: -len("_meta.pkl")])
+
+        return sorted(found)
+
+    def versions(self, domain: str) -> List[str]:
+        path = os.path.join(self.root, domain)
+        if not os.path.isdir(path):
+            return []
+
+        # version names sort chronologically
+        return sorted(
+            name
+            for name in os.listdir(path)
+            if name.startswith("v") and os.path.isdir(os.path.join(path, name))
+        )
+
+    def current_version(self, domain: str) -> Optional[str]:
+        pointer = os.path.join(self.root, domain, _CURRENT_FILE)
+        if os.path.exists(pointer):
+            with open(pointer, "r", encoding="utf-8") as f:
+                version = f.read().strip()
+            if version:
+                return version
+
+        if os.path.exists(os.path.join(self.root, f"{domain}_meta.pkl")):
+            return LEGACY_VERSION
+
+        return None
+
+    def current_versions(self) -> Dict[str, str]:
+        versions = {}
+        for domain in self.domains():
+            version = self.current_version(domain)
+            if version:
+                versions[domain] = version
+        return versions
+
+    def version_dir(self, domain: str, version: str) -> str:
+        if version == LEGACY_VERSION:
+            return self.root
+        return os.path.join(self.root, domain, version)
+
+    # ======================
+    # WRITING
+    # ======================
+    def create_version(self, domain: str) -> str:
+        """
+        Reserve a new, unpublished version directory.
+        """
+        while True:
+            version = f"v{time.time_ns()}"
+            path = self.version_dir(domain, version)
+            try:
+                os.makedirs(path)
+                return version
+            except FileExistsError:
+                continue
+
+    def publish(self, domain: str, version: str) -> None:
+        if not os.path.isdir(self.version_dir(domain, version)):
+            raise FileNotFoundError(f"Unknown version '{version}' for domain '{domain}'")
+
+        pointer = os.path.join(self.root, domain, _CURRENT_FILE)
+        tmp = f"{pointer}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, pointer)
+
+    def prune(self, domain: str, keep: int = 3) -> List[str]:
+        """
+        Delete all but the newest `keep` versions; never the current one.
+        """
+        current = self.current_version(domain)
+        stale = [v for v in self.versions(domain)[:-keep or None] if v != current]
+
+        for version in stale:
+            shutil.rmtree(self.version_dir(domain, version), ignore_errors=True)
+
+        return stale
+
+
+class IndexSnapshot:
+    """
+    Immutable set of loaded domain retrievers.
+
+    Nothing mutates a snapshot after it is published, so readers
+    need no locks: they hold a reference for the whole query.
+    Domains may be in-process Retrievers or ShardedDomains; shard
+    processes are queried in parallel, up to deadline seconds.
+    """
+
+    def __init__(
+        self,
+        retrievers: Dict[str, Any],
+        versions: Dict[str, str],
+        deadline: float = 0.5,
+    ):
+        self.retrievers = retrievers
+        self.versions = versions
+        self.deadline = deadline
+        self.loaded_at = time.time()
+
+    def retrieve(
+        self,
+        query_vector,
+        top_k: int = 5,
+        query_text: Optional[str] = None,
+        filters: Optional[Dict] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Query every domain (or only the filtered ones) and keep the
+        best top_k by fused score.
+        """
+        return self.search(query_vector, top_k, query_text, filters)[0]
+
+    def search(
+        self,
+        query_vector,
+        top_k: int = 5,
+        query_text: Optional[str] = None,
+        filters: Optional[Dict] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        retrieve() plus a shard report (None without sharded domains)
+        listing shards dropped at the deadline or failed.
+        """
+        started = time.perf_counter()
+        domains = select_domains(filters, self.retrievers)
+
+        # fan out to shard processes first, then search local domains
+        pending = []
+        for domain in domains:
+            retriever = self.retrievers[domain]
+            if isinstance(retriever, ShardedDomain):
+                pending.append(
+                    (retriever, retriever.submit(query_vector, top_k, query_text, filters))
+                )
+
+        results = []
+        for domain in domains:
+            retriever = self.retrievers[domain]
+            if not isinstance(retriever, ShardedDomain):
+                results.extend(
+                    retriever.retrieve(
+                        query_vector,
+                        top_k=top_k,
+                        query_text=query_text,
+                        filters=filters,
+                    )
+                )
+
+        report = None
+        for sharded, calls in pending:
+            found, shards = sharded.merge(calls, top_k, self.deadline, started)
+            results.extend(found)
+            report = shards if report is None else {
+                "shards": report["shards"] + shards["shards"],
+                "dropped": report["dropped"] + shards["dropped"],
+                "failed": {**report["failed"], **shards["failed"]},
+                "elapsed_ms": max(report["elapsed_ms"], shards["elapsed_ms"]),
+            }
+
+        return heapq.nlargest(top_k, results, key=lambda r: r["score"]), report
+
+    def memory_usage(self) -> Dict[str, int]:
+        usage = {
+            domain: retriever.memory_usage()["total"]
+            for domain, retriever in self.retrievers.items()
+        }
+        usage["total"] = sum(usage.values())
+        return usage
+
+
+
+class SnapshotManager:
+    """
+    Publishes index snapshots with a single reference swap.
+
+    reload() loads changed domains into a new IndexSnapshot off the
+    request path (unchanged domains reuse their loaded retrievers)
+    and then assigns self.current. Queries read self.current once
+    and keep that reference, so in-flight queries finish on the old
+    snapshot. Only writers take the reload lock.
+
+    With a ShardPolicy, each domain is served from shard processes
+    instead. New shards are loaded before the swap; replaced ones
+    are shut down retire_after seconds later, once in-flight
+    queries are done with them. reload(start_shards=False) only
+    reads the manifests and leaves the processes to start on first
+    use, for a parent that is about to fork.
+    """
+
+    def __init__(
+        self,
+        store: SnapshotStore,
+        retriever_factory: Optional[Callable[[], Retriever]] = None,
+        shard_policy: Optional[ShardPolicy] = None,
+        retire_after: float = 30.0,
+    ):
+        self.store = store
+        self.retriever_factory = retriever_factory or (lambda: Retriever(None))
+        self.shard_policy = shard_policy
+        self.retire_after = retire_after
+        self.current = self._snapshot({}, {})
+        self.last_error: Optional[str] = None
+
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ======================
+    # RELOAD
+    # ======================
+    def reload(self, start_shards: bool = True) -> Dict[str, Any]:
+        """
+        Load the published versions and swap them in if anything changed.
+        """
+        with self._reload_lock:
+            old = self.current
+            versions = self.store.current_versions()
+            if versions == old.versions:
+                return {"changed": False, "versions": versions}
+
+            retrievers = {}
+            try:
+                for domain, version in versions.items():
+                    if old.versions.get(domain) == version:
+                        retrievers[domain] = old.retrievers[domain]
+                        continue
+
+                    retrievers[domain] = self._load(domain, version, start_shards)
+            except BaseException:
+                # shard processes started for the aborted snapshot
+                for domain, retriever in retrievers.items():
+                    if isinstance(retriever, ShardedDomain) and old.retrievers.get(domain) is not retriever:
+                        retriever.close()
+                raise
+
+            # the publish: one reference assignment
+            self.current = self._snapshot(retrievers, versions)
+            self.last_error = None
+
+            replaced = [
+                r for d, r in old.retrievers.items()
+                if isinstance(r, ShardedDomain) and retrievers.get(d) is not r
+            ]
+            if replaced:
+                self._retire(replaced)
+
+            return {"changed": True, "versions": versions, "previous": old.versions}
+
+    def reload_async(self) -> threading.Thread:
+        thread = threading.Thread(target=self._safe_reload, daemon=True)
+        thread.start()
+        return thread
+
+    def start_watcher(self, interval: float) -> None:
+        """
+        Poll the CURRENT pointers every interval seconds (<= 0 disables).
+        """
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                self._safe_reload()
+
+        self._watcher = threading.Thread(target=loop, daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+
+    def warm(self) -> None:
+        """
+        Start shard processes owned by this process (e.g. after a fork).
+        """
+        for retriever in self.current.retrievers.values():
+            if isinstance(retriever, ShardedDomain):
+                retriever.warm()
+
+    def status(self) -> Dict[str, Any]:
+        snapshot = self.current
+        return {
+            "versions": snapshot.versions,
+            "shards": {
+                domain: len(r.workers)
+                for domain, r in snapshot.retrievers.items()
+                if isinstance(r, ShardedDomain)
+            },
+            "loaded_at": snapshot.loaded_at,
+            "published": self.store.current_versions(),
+            "reloading": self._reload_lock.locked(),
+            "last_error": self.last_error,
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        return self.current.memory_usage()
+
+    def _load(self, domain: str, version: str, start_shards: bool = True):
+        index_dir = self.store.version_dir(domain, version)
+
+        if self.shard_policy is not None:
+            sharded = ShardedDomain(index_dir, domain, self.shard_policy)
+            if not start_shards:
+                return sharded
+            try:
+                sharded.warm()
+            except BaseException:
+                sharded.close()
+                raise
+            return sharded
+
+        retriever = self.retriever_factory()
+        retriever.load_domain(index_dir, domain)
+        return retriever
+
+    def _snapshot(self, retrievers: Dict[str, Any], versions: Dict[str, str]) -> IndexSnapshot:
+        deadline = self.shard_policy.deadline if self.shard_policy else 0.5
+        return IndexSnapshot(retrievers, versions, deadline=deadline)
+
+    def _retire(self, domains: List[ShardedDomain]) -> None:
+        def close():
+            for sharded in domains:
+                sharded.close()
+
+        timer = threading.Timer(self.retire_after, close)
+        timer.daemon = True
+        timer.start()
+
+    def _safe_reload(self) -> None:
+        try:
+            self.reload()
+        except Exception as e:
+            # keep serving the current snapshot
+            self.last_error = f"{type(e).__name__}: {e}"
@@ -0,0 +1,165 @@
+# rag/snippets.py
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Sentence ends at ., ! or ? followed by whitespace, or at a blank line
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+# List number ("1.", "10.") at the start of a line, or opening a
+# sentence after a colon or another sentence; never a sentence end
+_LIST_MARKER_RE = re.compile(r"(?m)(?:^[ \t]*|(?<=[.!?:])\s+)\d+\.(?=\s)")
+
+
+def sentence_offsets(text: str) -> np.ndarray:
+    """
+    (n, 2) int32 array of [start, end) character offsets, one row
+    per non-empty sentence. Computed once at ingest time.
+    """
+    markers = {m.end() for m in _LIST_MARKER_RE.finditer(text)}
+
+    spans = []
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        if match.start() in markers and match.group().count("\n") < 2:
+            continue
+        if text[start:match.start()].strip():
+            spans.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+
+    return np.asarray(spans, dtype=np.int32).reshape(-1, 2)
+
+
+def clip_offsets(offsets: np.ndarray, start: int, end: int) -> np.ndarray:
+    """
+    Sentences of a whole document (sentence_offsets) that lie inside
+    the chunk [start, end), relative to the chunk. A chunk cut
+    mid-sentence drops the partial sentences at its edges; one inside
+    a single long sentence keeps its part of it.
+    """
+    offsets = np.asarray(offsets).reshape(-1, 2)
+    inside = (offsets[:, 0] >= start) & (offsets[:, 1] <= end)
+    if not inside.any():
+        inside = (offsets[:, 0] < end) & (offsets[:, 1] > start)
+    return (np.clip(offsets[inside], start, end) - start).astype(np.int32)
+
+
+class SnippetExtractor:
+    """
+    Picks the best sentences inside the top retrieved chunks.
+
+    All candidate sentences are embedded in one batch and scored
+    against the query with a single matrix-vector product. The best
+    sentences are taken greedily until the character (or whitespace
+    token) budget is spent, then returned in reading order with
+    offsets for citation.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        budget_chars: int = 800,
+        budget_tokens: Optional[int] = None,
+    ):
+        self.embedder = embedder
+        self.budget_chars = budget_chars
+        self.budget_tokens = budget_tokens
+
+    def extract(
+        self,
+        query: str,
+        hits: List[Dict[str, Any]],
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        sentences, refs = self._collect(hits)
+        if not sentences:
+            return "", []
+
+        query_vec = np.asarray(self.embedder.embed_query(query), dtype=np.float32)[0]
+        vecs = np.asarray(self.embedder.transform_batch(sentences), dtype=np.float32)
+        scores = vecs @ query_vec if vecs.shape[-1] == query_vec.shape[-1] else None
+
+        if scores is None or not np.any(scores > 0):
+            # no signal: keep reading order of the top chunks
+            order = np.arange(len(sentences))
+        else:
+            # only sentences that share terms with the query; ties keep
+            # reading order
+            order = np.argsort(-scores, kind="stable")
+            order = order[scores[order] > 0]
+
+        picked = self._within_budget(sentences, refs, order)
+        picked.sort()
+
+        text = " ".join(sentences[i] for i in picked)
+        citations = [refs[i] for i in picked]
+        return text, citations
+
+    # ======================
+    # HELPERS
+    # ======================
+    def _collect(self, hits):
+        sentences: List[str] = []
+        refs: List[Dict[str, Any]] = []
+
+        for rank, hit in enumerate(hits):
+            text = hit["text"]
+            meta = hit.get("metadata", {})
+            offsets = meta.get("sentences")
+            if offsets is None:
+                offsets = sentence_offsets(text)
+
+            base = meta.get("start_char", 0)
+            for start, end in np.asarray(offsets).reshape(-1, 2).tolist():
+                raw = text[start:end]
+                # cite the stripped sentence exactly
+                start += len(raw) - len(raw.lstrip())
+                end -= len(raw) - len(raw.rstrip())
+                sentences.append(text[start:end])
+                ref = {
+                    "source": meta.get("source"),
+                    "rank": rank,
+                    "start": int(base + start),
+                    "end": int(base + end),
+                }
+                if "chunk" in meta:
+                    ref["chunk"] = meta["chunk"]
+                refs.append(ref)
+
+        return sentences, refs
+
+    def _within_budget(self, sentences: List[str], refs: List[Dict[str, Any]], order) -> List[int]:
+        picked: List[int] = []
+        seen = set()
+        chars = 0
+        tokens = 0
+
+        for i in order:
+            # overlapping chunks repeat sentences
+            if sentences[i] in seen:
+                continue
+            length = len(sentences[i]) + 1
+            words = len(sentences[i].split())
+
+            if chars + length > self.budget_chars:
+                continue
+            if self.budget_tokens is not None and tokens + words > self.budget_tokens:
+                continue
+
+            picked.append(int(i))
+            seen.add(sentences[i])
+            chars += length
+            tokens += words
+
+        if not picked:
+            # always return something: the best sentence, truncated
+            first = int(order[0])
+            sentences[first] = sentences[first][: self.budget_chars]
+            refs[first] = {**refs[first], "end": refs[first]["start"] + len(sentences[first])}
+            picked.append(first)
+
+        return picked
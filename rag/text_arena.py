@@ -0,0 +1,201 @@
+# rag/text_arena.py
+
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+
+# Uncompressed bytes per block: one hit decompresses about this much
+BLOCK_BYTES = 16 * 1024
+
+# zlib can only use the last 32 KiB of a preset dictionary
+DICT_BYTES = 32 * 1024
+
+_EMPTY_BYTES = np.empty(0, dtype=np.uint8)
+
+
+class TextArena:
+    """
+    Read-only list of strings stored as zlib-compressed blocks.
+
+    Consecutive texts are packed into ~block_bytes blocks, each
+    compressed independently with a dictionary sampled from the
+    corpus, so even small blocks compress well. An offset table
+    maps text i to (block, start, end), and reading a text only
+    decompresses its block. Recently used blocks are kept
+    decompressed in a small LRU.
+
+    Supports len(), indexing, iteration and get_many(), so it can
+    stand in for a list of chunk texts.
+    """
+
+    def __init__(
+        self,
+        texts: Iterable[str] = (),
+        block_bytes: int = BLOCK_BYTES,
+        level: int = 6,
+        cache_blocks: int = 64,
+    ):
+        self.block_bytes = block_bytes
+        self.level = level
+        self.cache_blocks = cache_blocks
+
+        self.data = _EMPTY_BYTES
+        self.block_offsets = np.zeros(1, dtype=np.int64)
+        # per text: block id, start and end byte within the block
+        self.spans = np.empty((0, 3), dtype=np.int32)
+        self.zdict = b""
+
+        self._cache: "OrderedDict[int, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        texts = list(texts)
+        if texts:
+            self._build(texts)
+
+    # ======================
+    # BUILD
+    # ======================
+    def _build(self, texts: List[str]) -> None:
+        encoded = [t.encode("utf-8") for t in texts]
+        self.zdict = _sample_dictionary(encoded)
+
+        blocks: List[bytes] = []
+        spans = np.empty((len(encoded), 3), dtype=np.int32)
+        current: List[bytes] = []
+        size = 0
+
+        for i, raw in enumerate(encoded):
+            if current and size + len(raw) > self.block_bytes:
+                blocks.append(self._compress(b"".join(current)))
+                current, size = [], 0
+
+            spans[i] = (len(blocks), size, size + len(raw))
+            current.append(raw)
+            size += len(raw)
+
+        if current:
+            blocks.append(self._compress(b"".join(current)))
+
+        self.spans = spans
+        self.block_offsets = np.zeros(len(blocks) + 1, dtype=np.int64)
+        self.block_offsets[1:] = np.cumsum([len(b) for b in blocks])
+        self.data = np.frombuffer(b"".join(blocks), dtype=np.uint8)
+
+    def _compress(self, raw: bytes) -> bytes:
+        compressor = zlib.compressobj(self.level, zdict=self.zdict)
+        return compressor.compress(raw) + compressor.flush()
+
+    # ======================
+    # READ
+    # ======================
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __getitem__(self, i: int) -> str:
+        block, start, end = self.spans[i]
+        return self._block(int(block))[start:end].decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        # sequential scan: decode block by block, bypassing the LRU
+        block_id, block = -1, b""
+        for b, start, end in self.spans.tolist():
+            if b != block_id:
+                block_id, block = b, self._decompress(b)
+            yield block[start:end].decode("utf-8")
+
+    def get_many(self, ids: Sequence[int]) -> List[str]:
+        """
+        Texts for ids (in order), decompressing each block once.
+        """
+        spans = self.spans[np.asarray(ids, dtype=np.int64)]
+        blocks = {b: self._block(b) for b in set(spans[:, 0].tolist())}
+        return [
+            blocks[b][start:end].decode("utf-8")
+            for b, start, end in spans.tolist()
+        ]
+
+    def _block(self, block_id: int) -> bytes:
+        with self._lock:
+            raw = self._cache.get(block_id)
+            if raw is not None:
+                self._cache.move_to_end(block_id)
+                self.hits += 1
+                return raw
+
+        raw = self._decompress(block_id)
+
+        with self._lock:
+            self.misses += 1
+            self._cache[block_id] = raw
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+        return raw
+
+    def _decompress(self, block_id: int) -> bytes:
+        lo, hi = self.block_offsets[block_id], self.block_offsets[block_id + 1]
+        decompressor = zlib.decompressobj(zdict=self.zdict)
+        return decompressor.decompress(self.data[lo:hi].tobytes())
+
+    # ======================
+    # PERSISTENCE
+    # ======================
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            data=self.data,
+            block_offsets=self.block_offsets,
+            spans=self.spans,
+            zdict=np.frombuffer(self.zdict, dtype=np.uint8),
+            params=np.asarray([self.block_bytes, self.level]),
+        )
+
+    @classmethod
+    def load(cls, path: str, cache_blocks: int = 64) -> "TextArena":
+        data = np.load(path)
+        block_bytes, level = data["params"].tolist()
+
+        arena = cls(block_bytes=int(block_bytes), level=int(level), cache_blocks=cache_blocks)
+        arena.data = data["data"]
+        arena.block_offsets = data["block_offsets"]
+        arena.spans = data["spans"]
+        arena.zdict = data["zdict"].tobytes()
+        return arena
+
+    def memory_usage(self) -> Dict[str, int]:
+        with self._lock:
+            cached = sum(len(b) for b in self._cache.values())
+
+        usage = {
+            "compressed_bytes": int(self.data.nbytes),
+            "offsets_bytes": int(self.block_offsets.nbytes + self.spans.nbytes),
+            "dictionary_bytes": len(self.zdict),
+            "cache_bytes": cached,
+            "raw_bytes": int((self.spans[:, 2] - self.spans[:, 1]).sum()) if len(self) else 0,
+        }
+        usage["total"] = (
+            usage["compressed_bytes"]
+            + usage["offsets_bytes"]
+            + usage["dictionary_bytes"]
+            + usage["cache_bytes"]
+        )
+        return usage
+
+
+def _sample_dictionary(encoded: List[bytes], size: int = DICT_BYTES) -> bytes:
+    """
+    Preset dictionary from evenly spaced samples of the corpus.
+    """
+    if not encoded:
+        return b""
+
+    piece = 512
+    count = min(len(encoded), max(1, size // piece))
+    step = len(encoded) / count
+    samples = [encoded[int(i * step)][:piece] for i in range(count)]
+    return b"".join(samples)[-size:]
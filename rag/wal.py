@@ -0,0 +1,49 @@
+# rag/wal.py
+
+import os
+import sqlite3
+from typing import Iterable, Optional
+
+
+class WalConnection:
+    """
+    SQLite connection in WAL mode that is safe to inherit across fork.
+
+    A connection must not be shared between processes; when the
+    owning pid changes (e.g. a pre-forked server worker) the
+    connection is reopened on first use. WAL lets any number of
+    worker processes read while one writes.
+    """
+
+    def __init__(self, path: str, schema: Iterable[str] = ()):
+        self.path = path
+        self.schema = tuple(schema)
+        self._pid: Optional[int] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._connect()
+
+    def execute(self, sql: str, params=()):
+        return self.conn.execute(sql, params)
+
+    def executemany(self, sql: str, rows):
+        return self.conn.executemany(sql, rows)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            self._connect()
+        return self._conn
+
+    def _connect(self) -> None:
+        # the parent's handle is dropped, never closed: closing it
+        # here could disturb the parent's own transaction state
+        self._conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.schema:
+            self._conn.execute(statement)
+        self._pid = os.getpid()
@@ -1,3 +1,6 @@
+import os
+import uuid
+
 import streamlit as st
 import requests
 
@@ -67,9 +70,24 @@ st.markdown(
 # ======================
 # HELPERS
 # ======================
+# One session per browser tab: the API keeps its conversation and,
+# given MIMIR_FRONTEND_TOKEN, rate-limits it on its own instead of
+# every user of this server sharing one per-address bucket.
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+
+def api_headers():
+    headers = {"X-Session-ID": st.session_state.session_id}
+    token = os.getenv("MIMIR_FRONTEND_TOKEN")
+    if token:
+        headers["X-Frontend-Token"] = token
+    return headers
+
+
 def query_mimir(query, persona, mode):
     payload = {"query": query, "persona": persona, "mode": mode}
-    r = requests.post(f"{API_URL}/query", json=payload, timeout=30)
+    r = requests.post(f"{API_URL}/query", json=payload, headers=api_headers(), timeout=30)
     r.raise_for_status()
     return r.json()
 
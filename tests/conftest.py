@@ -0,0 +1,18 @@
+# tests/conftest.py
+
+import os
+import tempfile
+
+# keep caches and state stores out of the working tree
+_STATE = tempfile.mkdtemp(prefix="mimir-tests-")
+for name, sub in (
+    ("MIMIR_EMBEDDING_CACHE_DIR", "embedding_cache"),
+    ("MIMIR_UPLOAD_DIR", "uploads"),
+    ("MIMIR_SESSION_DB", "sessions.sqlite"),
+    ("MIMIR_WEB_KNOWLEDGE_DB", "web_knowledge.sqlite"),
+    ("MIMIR_INDEX_DIR", "indices"),
+):
+    os.environ.setdefault(name, os.path.join(_STATE, sub))
+
+# WebSearchQA refuses to start without a key; tests never call out
+os.environ.setdefault("TAVILY_API_KEY", "test")
@@ -0,0 +1,109 @@
+# tests/test_admission.py
+
+import asyncio
+
+import pytest
+
+from api.admission import AdmissionMiddleware, ClientKey
+from backend.admission import (
+    AdaptiveConcurrencyLimit,
+    AdmissionController,
+    Overloaded,
+    RateLimiter,
+)
+
+
+def _scope(peer="203.0.113.9", **headers):
+    return {
+        "type": "http",
+        "path": "/query",
+        "client": (peer, 50000),
+        "headers": [
+            (name.replace("_", "-").encode(), value.encode())
+            for name, value in headers.items()
+        ],
+    }
+
+
+def test_forwarded_for_is_ignored_from_untrusted_peers():
+    key = ClientKey()
+    assert key(_scope(x_forwarded_for="1.2.3.4")) == "203.0.113.9"
+
+
+def test_trusted_proxies_are_skipped_from_the_right():
+    key = ClientKey("10.0.0.0/8")
+    scope = _scope("10.0.0.5", x_forwarded_for="6.6.6.6, 198.51.100.7, 10.1.2.3")
+    assert key(scope) == "198.51.100.7"
+
+
+def test_star_trusts_only_the_immediate_peer():
+    key = ClientKey("*")
+    scope = _scope("10.0.0.5", x_forwarded_for="6.6.6.6, 198.51.100.7")
+    assert key(scope) == "198.51.100.7"
+
+
+def test_frontend_token_keys_buckets_by_session():
+    key = ClientKey(frontend_token="relay")
+    assert key(_scope(x_frontend_token="relay", x_session_id="tab-1")) == "session:tab-1"
+    assert key(_scope(x_frontend_token="wrong", x_session_id="tab-1")) == "203.0.113.9"
+    assert key(_scope(x_session_id="tab-1")) == "203.0.113.9"
+
+
+def test_non_ascii_frontend_tokens_are_compared_as_bytes():
+    key = ClientKey(frontend_token="relais-é")
+    assert key(_scope(x_frontend_token="relais-é", x_session_id="tab-1")) == "session:tab-1"
+    assert key(_scope(x_frontend_token="relais-è", x_session_id="tab-1")) == "203.0.113.9"
+    assert key(_scope(x_frontend_token="relay", x_session_id="tab-1")) == "203.0.113.9"
+
+
+def test_rate_limit_is_per_key():
+    limiter = RateLimiter(rate=1, burst=2)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(Overloaded):
+        limiter.check("a")
+    limiter.check("b")
+
+
+def test_full_queue_is_rejected_at_once():
+    async def run():
+        limit = AdaptiveConcurrencyLimit(initial=1, max_queue=1, queue_timeout=5)
+        await limit.acquire()
+        waiting = asyncio.ensure_future(limit.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await limit.acquire()
+        limit.release(0.01)
+        await waiting
+
+    asyncio.run(run())
+
+
+class _RecordingController(AdmissionController):
+    def __init__(self):
+        super().__init__(RateLimiter(rate=0, burst=1), AdaptiveConcurrencyLimit())
+        self.latencies = []
+
+    def release(self, latency):
+        self.latencies.append(latency)
+        super().release(latency)
+
+
+def test_streamed_pacing_is_not_counted_as_latency():
+    async def paced_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for _ in range(3):
+            await send({"type": "http.response.body", "body": b"tok ", "more_body": True})
+            await asyncio.sleep(0.1)
+        await send({"type": "http.response.body", "body": b""})
+
+    async def noop_send(message):
+        pass
+
+    controller = _RecordingController()
+    middleware = AdmissionMiddleware(paced_app, controller, paths=["/query"])
+    asyncio.run(middleware(_scope(), None, noop_send))
+
+    assert len(controller.latencies) == 1
+    assert controller.latencies[0] < 0.1
+    assert controller.concurrency.in_flight == 0
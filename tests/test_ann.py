@@ -0,0 +1,64 @@
+# tests/test_ann.py
+
+import numpy as np
+import pytest
+
+from rag.ann import INDEX_TYPES, build_faiss_index, set_search_params
+from rag.quantization import ENCODINGS
+
+
+def _corpus(n=4000, dim=64, clusters=20, seed=0):
+    # clustered, normalized vectors: topic-like neighbourhoods
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    x = centers[rng.integers(0, clusters, n)] + 0.3 * rng.normal(size=(n, dim))
+    x = (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+    queries = (x[:50] + 0.05 * rng.normal(size=(50, dim))).astype(np.float32)
+    return x, queries
+
+
+VECTORS, QUERIES = _corpus()
+EXACT = np.argsort(-(QUERIES @ VECTORS.T), axis=1)[:, :10]
+
+
+def _recall(found):
+    return np.mean([len(set(a) & set(b)) / 10 for a, b in zip(found, EXACT)])
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_recall_at_10(index_type, encoding):
+    index, params = build_faiss_index(VECTORS, index_type, encoding)
+    set_search_params(index, params.get("nprobe"), params.get("ef_search"))
+    assert index.ntotal == len(VECTORS)
+
+    if encoding != "pq":
+        _, found = index.search(QUERIES, 10)
+        assert _recall(found) >= 0.9
+        return
+
+    # PQ codes are coarse: rank a 4x pool again with the full vectors,
+    # as Retriever does with rerank_factor=4
+    _, pool = index.search(QUERIES, 40)
+    found = [ids[np.argsort(-(VECTORS[ids] @ q))[:10]] for ids, q in zip(pool, QUERIES)]
+    assert _recall(found) >= 0.7
+
+
+def test_small_corpora_fall_back_to_trainable_settings():
+    few = VECTORS[:100]
+
+    _, params = build_faiss_index(few, "ivf_flat", "float32")
+    assert params["nlist"] == 2 and params["nprobe"] == 1
+
+    _, params = build_faiss_index(few, "hnsw", "pq")
+    assert params["encoding"] == "int8"
+
+    _, params = build_faiss_index(few, "flat", "pq")
+    assert 2 ** params["pq_nbits"] <= len(few)
+
+
+def test_unknown_types_are_rejected():
+    with pytest.raises(ValueError):
+        build_faiss_index(VECTORS[:10], "lsh")
+    with pytest.raises(ValueError):
+        build_faiss_index(VECTORS[:10], "flat", "float8")
@@ -0,0 +1,63 @@
+# tests/test_answer_cache.py
+
+import numpy as np
+import pytest
+
+from backend.answer_cache import SemanticAnswerCache, query_terms
+from rag.embeddings import HashingEmbeddingModel
+
+SCOPE = ("default", "factual", "{}", ())
+
+
+@pytest.fixture
+def embed():
+    model = HashingEmbeddingModel()
+    return lambda text: model.embed_query(text)[0]
+
+
+def _answer(text):
+    return {"answer": text, "sources": [], "confidence": 0.9}
+
+
+def _store(cache, embed, query, answer):
+    cache.store(embed(query), SCOPE, _answer(answer), query_terms(query))
+
+
+def _lookup(cache, embed, query):
+    return cache.lookup(embed(query), SCOPE, 0.9, query_terms(query))
+
+
+def test_query_terms_keep_negation_and_order():
+    assert query_terms("Is bleach safe?") == ("bleach", "safe")
+    assert query_terms("is bleach not safe") == ("bleach", "not", "safe")
+    assert query_terms("Isn't bleach safe?") == query_terms("is not bleach safe")
+
+
+def test_a_negated_query_misses(embed):
+    cache = SemanticAnswerCache(capacity=8, ttl=60)
+    _store(cache, embed, "is bleach safe to drink", "No.")
+
+    # the embedder drops "not": only the terms tell them apart
+    a, b = embed("is bleach safe to drink"), embed("is bleach not safe to drink")
+    assert float(np.dot(a, b)) > 0.999
+
+    assert _lookup(cache, embed, "Is bleach safe to drink?")["answer"] == "No."
+    assert _lookup(cache, embed, "is bleach not safe to drink") is None
+    assert _lookup(cache, embed, "isn't bleach safe to drink") is None
+
+
+def test_reordered_terms_miss(embed):
+    cache = SemanticAnswerCache(capacity=8, ttl=60)
+    _store(cache, embed, "does python call rust", "Through FFI.")
+
+    assert _lookup(cache, embed, "does rust call python") is None
+
+
+def test_a_negated_query_does_not_overwrite_the_original(embed):
+    cache = SemanticAnswerCache(capacity=8, ttl=60)
+    _store(cache, embed, "is bleach safe to drink", "No.")
+    _store(cache, embed, "is bleach not safe to drink", "Correct, it is not.")
+
+    assert cache.stats()["entries"] == 2
+    assert _lookup(cache, embed, "is bleach safe to drink")["answer"] == "No."
+    assert _lookup(cache, embed, "is bleach not safe to drink")["answer"] == "Correct, it is not."
@@ -0,0 +1,41 @@
+# tests/test_api_admin.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+
+ADMIN_PATHS = ["/admin/indices", "/admin/admission", "/debug/profiles", "/debug/memory"]
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", ADMIN_PATHS)
+def test_admin_endpoints_are_off_by_default(client, monkeypatch, path):
+    monkeypatch.delenv("MIMIR_ADMIN_TOKEN", raising=False)
+    assert client.get(path).status_code == 404
+    assert client.get(path, headers={"X-Admin-Token": ""}).status_code == 404
+
+
+def test_reload_is_off_by_default(client, monkeypatch):
+    monkeypatch.delenv("MIMIR_ADMIN_TOKEN", raising=False)
+    assert client.post("/admin/indices/reload").status_code == 404
+
+
+@pytest.mark.parametrize("path", ADMIN_PATHS)
+def test_admin_endpoints_need_the_token(client, monkeypatch, path):
+    monkeypatch.setenv("MIMIR_ADMIN_TOKEN", "s3cret")
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get(path, headers={"X-Admin-Token": "s3cret"}).status_code == 200
+
+
+def test_non_ascii_tokens_are_compared_as_bytes(client, monkeypatch):
+    monkeypatch.setenv("MIMIR_ADMIN_TOKEN", "sécret")
+    path = "/admin/indices"
+    assert client.get(path, headers={"X-Admin-Token": "s3cret"}).status_code == 403
+    assert client.get(path, headers={"X-Admin-Token": "sècret".encode()}).status_code == 403
+    assert client.get(path, headers={"X-Admin-Token": "sécret".encode()}).status_code == 200
@@ -0,0 +1,42 @@
+# tests/test_api_sessions.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.deps import mimir_assistant
+from api.main import app
+from backend.admission import CallLimiter
+
+
+RECALL = "do you remember what I asked earlier"
+
+
+@pytest.fixture(scope="module")
+def client():
+    mimir_assistant.web_search.search = lambda q: {}
+    mimir_assistant.web_knowledge.lookup = lambda q: None
+    mimir_assistant.web_limit = CallLimiter(max_in_flight=64, rate=0, burst=1)
+    return TestClient(app)
+
+
+def _ask(client, text, session=None):
+    headers = {"X-Session-ID": session} if session else {}
+    return client.post("/query", json={"query": text}, headers=headers).json()["answer"]
+
+
+def test_requests_without_a_session_share_nothing(client):
+    _ask(client, "who created you")
+    _ask(client, "tell me about python lists")
+
+    answer = _ask(client, RECALL)
+    assert "Earlier, you spoke of" not in answer
+    assert "python lists" not in answer
+
+
+def test_sessions_remember_only_their_own_turns(client):
+    _ask(client, "tell me about python lists", session="alice")
+    _ask(client, "explain faiss indexes", session="bob")
+
+    answer = _ask(client, RECALL, session="alice")
+    assert "python lists" in answer
+    assert "faiss" not in answer
@@ -0,0 +1,58 @@
+# tests/test_assistant.py
+
+import os
+
+import pytest
+
+from backend.admission import CallLimiter
+from backend.assistant import MimirAssistant
+from rag.ingest import DocumentIngestor
+from rag.snapshots import SnapshotManager, SnapshotStore
+
+RAW_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "raw")
+
+
+@pytest.fixture(scope="module")
+def assistant(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("indices"))
+    ingestor = DocumentIngestor(data_dir=RAW_DIR, index_dir=root)
+    for domain in ("general", "technical"):
+        ingestor.ingest_snapshot(domain)
+
+    mimir = MimirAssistant()
+    mimir.indices = SnapshotManager(SnapshotStore(root))
+    mimir.indices.reload()
+    mimir.web_limit = CallLimiter(max_in_flight=64, rate=0, burst=1)
+    return mimir
+
+
+@pytest.fixture
+def web_calls(assistant, monkeypatch):
+    calls = []
+
+    def search(query):
+        calls.append(query)
+        return {
+            "answer": f"From the web: {query}.",
+            "sources": ["https://example.com"],
+            "confidence": 0.7,
+            "metadata": {"tool": "tavily"},
+        }
+
+    monkeypatch.setattr(assistant.web_search, "search", search)
+    monkeypatch.setattr(assistant.web_knowledge, "lookup", lambda q: None)
+    return calls
+
+
+@pytest.mark.parametrize("text", ["how do I bake bread", "who won the 2022 world cup"])
+def test_off_topic_questions_reach_the_web(assistant, web_calls, text):
+    result = assistant.query(text)
+    assert web_calls == [text]
+    assert result["answer"] == f"From the web: {text}."
+
+
+def test_on_topic_questions_stay_local(assistant, web_calls):
+    result = assistant.query("what is faiss")
+    assert web_calls == []
+    assert result["sources"] == ["faiss_overview.txt"]
+    assert "FAISS" in result["answer"]
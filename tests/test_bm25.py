@@ -0,0 +1,39 @@
+# tests/test_bm25.py
+
+from rag.bm25 import BM25Index, tokenize
+from rag.fusion import fuse
+from rag.stop_words import ENGLISH_STOP_WORDS
+
+DOCS = [
+    "FAISS is a library for efficient similarity search of dense vectors.",
+    "Python is a dynamically typed programming language.",
+    "Vector databases store embeddings and answer nearest neighbour queries.",
+]
+
+
+def test_stop_words_match_the_embedders():
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS as sklearn_words
+
+    assert ENGLISH_STOP_WORDS == frozenset(sklearn_words)
+
+
+def test_tokenize_drops_stop_words():
+    assert tokenize("How do I bake the bread?") == ["bake", "bread"]
+
+
+def test_stop_word_only_query_returns_no_hits():
+    index = BM25Index().build(DOCS)
+    assert index.search("how do the who is a") == []
+    assert not index.scores("what is it").any()
+
+
+def test_search_ranks_matching_documents():
+    index = BM25Index().build(DOCS)
+    hits = index.search("similarity search with faiss")
+    assert hits and hits[0][0] == 0
+
+
+def test_rrf_fusion_rewards_agreement():
+    dense = [(1, 0.9), (2, 0.8), (0, 0.1)]
+    bm25 = [(2, 7.0), (0, 3.0)]
+    assert [i for i, _ in fuse([dense, bm25], 2, method="rrf")] == [2, 0]
@@ -0,0 +1,28 @@
+# tests/test_cold_start.py
+
+from evaluation.cold_start import check
+
+
+def _result(import_s, first_response_s, eager=()):
+    return {
+        "import_s": import_s,
+        "first_response_s": first_response_s,
+        "reference": {"import_s": 0.3, "first_response_s": 0.32},
+        "status": 200,
+        "eager": list(eager),
+    }
+
+
+def test_within_ratio_of_the_reference_passes():
+    assert check(_result(0.45, 0.5), max_ratio=2.0) == []
+
+
+def test_slower_than_ratio_fails_per_metric():
+    failures = check(_result(0.45, 1.1), max_ratio=2.0)
+    assert len(failures) == 1 and failures[0].startswith("first_response_s")
+
+
+def test_eager_heavy_import_fails_regardless_of_time():
+    assert check(_result(0.3, 0.32, eager=["sklearn"]), max_ratio=2.0) == [
+        "imported at start-up: sklearn"
+    ]
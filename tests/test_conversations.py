@@ -0,0 +1,89 @@
+# tests/test_conversations.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from backend.admission import CallLimiter
+from backend.assistant import MimirAssistant
+from backend.query_context import ContextualQueryEncoder
+
+
+@pytest.fixture(scope="module")
+def assistant():
+    mimir = MimirAssistant()
+    mimir.web_search.search = lambda q: {}
+    mimir.web_knowledge.lookup = lambda q: None
+    mimir.web_limit = CallLimiter(max_in_flight=64, rate=0, burst=1)
+    return mimir
+
+
+def _ask(assistant, session_id, history, text):
+    turn = {"role": "user", "content": text}
+    result = assistant.query_with_memory(history + [turn], session_id=session_id)
+    history += [turn, {"role": "mimir", "content": result["answer"]}]
+    return result
+
+
+def test_sessions_do_not_share_memory(assistant):
+    a, b = [], []
+    _ask(assistant, "a", a, "tell me about python lists")
+    _ask(assistant, "b", b, "who created you")
+    _ask(assistant, "b", b, "explain faiss indexes")
+
+    recalled = _ask(assistant, "a", a, "do you remember what I asked earlier")["answer"]
+    assert "python lists" in recalled
+    assert "faiss" not in recalled and "created" not in recalled
+
+
+def test_other_sessions_leave_the_query_vector_alone(assistant):
+    _ask(assistant, "c", [], "what is product quantization")
+    before = assistant.conversations.get("c").query_vector().copy()
+
+    _ask(assistant, "d", [], "weather in paris tomorrow")
+    assert np.array_equal(assistant.conversations.get("c").query_vector(), before)
+
+
+def test_without_a_session_nothing_is_remembered(assistant):
+    _ask(assistant, None, [], "tell me about bm25")
+    answer = _ask(assistant, None, [], "do you remember what I asked earlier")["answer"]
+    assert answer == "We have only just begun speaking."
+
+
+def test_concurrent_sessions_keep_their_own_turns(assistant):
+    def run(i):
+        history = []
+        for n in range(3):
+            _ask(assistant, f"s{i}", history, f"topic{i} question {n}")
+        return assistant.conversations.get(f"s{i}").messages
+
+    with ThreadPoolExecutor(8) as pool:
+        for i, messages in enumerate(pool.map(run, range(8))):
+            users = [m["content"] for m in messages if m["role"] == "user"]
+            assert users and all(u.startswith(f"topic{i} ") for u in users)
+
+
+class _CountingEmbedder:
+    def __init__(self):
+        self.texts = []
+
+    def transform_batch(self, texts):
+        self.texts.extend(texts)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    def weight_query(self, vectors):
+        return vectors
+
+
+def test_turns_are_embedded_only_when_a_query_vector_is_needed():
+    embedder = _CountingEmbedder()
+    encoder = ContextualQueryEncoder(embedder, max_turns=2)
+    for text in ("first", "second", "third"):
+        encoder.add_turn("user", text)
+    assert embedder.texts == []
+
+    encoder.query_vector()
+    encoder.query_vector()
+    # one batch for the kept turns, then served from the cache
+    assert embedder.texts == ["second", "third"]
@@ -0,0 +1,46 @@
+# tests/test_dedup.py
+
+import os
+
+import pytest
+
+from rag.dedup import NearDuplicateFilter, collapse_duplicates, hamming, simhash
+
+RAW_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "raw")
+
+
+def _read(name):
+    with open(os.path.join(RAW_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+FAISS = _read("technical/faiss_overview.txt")
+PYTHON = _read("technical/python_basics.txt")
+
+
+def test_near_duplicates_have_close_fingerprints():
+    assert simhash(FAISS) == simhash(FAISS.upper().replace(" ", "  "))
+    assert hamming(simhash(FAISS), simhash(FAISS + " Copyright 2024.")) <= 3
+    assert hamming(simhash(FAISS), simhash(PYTHON)) > 3
+
+
+def test_collapse_keeps_the_first_and_merges_sources():
+    texts = [FAISS, PYTHON, FAISS + " Copyright 2024."]
+    metas = [
+        {"source": "a.txt", "text": texts[0]},
+        {"source": "b.txt", "text": texts[1]},
+        {"source": "c.txt", "text": texts[2], "start_char": 0},
+    ]
+
+    kept, meta, stats = collapse_duplicates(texts, metas)
+
+    assert kept == [FAISS, PYTHON]
+    assert meta[0]["sources"] == ["a.txt", "c.txt"]
+    assert meta[0]["duplicates"] == [{"source": "c.txt", "start_char": 0}]
+    assert "sources" not in meta[1]
+    assert stats["chunks_kept"] == 2 and stats["duplicates_removed"] == 1
+
+
+def test_banding_needs_max_distance_below_the_band_count():
+    with pytest.raises(ValueError):
+        NearDuplicateFilter(max_distance=4)
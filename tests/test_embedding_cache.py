@@ -0,0 +1,65 @@
+# tests/test_embedding_cache.py
+
+import os
+
+import numpy as np
+
+from rag.embedding_cache import CachedEmbeddingBackend, EmbeddingCache
+from rag.embeddings import HashingEmbeddingModel
+
+
+def _disk_bytes(cache_dir):
+    return sum(
+        os.path.getsize(os.path.join(cache_dir, f))
+        for f in os.listdir(cache_dir)
+        if f.endswith(".f32")
+    ) if os.path.isdir(cache_dir) else 0
+
+
+def test_query_time_text_never_touches_disk(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    embedder = CachedEmbeddingBackend(HashingEmbeddingModel(), EmbeddingCache(cache_dir))
+
+    for i in range(20):
+        embedder.embed_query(f"question number {i}")
+        embedder.transform_batch([f"snippet sentence {i}."])
+
+    assert _disk_bytes(cache_dir) == 0
+
+
+def test_lru_is_bounded(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache"), lru_size=8)
+    embedder = CachedEmbeddingBackend(HashingEmbeddingModel(), cache)
+    embedder.transform_batch([f"text {i}" for i in range(50)])
+    assert len(cache._lru) == 8
+
+
+def test_documents_persist_and_are_shared(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    model = HashingEmbeddingModel()
+    first = CachedEmbeddingBackend(model, EmbeddingCache(cache_dir)).embed_batch(["alpha", "beta"])
+
+    # a fresh process-level cache reads the same store
+    other = EmbeddingCache(cache_dir)
+    calls = []
+    vectors = other.get_or_compute(
+        model, ["alpha", "beta"], lambda t: calls.append(t) or model.transform_batch(t), persist=True
+    )
+    assert calls == []
+    assert np.allclose(vectors, first)
+
+
+def test_disk_store_rotates_at_the_cap(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    model = HashingEmbeddingModel(dim=64)
+    row = 64 * 4
+    cache = EmbeddingCache(cache_dir, max_bytes=10 * row)
+    embedder = CachedEmbeddingBackend(model, cache)
+
+    for i in range(25):
+        embedder.embed_batch([f"document {i}"])
+        assert _disk_bytes(cache_dir) <= 10 * row
+
+    # recent documents are still served, and correctly
+    recent = cache.get_or_compute(model, ["document 24"], lambda t: 1 / 0, persist=True)
+    assert np.allclose(recent, model.transform_batch(["document 24"]))
@@ -0,0 +1,79 @@
+# tests/test_embeddings.py
+
+import os
+
+import numpy as np
+import pytest
+
+from rag.embeddings import HashingEmbeddingModel, create_backend
+from rag.ingest import DocumentIngestor
+from rag.retrieve import Retriever
+from rag.snapshots import SnapshotManager, SnapshotStore
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+RAW_DIR = os.path.join(ROOT, "data", "raw")
+
+DOCS = [
+    "FAISS is a library for efficient similarity search of dense vectors.",
+    "Python is a dynamically typed programming language.",
+    "Vector databases store embeddings for similarity search.",
+]
+
+
+def test_hashing_vectors_are_the_same_in_any_worker():
+    a = HashingEmbeddingModel(dim=512)
+    b = create_backend(a.spec())
+    np.testing.assert_array_equal(a.transform_batch(DOCS), b.transform_batch(DOCS))
+
+
+def test_streaming_idf_matches_one_batch():
+    whole = HashingEmbeddingModel().partial_fit(DOCS)
+    left, right = HashingEmbeddingModel(), HashingEmbeddingModel()
+    left.partial_fit(DOCS[:1])
+    right.partial_fit(DOCS[1:])
+    left.merge_idf(right.doc_freq, right.num_docs)
+
+    np.testing.assert_allclose(left.idf(), whole.idf())
+    np.testing.assert_allclose(left.embed_query("faiss search"), whole.embed_query("faiss search"))
+
+
+@pytest.fixture(scope="module")
+def retriever(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("indices"))
+    DocumentIngestor(data_dir=RAW_DIR, index_dir=root, chunk_size=200, overlap=50).ingest_domain(
+        "technical"
+    )
+    retriever = Retriever(None)
+    retriever.load_domain(root, "technical")
+    return retriever
+
+
+def test_query_vectors_get_the_index_idf(retriever):
+    text = "similarity search of dense vectors"
+    # what a conversation passes: term weights only, no IDF
+    plain = HashingEmbeddingModel().embed_query(text)[0]
+
+    assert retriever.embedder.num_docs
+    given = retriever.candidates(plain, 5, text)["dense"]
+    embedded = retriever.candidates(None, 5, text)["dense"]
+    assert given and [i for i, _ in given] == [i for i, _ in embedded]
+    np.testing.assert_allclose([s for _, s in given], [s for _, s in embedded], rtol=1e-5)
+
+
+def test_vectors_of_another_space_are_replaced_by_the_text(retriever):
+    text = "similarity search of dense vectors"
+    legacy = np.ones(384, dtype=np.float32)
+
+    assert retriever.candidates(legacy, 5, text)["dense"] == retriever.candidates(None, 5, text)["dense"]
+
+
+def test_shipped_indices_serve_dense_hits():
+    manager = SnapshotManager(SnapshotStore(os.path.join(ROOT, "data", "indices")))
+    manager.reload()
+
+    for domain, retriever in manager.current.retrievers.items():
+        assert retriever.embedder is not None, domain
+        assert retriever.index.d == retriever.embedder.dim, domain
+
+    found = manager.current.retrievers["technical"].candidates(None, 5, "what is faiss")
+    assert found["dense"]
@@ -0,0 +1,42 @@
+# tests/test_file_index.py
+
+import numpy as np
+
+from backend.file_qa.index import FileFaissIndex
+from rag.embedding_cache import CachedEmbeddingBackend, EmbeddingCache
+from rag.embeddings import HashingEmbeddingModel
+
+
+CHUNKS = [
+    "FAISS is a library for efficient similarity search of dense vectors.",
+    "BM25 ranks documents by term frequency and inverse document frequency.",
+    "The college fest had music, food stalls and a robotics contest.",
+    "Product quantization compresses vectors into short codes.",
+]
+
+
+def _index(tmp_path, **kwargs):
+    cache = EmbeddingCache(str(tmp_path / "cache"))
+    index = FileFaissIndex(
+        embedder=CachedEmbeddingBackend(HashingEmbeddingModel(), cache), **kwargs
+    )
+    index.build(CHUNKS, [{"source": f"f{i}.txt"} for i in range(len(CHUNKS))])
+    return index, cache
+
+
+def test_rerank_reads_mapped_vectors_not_the_embedding_cache(tmp_path):
+    index, cache = _index(tmp_path, encoding="int8")
+    assert isinstance(index.exact, np.memmap)
+
+    before = cache.hits + cache.misses
+    results = index.search("similarity search library", top_k=2)
+
+    assert results[0]["metadata"]["source"] == "f0.txt"
+    # only the query itself went through the cache
+    assert cache.hits + cache.misses - before == 1
+
+
+def test_float32_needs_no_rerank_copy(tmp_path):
+    index, _ = _index(tmp_path, encoding="float32")
+    assert index.exact is None
+    assert index.search("college fest robotics", top_k=1)[0]["metadata"]["source"] == "f2.txt"
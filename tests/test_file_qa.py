@@ -0,0 +1,88 @@
+# tests/test_file_qa.py
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from backend.file_qa.file_qa import FileQASystem
+
+
+def _pdf(path, pages):
+    # smallest PDF with one line of Helvetica text per page
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))), len(pages)
+        ),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+    path.write_bytes(out)
+    return str(path)
+
+
+def test_pdf_chunks_carry_their_page(tmp_path):
+    pytest.importorskip("PyPDF2")
+    path = _pdf(
+        tmp_path / "guide.pdf",
+        ["FAISS builds vector indexes", "BM25 ranks keyword matches"],
+    )
+
+    qa = FileQASystem()
+    qa.ingest_files([path])
+
+    assert [m["page"] for m in qa._metadatas] == [1, 2]
+    result = qa.answer("keyword matches ranking", filters={"page": {"gte": 2}})
+    assert result["sources"] == ["guide.pdf"]
+    assert "BM25" in result["answer"]
+    assert not qa.answer("vector indexes", filters={"page": 3})["sources"]
+
+
+def test_text_files_have_no_page(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("FAISS builds vector indexes for similarity search.")
+
+    qa = FileQASystem()
+    qa.ingest_files([str(path)])
+
+    assert "page" not in qa._metadatas[0]
+
+
+def test_reuploading_indexed_content_queues_no_job():
+    client = TestClient(app)
+    body = ("upload.txt", b"FAISS builds vector indexes for similarity search.", "text/plain")
+    try:
+        first = client.post("/files/upload", files=[("files", body)]).json()
+        assert first["job_id"]
+        deadline = time.time() + 10
+        while client.get(f"/files/jobs/{first['job_id']}").json()["status"] != "done":
+            assert time.time() < deadline
+            time.sleep(0.01)
+        submitted = len(client.get("/files/jobs", params={"limit": 1000}).json()["jobs"])
+
+        again = client.post("/files/upload", files=[("files", body)]).json()
+        assert again["job_id"] is None and again["status"] == "done"
+        assert len(client.get("/files/jobs", params={"limit": 1000}).json()["jobs"]) == submitted
+    finally:
+        client.post("/files/clear")
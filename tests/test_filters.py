@@ -0,0 +1,106 @@
+# tests/test_filters.py
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from rag.filters import MetadataFilterIndex, select_domains, validate_filters
+from rag.ingest import DocumentIngestor
+from rag.retrieve import Retriever
+
+RAW_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "raw")
+
+META = [
+    {"source": "a.txt", "page": 1, "ingested_at": 100},
+    {"source": "b.txt", "page": 2, "ingested_at": 200},
+    {"source": "a.txt", "page": 3, "ingested_at": 300},
+    {"sources": ["a.txt", "c.txt"], "source": "a.txt", "page": 4, "ingested_at": 400},
+]
+
+
+@pytest.fixture
+def index():
+    return MetadataFilterIndex().build(META)
+
+
+def test_equality_any_of_and_range(index):
+    assert index.select(None) is None
+    assert index.select({"source": "c.txt"}).tolist() == [3]
+    assert index.select({"source": ["b.txt", "c.txt"]}).tolist() == [1, 3]
+    assert index.select({"ingested_at": {"gte": 200, "lt": 400}}).tolist() == [1, 2]
+    assert index.select({"source": "a.txt", "page": {"gt": 1}}).tolist() == [2, 3]
+    assert not len(index.select({"source": "missing.txt"}))
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {"ingested_at": {"gte": "abc"}},
+        {"page": {"lt": None}},
+        {"page": {"lt": True}},
+        {"source": [["a.txt"]]},
+        {"source": {"gte": 1}},
+        {"source": ["a.txt", {"x": 1}]},
+        {"author": "me"},
+        {"page": {"between": [1, 2]}},
+        ["source", "a.txt"],
+    ],
+)
+def test_invalid_filters_raise_value_error(index, filters):
+    with pytest.raises(ValueError):
+        validate_filters(filters)
+    with pytest.raises(ValueError):
+        index.select(filters)
+
+
+def test_select_domains():
+    domains = ["python", "ml", "history"]
+    assert select_domains(None, domains) == domains
+    assert select_domains({"domain": "ml"}, domains) == ["ml"]
+    assert select_domains({"domain": ["history", "x"]}, domains) == ["history"]
+    assert select_domains({"domain": "x"}, domains) == []
+
+
+def test_api_rejects_bad_filters_with_400():
+    from api.main import app
+
+    client = TestClient(app)
+    for filters in ({"ingested_at": {"gte": "abc"}}, {"source": [["a.txt"]]}):
+        response = client.post("/query", json={"query": "hello", "filters": filters})
+        assert response.status_code == 400
+
+
+ENCODED = [
+    (index_type, encoding)
+    for index_type in ("flat", "ivf_flat", "hnsw")
+    for encoding in ("float32", "float16", "int8", "pq")
+]
+
+
+@pytest.mark.parametrize("rerank", [True, False])
+@pytest.mark.parametrize("index_type,encoding", ENCODED)
+def test_filtered_search_on_every_encoding(tmp_path, index_type, encoding, rerank):
+    DocumentIngestor(
+        data_dir=RAW_DIR,
+        index_dir=str(tmp_path),
+        chunk_size=200,
+        overlap=50,
+        index_type=index_type,
+        encoding=encoding,
+        rerank=rerank,
+    ).ingest_domain("technical")
+
+    filters = {"source": "faiss_overview.txt"}
+    # exact scoring over the filtered ids, then the FAISS path
+    for exact_filter_max in (4096, 0):
+        retriever = Retriever(None, exact_filter_max=exact_filter_max)
+        retriever.load_domain(str(tmp_path), "technical")
+        allowed = set(retriever.filters.select(filters).tolist())
+
+        found = retriever.candidates(None, 5, "similarity search of vectors", filters)
+        assert found["dense"] and {i for i, _ in found["dense"]} <= allowed
+
+        results = retriever.retrieve(None, 5, "similarity search of vectors", filters)
+        assert results
+        assert {r["metadata"]["source"] for r in results} == {"faiss_overview.txt"}
@@ -0,0 +1,68 @@
+# tests/test_jobs.py
+
+import threading
+
+import pytest
+
+from backend.jobs import JobQueue, QueueFull
+
+
+def test_jobs_report_progress_and_results():
+    jobs = JobQueue()
+
+    def work(job):
+        job.report(stage="reading", files_done=0)
+        job.report(files_done=1)
+        return {"chunks": 3}
+
+    job = jobs.submit("ingest_files", work, files=["a.txt"])
+    assert job.wait(5)
+
+    state = jobs.get(job.id).to_dict()
+    assert state["status"] == "done" and state["result"] == {"chunks": 3}
+    assert state["progress"] == {"stage": "reading", "files_done": 1}
+    assert state["files"] == ["a.txt"]
+
+
+def test_failures_are_recorded_not_raised():
+    jobs = JobQueue()
+
+    def fail(job):
+        raise ValueError("bad file")
+
+    job = jobs.submit("ingest_files", fail)
+    assert job.wait(5)
+    assert job.to_dict()["status"] == "failed"
+    assert job.to_dict()["error"] == "ValueError: bad file"
+
+
+def test_a_full_queue_rejects_at_once():
+    jobs = JobQueue(max_workers=1, max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block(job):
+        started.set()
+        release.wait(5)
+
+    running = jobs.submit("ingest_files", block)
+    assert started.wait(5)
+    queued = jobs.submit("ingest_files", block)
+    with pytest.raises(QueueFull):
+        jobs.submit("ingest_files", block)
+
+    release.set()
+    assert running.wait(5) and queued.wait(5)
+    assert jobs.stats()["done"] == 2
+
+
+def test_only_the_last_jobs_are_retained():
+    jobs = JobQueue(retain=2)
+    submitted = []
+    for _ in range(3):
+        # finished jobs are evicted on the next submit
+        submitted.append(jobs.submit("ingest_files", lambda job: None))
+        assert submitted[-1].wait(5)
+
+    assert jobs.get(submitted[0].id) is None
+    assert [j["job_id"] for j in jobs.list()] == [submitted[2].id, submitted[1].id]
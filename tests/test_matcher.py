@@ -0,0 +1,30 @@
+# tests/test_matcher.py
+
+from backend.matcher import INTENT_MATCHER, PhraseMatcher, tokenize
+
+
+def test_matches_fall_on_word_boundaries():
+    assert INTENT_MATCHER.categories("Who made you?") == {"creator", "factual"}
+    assert "factual" not in INTENT_MATCHER.categories("the whole thing")
+    assert INTENT_MATCHER.categories("") == set()
+
+
+def test_overlapping_phrases_are_all_reported():
+    matcher = PhraseMatcher({"a": ["new york"], "b": ["york city"], "c": ["new york city hall"]})
+    assert matcher.scan("I love New York City!") == {"a": ["new york"], "b": ["york city"]}
+    assert matcher.categories("new york city hall") == {"a", "b", "c"}
+
+
+def test_failure_links_recover_from_a_partial_match():
+    matcher = PhraseMatcher({"x": ["might be", "be right"]})
+    assert matcher.scan("it might might be right") == {"x": ["might be", "be right"]}
+
+
+def test_state_carries_across_chunks():
+    text = "well, i think it could be"
+    state, seen = 0, set()
+    for word in tokenize(text):
+        state = INTENT_MATCHER.step(state, word)
+        seen.update(c for c, _ in INTENT_MATCHER.outputs(state))
+
+    assert seen == INTENT_MATCHER.categories(text) == {"speculative"}
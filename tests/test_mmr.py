@@ -0,0 +1,39 @@
+# tests/test_mmr.py
+
+import numpy as np
+
+from rag.mmr import diversify, mmr_select
+
+# two near-copies of one chunk, then a different but still relevant one
+VECTORS = np.array(
+    [
+        [1.0, 0.0, 0.0],
+        [0.99, 0.14, 0.0],
+        [0.0, 1.0, 0.0],
+        [0.0, 0.0, 1.0],
+    ],
+    dtype=np.float32,
+)
+RELEVANCE = np.array([1.0, 0.95, 0.8, 0.1], dtype=np.float32)
+
+
+def test_redundant_copies_give_way_to_other_relevant_chunks():
+    assert mmr_select(RELEVANCE, VECTORS, 3, lambda_=0.5)[:2] == [0, 2]
+
+
+def test_lambda_one_is_plain_relevance_order():
+    assert mmr_select(RELEVANCE, VECTORS, 4, lambda_=1.0) == [0, 1, 2, 3]
+
+
+def test_edge_cases():
+    assert mmr_select(np.empty(0), np.empty((0, 3)), 3) == []
+    assert mmr_select(RELEVANCE, VECTORS, 0) == []
+    assert sorted(mmr_select(RELEVANCE, VECTORS, 10)) == [0, 1, 2, 3]
+    # zero vectors are neither similar to anything nor NaN
+    assert mmr_select(RELEVANCE[:2], np.zeros((2, 3)), 2) == [0, 1]
+
+
+def test_diversify_keeps_pairs_and_truncates_without_vectors():
+    ranked = [(10, 9.0), (11, 8.5), (12, 7.0), (13, 1.0)]
+    assert diversify(ranked, VECTORS, 2, lambda_=0.5) == [(10, 9.0), (12, 7.0)]
+    assert diversify(ranked, None, 2) == ranked[:2]
@@ -0,0 +1,33 @@
+# tests/test_profiling.py
+
+import os
+import time
+
+from backend.profiling import RequestProfiler
+
+
+def _age(profiler, request_id, seconds):
+    path = profiler.profile_path(request_id)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_only_the_newest_profiles_are_kept(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), max_files=3, max_age=3600)
+    for n in range(5):
+        profiler.run(f"req-{n}", sum, range(10))
+        # distinct, increasing mtimes
+        _age(profiler, f"req-{n}", 60 - n)
+
+    profiler.run("req-5", sum, range(10))
+    assert [p["request_id"] for p in profiler.list_profiles()] == ["req-5", "req-4", "req-3"]
+
+
+def test_expired_profiles_are_removed(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), max_files=100, max_age=3600)
+    profiler.run("old", sum, range(10))
+    _age(profiler, "old", 7200)
+
+    profiler.run("new", sum, range(10))
+    assert profiler.profile_path("old") is None
+    assert profiler.profile_path("new")
@@ -0,0 +1,148 @@
+# tests/test_sharding.py
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from rag.bm25 import BM25Index
+from rag.ingest import DocumentIngestor
+from rag.retrieve import Retriever
+from rag.sharding import ShardBusy, ShardPolicy, ShardWorker, gather
+from rag.snapshots import SnapshotManager, SnapshotStore
+
+RAW_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "raw")
+
+QUERIES = [
+    "what is faiss",
+    "vector database similarity search",
+    "python dynamically typed language",
+    "nearest neighbors index",
+]
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("indices"))
+    ingestor = DocumentIngestor(
+        data_dir=RAW_DIR, index_dir=root, chunk_size=200, overlap=50, partitions=3
+    )
+    ingestor.ingest_snapshot("technical")
+    return SnapshotStore(root)
+
+
+@pytest.fixture(scope="module")
+def sharded(store):
+    manager = SnapshotManager(store, shard_policy=ShardPolicy(deadline=30))
+    manager.reload()
+    yield manager
+    manager.current.retrievers["technical"].close()
+
+
+def _shard_size():
+    from rag import sharding
+
+    return len(sharding._SHARD.documents)
+
+
+def _ranking(results):
+    return [
+        (r["metadata"]["source"], r["metadata"]["start_char"], round(r["score"], 6))
+        for r in results
+    ]
+
+
+def test_bm25_subset_scores_like_the_full_index():
+    docs = ["the cat sat", "a dog ran far", "cat and dog", "faiss vector search", "cat cat dog"]
+    full = BM25Index().build(docs)
+    ids = np.array([1, 2, 4])
+    part = full.subset(ids)
+
+    for query in ("cat dog", "faiss", "far"):
+        np.testing.assert_allclose(part.scores(query), full.scores(query)[ids])
+
+
+def test_each_shard_loads_only_its_partition(sharded):
+    workers = sharded.current.retrievers["technical"].workers
+    sizes = [w.submit(_shard_size).result(timeout=30) for w in workers]
+    assert sizes == [5, 5, 5]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_sharded_ranking_matches_unsharded(store, sharded, query):
+    single = SnapshotManager(store)
+    single.reload()
+
+    expected = single.current.retrieve(None, top_k=5, query_text=query)
+    results, report = sharded.current.search(None, top_k=5, query_text=query)
+
+    assert not report["dropped"] and not report["failed"]
+    assert expected and _ranking(results) == _ranking(expected)
+
+
+def test_sharded_ranking_matches_with_a_small_candidate_pool(store):
+    # each shard's pool is cut off: only the global merge gets it right
+    kwargs = {"candidate_pool": 4}
+    single = SnapshotManager(store, retriever_factory=lambda: Retriever(None, **kwargs))
+    single.reload()
+    manager = SnapshotManager(
+        store, shard_policy=ShardPolicy(deadline=30, retriever_kwargs=kwargs)
+    )
+    manager.reload()
+    try:
+        for query in QUERIES:
+            expected = single.current.retrieve(None, top_k=3, query_text=query)
+            results = manager.current.retrieve(None, top_k=3, query_text=query)
+            assert expected and _ranking(results) == _ranking(expected)
+    finally:
+        manager.current.retrievers["technical"].close()
+
+
+def test_preload_without_starting_shards(store):
+    manager = SnapshotManager(store, shard_policy=ShardPolicy(deadline=30))
+    try:
+        manager.reload(start_shards=False)
+        workers = manager.current.retrievers["technical"].workers
+        assert not any(w.started for w in workers)
+
+        # /debug/memory reports them without starting them
+        assert manager.current.retrievers["technical"].memory_usage()["total"] == 0
+        assert not any(w.started for w in workers)
+
+        # after the fork: each worker starts its own
+        manager.warm()
+        assert all(w.started for w in workers)
+        assert manager.current.retrievers["technical"].memory_usage()["total"] > 0
+    finally:
+        manager.current.retrievers["technical"].close()
+
+
+def test_busy_shard_rejects_instead_of_queueing(store):
+    index_dir = store.version_dir("technical", store.current_version("technical"))
+    worker = ShardWorker(index_dir, "technical", 0, 3, max_pending=1)
+    try:
+        expires = time.time() + 30
+        first = worker.search(None, 5, "faiss", None, expires)
+        second = worker.search(None, 5, "faiss", None, expires)
+
+        assert isinstance(second.exception(timeout=0), ShardBusy)
+        replies, report = gather([("a", first), ("b", second)], deadline=30)
+        assert len(replies) == 1 and report["dropped"] == ["b"]
+
+        # the slot is free again once the first search is done
+        assert worker.search(None, 5, "faiss", None, expires).result(timeout=30)
+    finally:
+        worker.close()
+
+
+def test_expired_requests_are_skipped(store):
+    index_dir = store.version_dir("technical", store.current_version("technical"))
+    worker = ShardWorker(index_dir, "technical", 0, 3)
+    try:
+        worker.warm().result(timeout=30)
+        stale = worker.search(None, 5, "faiss", None, time.time() - 1)
+        replies, report = gather([("a", stale)], deadline=30)
+        assert replies == [] and report["dropped"] == ["a"]
+    finally:
+        worker.close()
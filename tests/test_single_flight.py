@@ -0,0 +1,67 @@
+# tests/test_single_flight.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rag.single_flight import SingleFlight
+
+
+def _burst(flights, key, fn, callers=8):
+    """
+    Start callers at once and wait until all but the leader are
+    waiting on it (fn must block until released).
+    """
+    pool = ThreadPoolExecutor(callers)
+    futures = [pool.submit(flights.do, key, fn) for _ in range(callers)]
+    deadline = time.time() + 5
+    while flights.stats()["shared"] < callers - 1 and time.time() < deadline:
+        time.sleep(0.001)
+    pool.shutdown(wait=False)
+    return futures
+
+
+def test_concurrent_calls_share_one_run():
+    flights = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        release.wait(5)
+        return "answer"
+
+    futures = _burst(flights, "q", work)
+    release.set()
+
+    assert [f.result(timeout=5) for f in futures] == ["answer"] * 8
+    assert len(runs) == 1
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "shared": 7}
+
+
+def test_waiters_get_the_leaders_error():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("web search failed")
+
+    futures = _burst(flights, "q", fail)
+    release.set()
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="web search failed"):
+            future.result(timeout=5)
+
+
+def test_finished_keys_run_again_and_keys_do_not_mix():
+    flights = SingleFlight()
+    calls = []
+
+    assert flights.do("a", lambda: calls.append("a") or 1) == 1
+    assert flights.do("a", lambda: calls.append("a") or 2) == 2
+    assert flights.do("b", lambda: calls.append("b") or 3) == 3
+    assert calls == ["a", "a", "b"]
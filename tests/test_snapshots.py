@@ -0,0 +1,78 @@
+# tests/test_snapshots.py
+
+import os
+import shutil
+
+import pytest
+
+from rag.ingest import DocumentIngestor
+from rag.snapshots import LEGACY_VERSION, SnapshotManager, SnapshotStore
+
+RAW_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "raw")
+
+
+@pytest.fixture
+def ingestor(tmp_path):
+    return DocumentIngestor(data_dir=RAW_DIR, index_dir=str(tmp_path), chunk_size=200, overlap=50)
+
+
+def test_reload_swaps_in_a_published_version(ingestor):
+    store = SnapshotStore(ingestor.index_dir)
+    manager = SnapshotManager(store)
+    assert manager.reload()["changed"] is False
+
+    version = ingestor.ingest_snapshot("technical")
+    status = manager.reload()
+    assert status["changed"] and status["versions"] == {"technical": version}
+    assert manager.current.retrieve(None, query_text="what is faiss")
+
+
+def test_in_flight_queries_keep_their_snapshot(ingestor):
+    store = SnapshotStore(ingestor.index_dir)
+    manager = SnapshotManager(store)
+    ingestor.ingest_snapshot("technical")
+    manager.reload()
+
+    held = manager.current
+    ingestor.ingest_snapshot("general")
+    manager.reload()
+
+    assert set(held.retrievers) == {"technical"}
+    assert set(manager.current.retrievers) == {"general", "technical"}
+    # the unchanged domain is reused, not loaded again
+    assert manager.current.retrievers["technical"] is held.retrievers["technical"]
+
+
+def test_unpublished_versions_are_not_served(ingestor):
+    store = SnapshotStore(ingestor.index_dir)
+    manager = SnapshotManager(store)
+    published = ingestor.ingest_snapshot("technical")
+    ingestor.ingest_snapshot("technical", publish=False)
+
+    manager.reload()
+    assert manager.current.versions == {"technical": published}
+
+
+def test_failed_reload_keeps_serving(ingestor):
+    store = SnapshotStore(ingestor.index_dir)
+    manager = SnapshotManager(store)
+    ingestor.ingest_snapshot("technical")
+    manager.reload()
+    before = manager.current
+
+    broken = store.create_version("technical")
+    store.publish("technical", broken)
+    manager._safe_reload()
+
+    assert manager.current is before
+    assert manager.last_error
+
+
+def test_flat_root_files_are_the_legacy_version(ingestor):
+    version = ingestor.ingest_snapshot("technical")
+    store = SnapshotStore(ingestor.index_dir)
+    for name in os.listdir(store.version_dir("technical", version)):
+        shutil.copy(os.path.join(store.version_dir("technical", version), name), ingestor.index_dir)
+    shutil.rmtree(os.path.join(ingestor.index_dir, "technical"))
+
+    assert store.current_versions() == {"technical": LEGACY_VERSION}
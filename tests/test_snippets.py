@@ -0,0 +1,92 @@
+# tests/test_snippets.py
+
+import numpy as np
+
+from rag.embeddings import HashingEmbeddingModel
+from rag.ingest import DocumentIngestor
+from rag.snippets import SnippetExtractor, clip_offsets, sentence_offsets
+
+
+def _split(text):
+    return [text[s:e].strip() for s, e in sentence_offsets(text).tolist()]
+
+
+def test_numbers_ending_a_sentence_still_split():
+    assert _split("The total is 5. Next we add more.") == [
+        "The total is 5.",
+        "Next we add more.",
+    ]
+
+
+def test_inline_list_numbers_stay_with_their_item():
+    assert _split("Steps: 9. Load it. 10. Index it.") == [
+        "Steps: 9. Load it.",
+        "10. Index it.",
+    ]
+
+
+def test_list_markers_at_line_start():
+    text = "1. Indexing: build the index.\n2. Query: search it.\n10. Done."
+    assert _split(text) == [
+        "1. Indexing: build the index.",
+        "2. Query: search it.",
+        "10. Done.",
+    ]
+
+
+def test_blank_line_always_ends_a_sentence():
+    assert _split("Intro\n\n3.\n\nOutro") == ["Intro", "3.", "Outro"]
+
+
+def _hits(text):
+    return [{"text": text, "metadata": {"source": "doc.txt", "start_char": 100}}]
+
+
+def test_citations_point_at_the_cited_text():
+    text = "  FAISS searches vectors fast.   BM25 matches keywords. "
+    extractor = SnippetExtractor(HashingEmbeddingModel(), budget_chars=800)
+    snippet, citations = extractor.extract("faiss vectors", _hits(text))
+
+    assert snippet
+    for ref in citations:
+        cited = text[ref["start"] - 100:ref["end"] - 100]
+        assert cited and cited in snippet
+        assert cited == cited.strip()
+
+
+def test_truncated_sentence_shortens_its_citation():
+    text = "FAISS " + "searches vectors " * 20 + "fast."
+    extractor = SnippetExtractor(HashingEmbeddingModel(), budget_chars=30)
+    snippet, citations = extractor.extract("faiss vectors", _hits(text))
+
+    assert len(snippet) == 30
+    (ref,) = citations
+    assert ref["end"] - ref["start"] == 30
+    assert text[ref["start"] - 100:ref["end"] - 100] == snippet
+
+
+def test_offsets_are_int32_rows():
+    offsets = sentence_offsets("One. Two.")
+    assert offsets.dtype == np.int32 and offsets.shape == (2, 2)
+
+
+def test_chunks_cut_mid_sentence_keep_whole_sentences(tmp_path):
+    text = (
+        "A vector index stores embeddings. It is part of a retrieval "
+        "augmented knowledge base. Queries are embedded the same way. "
+        "The nearest chunks are returned."
+    )
+    ingestor = DocumentIngestor(index_dir=str(tmp_path), chunk_size=70, overlap=20)
+    whole = set(_split(text))
+
+    _, chunks = ingestor._chunk_texts([text], [{"source": "doc.txt"}])
+    # full-size chunks; the short tail holds only the end of a sentence
+    for meta in (m for m in chunks if len(m["text"]) == 70):
+        found = [meta["text"][s:e].strip() for s, e in meta["sentences"].tolist()]
+        assert found and set(found) <= whole
+
+
+def test_a_chunk_inside_one_long_sentence_keeps_its_part():
+    text = "Intro. " + "word " * 40 + "end."
+    offsets = clip_offsets(sentence_offsets(text), 20, 60)
+    assert offsets.tolist() == [[0, 40]]
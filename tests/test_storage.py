@@ -0,0 +1,68 @@
+# tests/test_storage.py
+
+import io
+import multiprocessing
+import os
+
+from backend.file_qa.storage import UploadStore
+
+CONTENT = b"shared upload body\n" * 64
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = UploadStore(str(tmp_path))
+    a = store.put(io.BytesIO(CONTENT), "a.txt", "s1")
+    b = store.put(io.BytesIO(CONTENT), "b.txt", "s2")
+
+    assert a.digest == b.digest and b.duplicate
+    assert store.stats() == {"objects": 1, "bytes": len(CONTENT), "references": 2}
+
+
+def test_object_survives_until_last_reference_is_released(tmp_path):
+    store = UploadStore(str(tmp_path))
+    stored = store.put(io.BytesIO(CONTENT), "a.txt", "s1")
+    store.put(io.BytesIO(CONTENT), "a.txt", "s2")
+
+    assert store.release_session("s1") == []
+    assert store.gc() == []
+    assert os.path.exists(stored.path)
+
+    assert store.release_session("s2") == [stored.digest]
+    assert not os.path.exists(stored.path)
+
+
+def _churn(root, rounds, queue):
+    store = UploadStore(root)
+    for _ in range(rounds):
+        stored = store.put(io.BytesIO(CONTENT), "a.txt", "writer")
+        if not os.path.exists(stored.path):
+            queue.put("object deleted while referenced")
+            return
+        store.release("writer", [stored.digest])
+    queue.put("ok")
+
+
+def _sweep(root, stop):
+    store = UploadStore(root)
+    while not stop.is_set():
+        store.gc()
+
+
+def test_gc_in_another_process_never_deletes_a_fresh_reference(tmp_path):
+    root = str(tmp_path)
+    UploadStore(root)
+    ctx = multiprocessing.get_context("fork")
+    queue, stop = ctx.Queue(), ctx.Event()
+
+    sweeper = ctx.Process(target=_sweep, args=(root, stop))
+    sweeper.start()
+    try:
+        writer = ctx.Process(target=_churn, args=(root, 300, queue))
+        writer.start()
+        writer.join(60)
+        result = queue.get(timeout=5)
+    finally:
+        stop.set()
+        sweeper.join(10)
+
+    assert result == "ok"
@@ -0,0 +1,45 @@
+# tests/test_text_arena.py
+
+import numpy as np
+
+from rag.text_arena import TextArena
+
+TEXTS = [
+    f"Chunk {i}: FAISS indexes vectors; BM25 ranks keywords. Ünïcode ✓ {'x' * (i % 7)}"
+    for i in range(500)
+] + [""]
+
+
+def test_reads_match_the_input():
+    arena = TextArena(TEXTS, block_bytes=1024)
+
+    assert len(arena) == len(TEXTS)
+    assert list(arena) == TEXTS
+    assert arena[0] == TEXTS[0] and arena[-1] == "" and arena[257] == TEXTS[257]
+    assert arena.get_many([400, 3, 400, 499]) == [TEXTS[400], TEXTS[3], TEXTS[400], TEXTS[499]]
+
+
+def test_a_hit_decompresses_only_its_block():
+    arena = TextArena(TEXTS, block_bytes=1024, cache_blocks=2)
+    assert len(arena.block_offsets) - 1 > 10
+
+    arena[0]
+    arena[1]
+    assert (arena.misses, arena.hits) == (1, 1)
+    assert arena.memory_usage()["cache_bytes"] <= 2 * 1024
+
+    for i in range(0, len(TEXTS), 50):
+        arena[i]
+    assert len(arena._cache) == 2
+
+
+def test_compresses_and_round_trips_through_save(tmp_path):
+    arena = TextArena(TEXTS)
+    usage = arena.memory_usage()
+    assert usage["compressed_bytes"] < usage["raw_bytes"] / 4
+
+    path = str(tmp_path / "texts.npz")
+    arena.save(path)
+    loaded = TextArena.load(path)
+    assert list(loaded) == TEXTS
+    assert loaded.get_many(np.arange(10)) == TEXTS[:10]
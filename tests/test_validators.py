@@ -0,0 +1,44 @@
+# tests/test_validators.py
+
+import pytest
+
+from backend.validators import REASON_NOT_PYTHON, OutputValidator
+
+PYTHON_PERSONA = {"hard_rules": {"output_format": "python"}}
+
+
+def _stream(pieces):
+    validator = OutputValidator().stream(PYTHON_PERSONA, {}, ["doc.txt"])
+    for piece in pieces:
+        validator.feed(piece)
+    return validator.finish()
+
+
+def _lines(text):
+    return text.splitlines(keepends=True)
+
+
+def _chars(text):
+    return list(text)
+
+
+# one Python pattern split over two lines
+SPLIT = "for item\nin values\n    print(item)\n"
+# "def f(" mid-line, where the tail window of the long line starts
+MID_LINE = "a" * 44 + "def f(" + "b" * 249 + "\nmore prose\n"
+
+
+@pytest.mark.parametrize("split", [_lines, _chars, lambda text: [text]])
+def test_patterns_spanning_a_line_break_are_found(split):
+    assert OutputValidator()._looks_like_python(SPLIT)
+    assert _stream(split(SPLIT)) is None
+
+
+@pytest.mark.parametrize("split", [_lines, _chars, lambda text: [text]])
+def test_the_tail_window_keeps_line_starts(split):
+    assert not OutputValidator()._looks_like_python(MID_LINE)
+    assert _stream(split(MID_LINE)) == REASON_NOT_PYTHON
+
+
+def test_prose_is_rejected():
+    assert _stream(_lines("This is\nplain prose\nwith no code.\n")) == REASON_NOT_PYTHON
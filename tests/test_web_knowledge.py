@@ -0,0 +1,89 @@
+# tests/test_web_knowledge.py
+
+import time
+
+import pytest
+
+from backend.web_knowledge import WebKnowledge
+from rag.embeddings import HashingEmbeddingModel
+
+QUESTION = "what is the capital of france"
+
+# a realistic web answer: longer than one chunk
+ANSWER = (
+    "Paris is the capital and most populous city of France. With an estimated "
+    "population of 2,102,650 residents in January 2023 in an area of more than "
+    "105 km2, Paris is the fourth-most populous city in the European Union and "
+    "the 30th most densely populated city in the world in 2022. Since the 17th "
+    "century, Paris has been one of the world's major centres of finance, "
+    "diplomacy, commerce, culture, fashion, and gastronomy. Because of its "
+    "leading role in the arts and sciences and its early adoption of extensive "
+    "street lighting, it became known as the City of Light in the 19th century."
+)
+
+RESULT = {
+    "answer": ANSWER,
+    "sources": ["https://en.wikipedia.org/wiki/Paris"],
+    "metadata": {"tool": "tavily"},
+}
+
+
+@pytest.fixture
+def knowledge(tmp_path):
+    return WebKnowledge(HashingEmbeddingModel(), path=str(tmp_path / "web.sqlite"))
+
+
+def test_the_same_question_is_answered_locally(knowledge):
+    assert len(ANSWER) > knowledge.chunk_chars
+    knowledge.write(QUESTION, RESULT)
+
+    hit = knowledge.lookup(QUESTION)
+    assert hit["answer"] == ANSWER
+    assert hit["sources"] == RESULT["sources"]
+    assert hit["metadata"]["origin"] == "tavily"
+    assert hit["metadata"]["matched"] == "question"
+
+
+def test_paraphrases_match_and_other_questions_do_not(knowledge):
+    knowledge.write(QUESTION, RESULT)
+
+    assert knowledge.lookup("What's the capital of France?")
+    assert knowledge.lookup("tell me the capital city of france")
+    assert knowledge.lookup("what is the capital of germany") is None
+    assert knowledge.lookup("who is the president of france") is None
+
+
+def test_a_close_restatement_of_the_answer_matches_a_chunk(knowledge):
+    knowledge.write(QUESTION, RESULT)
+
+    hit = knowledge.lookup("paris became known as the city of light in the 19th century")
+    assert hit["metadata"]["matched"] == "chunk"
+
+
+def test_expired_answers_are_not_served(tmp_path):
+    knowledge = WebKnowledge(
+        HashingEmbeddingModel(), path=str(tmp_path / "web.sqlite"), ttl=0.05
+    )
+    knowledge.write(QUESTION, RESULT)
+    time.sleep(0.1)
+
+    assert knowledge.lookup(QUESTION) is None
+    knowledge.prune()
+    assert knowledge.stats()["entries"] == 0
+
+
+def test_other_workers_see_new_answers(knowledge):
+    other = WebKnowledge(HashingEmbeddingModel(), path=knowledge.path)
+    assert other.lookup(QUESTION) is None
+
+    knowledge.write(QUESTION, RESULT)
+    assert other.lookup(QUESTION)["answer"] == ANSWER
+
+
+def test_remember_writes_in_the_background(knowledge):
+    assert knowledge.remember(QUESTION, RESULT)
+
+    deadline = time.time() + 5
+    while knowledge.lookup(QUESTION) is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert knowledge.lookup(QUESTION)["answer"] == ANSWER